@@ -1,16 +1,20 @@
 from __future__ import annotations
 
+import array
 import collections
 import functools
+import itertools
 import logging
 import random
 import secrets
+import threading
 from argparse import Namespace
 from collections import Counter, deque
-from collections.abc import Collection, MutableSequence
+from collections.abc import Collection, MutableMapping, MutableSequence
 from enum import IntEnum, IntFlag
+from operator import itemgetter
 from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING)
+                    Optional, Protocol, Sequence, Set, Tuple, Type, Union, TYPE_CHECKING)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -86,6 +90,7 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    entrance_dependencies: EntranceDependencies
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -145,6 +150,42 @@ class MultiWorld():
         def __len__(self):
             return sum(len(regions) for regions in self.region_cache.values())
 
+    class EntranceDependencies:
+        """
+        Records which item names Entrance access rules read while they evaluated to False, for worlds using
+        incremental reachability. Dependencies are only ever added, so they stay valid for every CollectionState.
+        """
+        item_entrances: Dict[int, Dict[str, Set[Entrance]]]
+        opaque_entrances: Dict[int, Set[Entrance]]
+        """Entrances with access rules that inspected state in ways that can't be traced back to item names."""
+
+        def __init__(self):
+            self.item_entrances = {}
+            self.opaque_entrances = {}
+
+        def record(self, player: int, entrance: Entrance, item_names: Iterable[str], opaque: bool) -> None:
+            if opaque:
+                self.opaque_entrances.setdefault(player, set()).add(entrance)
+            item_entrances = self.item_entrances.setdefault(player, {})
+            for item_name in item_names:
+                entrances = item_entrances.get(item_name)
+                if entrances is None:
+                    item_entrances[item_name] = {entrance}
+                else:
+                    entrances.add(entrance)
+
+        def get_affected(self, player: int, item_names: Iterable[str],
+                         blocked_connections: Set[Entrance]) -> Set[Entrance]:
+            """Returns the blocked connections that need to be rechecked after item_names changed in state."""
+            affected: Set[Entrance] = set()
+            item_entrances = self.item_entrances.get(player, {})
+            for item_name in item_names:
+                entrances = item_entrances.get(item_name)
+                if entrances:
+                    affected |= entrances
+            affected |= self.opaque_entrances.get(player, set())
+            return affected.intersection(blocked_connections)
+
     def __init__(self, players: int):
         # world-local random state is saved for multiple generations running concurrently
         self.random = ThreadBarrierProxy(random.Random())
@@ -171,6 +212,7 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.entrance_dependencies = self.EntranceDependencies()
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -625,44 +667,12 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        return SphereAnalysis(self).get_sendable_spheres()
 
-    def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
+    def fulfills_accessibility(self, state: Optional[CollectionState] = None,
+                               sphere_analysis: Optional[SphereAnalysis] = None):
+        """Check if accessibility rules are fulfilled with current or supplied state.
+        If an up-to-date sphere_analysis of the filled multiworld is supplied, its sweep is used instead of sweeping."""
         if not state:
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
@@ -694,6 +704,15 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if sphere_analysis:
+            # everything reachable was collected, so whatever is required has to be reachable with the final state
+            missing = [location for location in locations
+                       if location_condition(location) and not location.can_reach(sphere_analysis.state)]
+            if missing:
+                logging.warning(f"Could not access required locations for accessibility check. Missing: {missing}")
+                return False
+            return sphere_analysis.beatable
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -722,22 +741,215 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class _ItemReadRecorder:
+    """
+    Stands in for a player's prog_items while an Entrance access rule is evaluated, recording the item names it reads.
+    Any other kind of access, like iterating the Counter, marks the rule as opaque.
+    """
+    __slots__ = ("counter", "items_read", "opaque")
+
+    counter: Counter[str]
+    items_read: Set[str]
+    opaque: bool
+
+    def __init__(self, counter: Counter[str]) -> None:
+        self.counter = counter
+        self.items_read = set()
+        self.opaque = False
+
+    def __getitem__(self, item: str) -> int:
+        self.items_read.add(item)
+        return self.counter[item]
+
+    def __contains__(self, item: object) -> bool:
+        self.items_read.add(item)
+        return item in self.counter
+
+    def get(self, item: str, default: Any = None) -> Any:
+        self.items_read.add(item)
+        return self.counter.get(item, default)
+
+    def __iter__(self) -> Iterator[str]:
+        self.opaque = True
+        return iter(self.counter)
+
+    def __len__(self) -> int:
+        self.opaque = True
+        return len(self.counter)
+
+    def __setitem__(self, item: str, count: int) -> None:
+        self.opaque = True
+        self.counter[item] = count
+
+    def __getattr__(self, name: str) -> Any:
+        self.opaque = True
+        return getattr(self.counter, name)
+
+
+class ItemIndex:
+    """
+    Assigns the item names of a world type indices into ItemCounts, in order of their item IDs.
+    Names without an ID, like events, get the next free index when they are first counted, which then stays theirs.
+    Index 0 is never assigned, so unknown names can be looked up as a count that is always 0.
+    """
+    __slots__ = ("indices", "names", "group_getters", "_lock")
+
+    indices: Dict[str, int]
+    names: List[str]
+    group_getters: Dict[str, Callable[[Sequence[int]], Tuple[int, ...]]]
+    """per item name group, returns the counts of the group's items"""
+    _world_indices: ClassVar[Dict[type, ItemIndex]] = {}
+
+    def __init__(self, world_type: Type[AutoWorld.World]) -> None:
+        item_names = sorted(world_type.item_name_to_id, key=world_type.item_name_to_id.__getitem__)
+        # groups may also name events
+        item_names += sorted(set().union(*world_type.item_name_groups.values()) - set(item_names))
+        self.names = ["", *item_names]
+        self.indices = {name: index for index, name in enumerate(item_names, 1)}
+        self.group_getters = {}
+        for group_name, item_names in world_type.item_name_groups.items():
+            group_indices = [self.indices[item_name] for item_name in item_names]
+            if len(group_indices) > 1:
+                self.group_getters[group_name] = itemgetter(*group_indices)
+            elif group_indices:
+                self.group_getters[group_name] = lambda counts, index=group_indices[0]: (counts[index],)
+            else:
+                self.group_getters[group_name] = lambda counts: ()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, world_type: Type[AutoWorld.World]) -> ItemIndex:
+        item_index = cls._world_indices.get(world_type)
+        if item_index is None:
+            item_index = cls._world_indices.setdefault(world_type, cls(world_type))
+        return item_index
+
+    def add(self, item: str) -> int:
+        with self._lock:
+            index = self.indices.get(item)
+            if index is None:
+                index = self.indices[item] = len(self.names)
+                self.names.append(item)
+            return index
+
+
+class ItemCounts(MutableMapping[str, int]):
+    """
+    Stands in for a player's prog_items Counter for worlds with indexed_item_counts, storing the counts in an array
+    indexed by ItemIndex. Copying is a buffer copy and item name groups are counted without a Python loop.
+    Like a Counter, missing items count 0 and update adds counts, but items also stop being contained at a count of 0.
+    """
+    __slots__ = ("item_index", "indices", "counts")
+
+    item_index: ItemIndex
+    indices: Dict[str, int]
+    counts: array.array
+
+    def __init__(self, item_index: ItemIndex) -> None:
+        self.item_index = item_index
+        self.indices = item_index.indices
+        self.counts = array.array("l", bytes(array.array("l").itemsize * len(item_index.names)))
+
+    def __getitem__(self, item: str) -> int:
+        try:
+            return self.counts[self.indices.get(item, 0)]
+        except IndexError:  # an index added after this was created
+            return 0
+
+    def __setitem__(self, item: str, count: int) -> None:
+        index = self.indices.get(item)
+        if index is None:
+            index = self.item_index.add(item)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend(bytes(counts.itemsize * (index + 1 - len(counts))))
+        counts[index] = count
+
+    def __delitem__(self, item: str) -> None:
+        index = self.indices.get(item)
+        if index is None or index >= len(self.counts):
+            raise KeyError(item)
+        self.counts[index] = 0
+
+    def __contains__(self, item: object) -> bool:
+        return bool(self[item])  # type: ignore[index]
+
+    def get(self, item: str, default: Any = None) -> Any:
+        return self[item] or default
+
+    def __iter__(self) -> Iterator[str]:
+        names = self.item_index.names
+        return (names[index] for index, count in enumerate(self.counts) if count)
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def copy(self) -> ItemCounts:
+        ret = self.__class__.__new__(self.__class__)
+        ret.item_index = self.item_index
+        ret.indices = self.indices
+        ret.counts = self.counts[:]
+        return ret
+
+    def update(self, other: Union[Mapping[str, int], Iterable[str]] = (), /, **kwargs: int) -> None:
+        """Adds counts of a mapping or items of an iterable, like Counter.update."""
+        if isinstance(other, Mapping):
+            for item, count in other.items():
+                self[item] += count
+        else:
+            for item in other:
+                self[item] += 1
+        for item, count in kwargs.items():
+            self[item] += count
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def count_group(self, item_name_group: str) -> int:
+        return sum(self.item_index.group_getters[item_name_group](self.counts))
+
+    def count_group_unique(self, item_name_group: str) -> int:
+        group_counts = self.item_index.group_getters[item_name_group](self.counts)
+        return len(group_counts) - group_counts.count(0)
+
+
+# unique across all states, so a version identifies both the state and what it contained at the time
+_state_versions = itertools.count()
+
+
 class CollectionState():
     prog_items: Dict[int, Counter[str]]
+    """item counts per player, an ItemCounts instead of a Counter for worlds with indexed_item_counts"""
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
-    stale: Dict[int, bool]
+    version: int
+    """changes whenever items, checked locations or reachable regions change, so results of rules can be cached for it;
+    a copy keeps the version until either state changes"""
+    stale: Dict[int, Union[bool, Set[str]]]
+    """True if reachability has to be fully rechecked for a player, or the set of item names changed since the last
+    update for players using incremental reachability."""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
+    _owned_players: Set[int]
+    """players whose prog_items, reachable_regions and blocked_connections are not shared with another state"""
+    _owns_locations: bool
+    """whether advancements, locations_checked and path are not shared with another state"""
+    _changes_marked: int = 0
+    """how often item changes were recorded in stale, to tell if World.collect went through add_item"""
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = {player: ItemCounts(ItemIndex.get(type(parent.worlds[player])))
+                           if player in parent.worlds and parent.worlds[player].indexed_item_counts else Counter()
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
@@ -745,7 +957,10 @@ class CollectionState():
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.version = next(_state_versions)
         self.allow_partial_entrances = allow_partial_entrances
+        self._owned_players = set(parent.get_all_ids())
+        self._owns_locations = True
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -753,24 +968,55 @@ class CollectionState():
                 self.collect(item, True)
 
     def update_reachable_regions(self, player: int):
+        changed_items = self.stale[player]
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        blocked_connections = self.blocked_connections[player]
+        incremental = world.incremental_reachability
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
+            self.unshare_player(player)
+            reachable_regions = self.reachable_regions[player]
+            blocked_connections = self.blocked_connections[player]
+            queue = deque(blocked_connections)
             reachable_regions.add(start)
-            self.blocked_connections[player].update(start.exits)
+            self.version = next(_state_versions)
+            blocked_connections.update(start.exits)
             queue.extend(start.exits)
+        elif incremental and isinstance(changed_items, set):
+            # only recheck connections with access rules that read one of the changed items
+            queue = deque(self.multiworld.entrance_dependencies.get_affected(player, changed_items,
+                                                                             blocked_connections))
+        else:
+            queue = deque(blocked_connections)
+        if not queue:
+            return
 
         if world.explicit_indirect_conditions:
-            self._update_reachable_regions_explicit_indirect_conditions(player, queue)
+            self._update_reachable_regions_explicit_indirect_conditions(player, queue, incremental)
         else:
-            self._update_reachable_regions_auto_indirect_conditions(player, queue)
-
-    def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
+            self._update_reachable_regions_auto_indirect_conditions(player, queue, incremental)
+
+    def _can_reach_recorded(self, connection: Entrance, player: int) -> bool:
+        """Checks if connection can be reached, recording the items its access rule depends on if it can't."""
+        prog_items = self.prog_items[player]
+        # results cached for this version would hide the items that the rule reads
+        self.version = next(_state_versions)
+        recorder = _ItemReadRecorder(prog_items)
+        self.prog_items[player] = recorder  # type: ignore[assignment]
+        try:
+            reachable = connection.can_reach(self)
+        finally:
+            self.prog_items[player] = prog_items
+        if not reachable:
+            self.multiworld.entrance_dependencies.record(player, connection, recorder.items_read, recorder.opaque)
+        return reachable
+
+    def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque,
+                                                               incremental: bool = False):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
         # run BFS on all connections, and keep track of those blocked by missing items
@@ -778,15 +1024,24 @@ class CollectionState():
             connection = queue.popleft()
             new_region = connection.connected_region
             if new_region in reachable_regions:
-                blocked_connections.remove(connection)
-            elif connection.can_reach(self):
+                if player in self._owned_players:
+                    # shared structures aren't copied just to drop a redundant connection, it is only checked again
+                    blocked_connections.remove(connection)
+            elif (self._can_reach_recorded(connection, player) if incremental else connection.can_reach(self)):
                 if self.allow_partial_entrances and not new_region:
                     continue
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                if player not in self._owned_players:
+                    # copies share these until a search actually finds a new region
+                    self.unshare_player(player)
+                    reachable_regions = self.reachable_regions[player]
+                    blocked_connections = self.blocked_connections[player]
                 reachable_regions.add(new_region)
+                self.version = next(_state_versions)
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
+                self.unshare_locations()
                 self.path[new_region] = (new_region.name, self.path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
@@ -794,7 +1049,8 @@ class CollectionState():
                     if new_entrance in blocked_connections and new_entrance not in queue:
                         queue.append(new_entrance)
 
-    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
+    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque,
+                                                           incremental: bool = False):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
         new_connection: bool = True
@@ -805,35 +1061,79 @@ class CollectionState():
                 connection = queue.popleft()
                 new_region = connection.connected_region
                 if new_region in reachable_regions:
-                    blocked_connections.remove(connection)
-                elif connection.can_reach(self):
+                    if player in self._owned_players:
+                        # shared structures aren't copied just to drop a redundant connection, it is only checked again
+                        blocked_connections.remove(connection)
+                elif (self._can_reach_recorded(connection, player) if incremental else connection.can_reach(self)):
                     if self.allow_partial_entrances and not new_region:
                         continue
                     assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                    if player not in self._owned_players:
+                        # copies share these until a search actually finds a new region
+                        self.unshare_player(player)
+                        reachable_regions = self.reachable_regions[player]
+                        blocked_connections = self.blocked_connections[player]
                     reachable_regions.add(new_region)
+                    self.version = next(_state_versions)
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
+                    self.unshare_locations()
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
-        ret.advancements = self.advancements.copy()
-        ret.path = self.path.copy()
-        ret.locations_checked = self.locations_checked.copy()
+        """
+        Creates a copy of this state. The per-player structures and the location sets are shared between both states
+        until one of them modifies them, so copying only costs as much as the players that get touched afterwards.
+        Code modifying prog_items, reachable_regions, blocked_connections, advancements, locations_checked or path in
+        place, instead of through collect, remove and add_item, has to call unshare_player or unshare_locations first.
+        """
+        ret = self.__class__.__new__(self.__class__)
+        ret.multiworld = self.multiworld
+        ret.prog_items = self.prog_items.copy()
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.advancements = self.advancements
+        ret.path = self.path
+        ret.locations_checked = self.locations_checked
         ret.allow_partial_entrances = self.allow_partial_entrances
+        ret.version = self.version
+        # reachability was copied along, so it doesn't have to be rechecked from scratch
+        ret.stale = {player: stale.copy() if isinstance(stale, set) else stale for player, stale in self.stale.items()}
+        # everything is shared now, so neither state may modify it in place anymore
+        self._owned_players = set()
+        self._owns_locations = False
+        ret._owned_players = set()
+        ret._owns_locations = False
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
 
+    def unshare_player(self, player: int) -> None:
+        """
+        Makes prog_items, reachable_regions and blocked_connections of player safe to modify in place, and changes the
+        version of the state since they are about to be modified.
+        """
+        self.version = next(_state_versions)
+        if player not in self._owned_players:
+            self._owned_players.add(player)
+            self.prog_items[player] = self.prog_items[player].copy()
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+
+    def unshare_locations(self) -> None:
+        """Makes advancements, locations_checked and path safe to modify in place."""
+        if not self._owns_locations:
+            self._owns_locations = True
+            self.advancements = self.advancements.copy()
+            self.locations_checked = self.locations_checked.copy()
+            self.path = self.path.copy()
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -874,6 +1174,8 @@ class CollectionState():
         while reachable_advancements:
             reachable_advancements = {location for location in locations if location.can_reach(self)}
             locations -= reachable_advancements
+            if reachable_advancements:
+                self.unshare_locations()
             for advancement in reachable_advancements:
                 self.advancements.add(advancement)
                 assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
@@ -964,6 +1266,8 @@ class CollectionState():
         """Returns True if the state contains at least `count` items present in a specified item group."""
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            return player_prog_items.count_group(item_name_group) >= count
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name]
             if found >= count:
@@ -976,6 +1280,8 @@ class CollectionState():
         """
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            return player_prog_items.count_group_unique(item_name_group) >= count
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -985,6 +1291,8 @@ class CollectionState():
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            return player_prog_items.count_group(item_name_group)
         return sum(
             player_prog_items[item_name]
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -994,6 +1302,8 @@ class CollectionState():
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            return player_prog_items.count_group_unique(item_name_group)
         return sum(
             player_prog_items[item_name] > 0
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1002,11 +1312,18 @@ class CollectionState():
     # Item related
     def collect(self, item: Item, prevent_sweep: bool = False, location: Optional[Location] = None) -> bool:
         if location:
+            self.unshare_locations()
             self.locations_checked.add(location)
+            self.version = next(_state_versions)
 
-        changed = self.multiworld.worlds[item.player].collect(self, item)
+        self.unshare_player(item.player)
+        world = self.multiworld.worlds[item.player]
+        changes_marked = self._changes_marked
+        changed = world.collect(self, item)
 
-        self.stale[item.player] = True
+        if not world.incremental_reachability or (changed and self._changes_marked == changes_marked):
+            # the world changed state without going through add_item, so everything has to be rechecked
+            self.stale[item.player] = True
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1022,9 +1339,20 @@ class CollectionState():
         :param count: How many of the item to add.
         """
         assert count > 0
+        self.unshare_player(player)
         self.prog_items[player][item] += count
+        self._mark_changed(item, player)
+
+    def _mark_changed(self, item: str, player: int) -> None:
+        self._changes_marked += 1
+        stale = self.stale[player]
+        if stale is False:
+            self.stale[player] = {item}
+        elif stale is not True:
+            stale.add(item)
 
     def remove(self, item: Item):
+        self.unshare_player(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
@@ -1041,6 +1369,7 @@ class CollectionState():
         :param count: How many of the item to remove.
         """
         assert count > 0
+        self.unshare_player(player)
         self.prog_items[player][item] -= count
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
@@ -1054,10 +1383,12 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        self.unshare_player(player)
         if count == 0:
             del (self.prog_items[player][item])
         else:
             self.prog_items[player][item] = count
+            self._mark_changed(item, player)
 
 
 class EntranceType(IntEnum):
@@ -1087,6 +1418,7 @@ class Entrance:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
         if self.parent_region.can_reach(state) and self.access_rule(state):
             if not self.hide_path and self not in state.path:
+                state.unshare_locations()
                 state.path[self] = (self.name, state.path.get(self.parent_region, (self.parent_region.name, None)))
             return True
 
@@ -1537,6 +1869,82 @@ class EntranceInfo(TypedDict, total=False):
     direction: str
 
 
+class SphereAnalysis:
+    """
+    Sweeps a filled multiworld sphere by sphere once, from a fresh CollectionState, so the accessibility check,
+    the multidata spheres and the spoiler playthrough can share one sweep.
+    Like fill, only progression items are collected.
+    Only valid as long as the items of the multiworld's locations don't change.
+    """
+    multiworld: MultiWorld
+    spheres: List[Set[Location]]
+    """multiserver sendable locations (location.item.code: int) of each sphere"""
+    events: List[List[Location]]
+    """event locations collected before each sphere, in collection order, with one more entry for after the last"""
+    states: List[CollectionState]
+    """if record_states, a copy of the state before the events of each entry of events were collected"""
+    unreachable: Set[Location]
+    """filled locations that could not be reached"""
+    state: CollectionState
+    """the state after collecting everything reachable"""
+
+    def __init__(self, multiworld: MultiWorld, record_states: bool = False) -> None:
+        self.multiworld = multiworld
+        self.spheres = []
+        self.events = []
+        self.states = []
+        state = CollectionState(multiworld)
+        locations: Set[Location] = set()
+        events: Set[Location] = set()
+        for location in multiworld.get_filled_locations():
+            if type(location.item.code) is int and type(location.address) is int:
+                locations.add(location)
+            else:
+                events.add(location)
+
+        while True:
+            if record_states:
+                self.states.append(state.copy())
+            # cull events out
+            collected_events: List[Location] = []
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        if event.item.advancement:
+                            state.collect(event.item, True, event)
+                        done_events.add(event)
+                        collected_events.append(event)
+                events -= done_events
+            self.events.append(collected_events)
+
+            sphere = {location for location in locations if location.can_reach(state)}
+            if not sphere:
+                break
+            self.spheres.append(sphere)
+            for location in sphere:
+                if location.item.advancement:
+                    state.collect(location.item, True, location)
+            locations -= sphere
+
+        self.unreachable = locations | events
+        self.state = state
+
+    @property
+    def beatable(self) -> bool:
+        return self.multiworld.has_beaten_game(self.state)
+
+    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+        """See MultiWorld.get_sendable_spheres"""
+        yield from self.spheres
+        unreachable = {location for location in self.unreachable
+                       if type(location.item.code) is int and type(location.address) is int}
+        if unreachable:
+            yield set()
+            yield unreachable
+
+
 class Spoiler:
     multiworld: MultiWorld
     hashes: Dict[int, str]
@@ -1561,44 +1969,39 @@ class Spoiler:
             self.entrances[(entrance, direction, player)] = \
                 {"player": player, "entrance": entrance, "exit": exit_, "direction": direction}
 
-    def create_playthrough(self, create_paths: bool = True) -> None:
-        """Destructive to the multiworld while it is run, damage gets repaired afterwards."""
+    def create_playthrough(self, create_paths: bool = True, sphere_analysis: Optional[SphereAnalysis] = None) -> None:
+        """Destructive to the multiworld while it is run, damage gets repaired afterwards.
+        Reuses sphere_analysis if supplied, which has to have been created with record_states."""
         from itertools import chain
-        # get locations containing progress items
         multiworld = self.multiworld
-        prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
+        if not sphere_analysis:
+            sphere_analysis = SphereAnalysis(multiworld, record_states=True)
+        assert sphere_analysis.states, "sphere_analysis needs to be created with record_states"
+        # get locations containing progress items, with the events of a sphere collected right before it
+        state_cache: List[Optional[CollectionState]] = []
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
+        for events, sphere, state in zip(sphere_analysis.events, sphere_analysis.spheres + [set()],
+                                         sphere_analysis.states):
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-
-            sphere_candidates -= sphere
-            collection_spheres.append(sphere)
-            state_cache.append(state.copy())
-
-            logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere),
-                          len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal' for location in sphere_candidates]):
-                    raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
-                                       f'Something went terribly wrong here.')
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+            prog_sphere = {location for location in chain(events, sphere) if location.item.advancement}
+            if prog_sphere:
+                collection_spheres.append(prog_sphere)
+                state_cache.append(state)
+                logging.debug('Calculated sphere %i, containing %i progress items.', len(collection_spheres),
+                              len(prog_sphere))
+
+        unreachable = {location for location in sphere_analysis.unreachable if location.item.advancement}
+        if unreachable:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           unreachable])
+            if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal'
+                    for location in unreachable]):
+                raise RuntimeError(f'Not all progression items reachable ({unreachable}). '
+                                   f'Something went terribly wrong here.')
+            else:
+                self.unreachables = unreachable
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
@@ -343,6 +343,7 @@ def accessibility_corrections(multiworld: MultiWorld, state: CollectionState, lo
             pool.append(location.item)
             location.item = None
             if location in state.advancements:
+                state.unshare_locations()
                 state.advancements.remove(location)
                 state.remove(location.item)
             locations.append(location)
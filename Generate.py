@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
+import hashlib
 import logging
 import os
+import pickle
 import random
 import string
 import sys
+import time
 import urllib.parse
 import urllib.request
 from collections import Counter
@@ -20,7 +24,12 @@ ModuleUpdate.update()
 import Utils
 import Options
 from BaseClasses import seeddigits, get_seed, PlandoOptions
-from Utils import parse_yamls, version_tuple, __version__, tuplize_version
+from Utils import parse_yamls, version_tuple, __version__, tuplize_version, cache_path, restricted_loads
+
+min_pool_jobs = 16
+"""Amount of player yamls from which reading and rolling them picks a process pool, if roll_processes is 0."""
+yaml_cache_days = 30
+"""Days after which unused parsed yamls are removed from the cache."""
 
 
 def mystery_argparse():
@@ -47,6 +56,9 @@ def mystery_argparse():
                         default=defaults.logtime, action='store_true')
     parser.add_argument("--csv_output", action="store_true",
                         help="Output rolled player options to csv (made for async multiworld).")
+    parser.add_argument("--roll_processes", default=defaults.roll_processes, type=lambda value: max(int(value), 0),
+                        help="Processes to read player files and roll their options with. "
+                             "0 picks one per CPU core when there are many player files, 1 disables the process pool.")
     parser.add_argument("--plando", default=defaults.plando_options,
                         help="List of options that can be set manually. Can be combined, for example \"bosses, items\"")
     parser.add_argument("--skip_prog_balancing", action="store_true",
@@ -57,6 +69,9 @@ def mystery_argparse():
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Writes time, allocations and can_reach calls per world and stage and the slowest access "
+                             "rules to a json report and flamegraph stacks in the output folder. Slows generation.")
     args = parser.parse_args()
 
     if args.skip_output and args.spoiler_only:
@@ -120,24 +135,31 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
         meta_weights = None
 
 
-    player_id = 1
-    player_files = {}
+    player_paths: dict[str, str] = {}
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
+            player_paths[fname] = os.path.join(args.player_files_path, fname)
+
+    with get_executor(args.roll_processes, len(player_paths)) as executor:
+        parsed_files = {fname: executor.submit(read_weights_yamls, path) for fname, path in player_paths.items()}
+        for fname, parsed_file in parsed_files.items():
             try:
                 weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
+                for doc_idx, yaml in enumerate(parsed_file.result()):
                     if yaml is None:
                         logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
                     else:
                         weights_for_file.append(yaml)
                 weights_cache[fname] = tuple(weights_for_file)
-                        
+
             except Exception as e:
                 raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
+    prune_yaml_cache()
+
+    player_id = 1
+    player_files = {}
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -179,10 +201,7 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     erargs.spoiler_only = args.spoiler_only
     erargs.name = {}
     erargs.csv_output = args.csv_output
-
-    settings_cache: dict[str, tuple[argparse.Namespace, ...]] = \
-        {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
-         for fname, yamls in weights_cache.items()}
+    erargs.profile = args.profile
 
     if meta_weights:
         for category_name, category_dict in meta_weights.items():
@@ -207,38 +226,57 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     name_counter = Counter()
     erargs.player_options = {}
 
+    player_paths_in_order: list[str] = []
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
         if path:
+            player_paths_in_order.append(path)
+            player += len(weights_cache[path])
+        else:
+            raise RuntimeError(f'No weights specified for player {player}')
+
+    # every yaml gets its own seed, drawn in player order, so rolling in a process pool matches rolling serially
+    rolled_paths = list(dict.fromkeys(player_paths_in_order)) if args.sameoptions else player_paths_in_order
+    rolled_settings: list[tuple[argparse.Namespace, ...]] = []
+    with get_executor(args.roll_processes, sum(len(weights_cache[path]) for path in rolled_paths)) as executor:
+        rolls = [[executor.submit(roll_seeded_settings, yaml, random.getrandbits(64), args.plando)
+                  for yaml in weights_cache[path]] for path in rolled_paths]
+        for path, path_rolls in zip(rolled_paths, rolls):
             try:
-                settings: tuple[argparse.Namespace, ...] = settings_cache[path] if settings_cache[path] else \
-                    tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
-                for settingsObject in settings:
-                    for k, v in vars(settingsObject).items():
-                        if v is not None:
-                            try:
-                                getattr(erargs, k)[player] = v
-                            except AttributeError:
-                                setattr(erargs, k, {player: v})
-                            except Exception as e:
-                                raise Exception(f"Error setting {k} to {v} for player {player}") from e
-
-                    # name was not specified
-                    if player not in erargs.name:
-                        if path == args.weights_file_path:
-                            # weights file, so we need to make the name unique
-                            erargs.name[player] = f"Player{player}"
-                        else:
-                            # use the filename
-                            erargs.name[player] = os.path.splitext(os.path.split(path)[-1])[0]
-                    erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
-
-                    player += 1
+                rolled_settings.append(tuple(load_rolled_settings(*roll.result()) for roll in path_rolls))
             except Exception as e:
                 raise ValueError(f"File {path} is invalid. Please fix your yaml.") from e
-        else:
-            raise RuntimeError(f'No weights specified for player {player}')
+    if args.sameoptions:
+        settings_cache = dict(zip(rolled_paths, rolled_settings))
+        rolled_settings = [settings_cache[path] for path in player_paths_in_order]
+
+    player = 1
+    for path, settings in zip(player_paths_in_order, rolled_settings):
+        try:
+            for settingsObject in settings:
+                for k, v in vars(settingsObject).items():
+                    if v is not None:
+                        try:
+                            getattr(erargs, k)[player] = v
+                        except AttributeError:
+                            setattr(erargs, k, {player: v})
+                        except Exception as e:
+                            raise Exception(f"Error setting {k} to {v} for player {player}") from e
+
+                # name was not specified
+                if player not in erargs.name:
+                    if path == args.weights_file_path:
+                        # weights file, so we need to make the name unique
+                        erargs.name[player] = f"Player{player}"
+                    else:
+                        # use the filename
+                        erargs.name[player] = os.path.splitext(os.path.split(path)[-1])[0]
+                erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
+
+                player += 1
+        except Exception as e:
+            raise ValueError(f"File {path} is invalid. Please fix your yaml.") from e
 
     if len(set(name.lower() for name in erargs.name.values())) != len(erargs.name):
         raise Exception(f"Names have to be unique. Names: {Counter(name.lower() for name in erargs.name.values())}")
@@ -246,19 +284,100 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     return erargs, seed
 
 
+class SerialExecutor(concurrent.futures.Executor):
+    """Executor that runs each job in place when it is submitted."""
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def get_executor(processes: int, jobs: int) -> concurrent.futures.Executor:
+    """
+    Returns a process pool with up to processes workers, or a SerialExecutor for a single process.
+    0 processes picks one per CPU core, if there are enough jobs to make up for starting the pool.
+    """
+    if not processes:
+        processes = (os.cpu_count() or 1) if jobs >= min_pool_jobs else 1
+    processes = min(processes, jobs)
+    if processes > 1:
+        return concurrent.futures.ProcessPoolExecutor(processes)
+    return SerialExecutor()
+
+
+def roll_seeded_settings(weights: dict, seed: int, plando_options: PlandoOptions) -> tuple[str, bytes]:
+    """
+    Rolls settings with the global random source seeded by seed, so the result does not depend on the process.
+    Returns the rolled game and the pickled settings, to be loaded with load_rolled_settings.
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        settings = roll_settings(weights, plando_options)
+    finally:
+        random.setstate(state)
+    return settings.game, pickle.dumps(settings)
+
+
+def load_rolled_settings(game: str, data: bytes) -> argparse.Namespace:
+    from worlds.AutoWorld import AutoWorldRegister
+    # import the world first, the options of lazily loaded or .apworld worlds can't be unpickled by name alone
+    AutoWorldRegister.world_types.get(game)
+    return pickle.loads(data)
+
+
+def get_yaml_cache_path(data: bytes) -> str:
+    return cache_path("parsed_yaml", f"{hashlib.sha256(__version__.encode() + data).hexdigest()}.pickle")
+
+
+def prune_yaml_cache() -> None:
+    """Removes parsed yamls that went unused for yaml_cache_days."""
+    cutoff = time.time() - yaml_cache_days * 24 * 60 * 60
+    try:
+        with os.scandir(cache_path("parsed_yaml")) as entries:
+            for entry in entries:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+    except OSError as e:
+        logging.debug(f"Could not prune parsed yaml cache: {e}")
+
+
 def read_weights_yamls(path) -> tuple[Any, ...]:
+    cache_file: str | None = None
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
             yaml = str(urllib.request.urlopen(path).read(), "utf-8-sig")
         else:
             with open(path, 'rb') as f:
-                yaml = str(f.read(), "utf-8-sig")
+                data = f.read()
+            cache_file = get_yaml_cache_path(data)
+            try:
+                with open(cache_file, "rb") as f:
+                    parsed = restricted_loads(f.read())
+                os.utime(cache_file)  # mark as used for prune_yaml_cache
+                return parsed
+            except Exception:
+                pass  # not cached yet, or holds types that restricted_loads rejects
+            yaml = str(data, "utf-8-sig")
     except Exception as e:
         raise Exception(f"Failed to read weights ({path})") from e
 
     from yaml.error import MarkedYAMLError
     try:
-        return tuple(parse_yamls(yaml))
+        parsed = tuple(parse_yamls(yaml))
+        if cache_file:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                with open(f"{cache_file}.{os.getpid()}", "wb") as f:
+                    pickle.dump(parsed, f)
+                os.replace(f"{cache_file}.{os.getpid()}", cache_file)
+            except OSError as e:
+                logging.debug(f"Could not cache parsed yaml {path}: {e}")
+        return parsed
     except MarkedYAMLError as ex:
         if ex.problem_mark:
             lines = yaml.splitlines()
@@ -508,7 +627,8 @@ def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.b
         raise Exception(f"Invalid game: {ret.game}")
     if ret.game not in AutoWorldRegister.world_types:
         from worlds import failed_world_loads
-        picks = Utils.get_fuzzy_results(ret.game, list(AutoWorldRegister.world_types) + failed_world_loads, limit=1)[0]
+        known_games = list(AutoWorldRegister.world_types) + list(AutoWorldRegister.world_types.pending)
+        picks = Utils.get_fuzzy_results(ret.game, known_games + failed_world_loads, limit=1)[0]
         if picks[0] in failed_world_loads:
             raise Exception(f"No functional world found to handle game {ret.game}. "
                             f"Did you mean '{picks[0]}' ({picks[1]}% sure)? "
@@ -583,6 +703,8 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
+    # only import the worlds of games that are rolled or have options in the player files
+    os.environ.setdefault("ARCHIPELAGO_LAZY_WORLDS", "1")
     erargs, seed = main()
     from Main import main as ERmain
     multiworld = ERmain(erargs, seed)
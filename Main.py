@@ -1,19 +1,23 @@
 import collections
 import concurrent.futures
+import contextlib
+import io
 import logging
+import multiprocessing
 import os
-import pickle
+import struct
 import tempfile
 import time
+import typing
 import zipfile
-import zlib
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereAnalysis
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from Options import StartInventoryPool
-from Utils import __version__, output_path, version_tuple
+from Profiling import GenerationProfile
+from Utils import __version__, compress_multidata, output_path, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -22,6 +26,19 @@ __all__ = ["main"]
 
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    if not getattr(args, "profile", False):
+        return generate(args, seed, baked_server_options)
+
+    profile = GenerationProfile()
+    try:
+        with profile:
+            return generate(args, seed, baked_server_options)
+    finally:
+        if profile.multiworld:
+            profile.write(output_path(f"AP_{profile.multiworld.seed_name}"))
+
+
+def generate(args, seed=None, baked_server_options: dict[str, object] | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -35,6 +52,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
+    GenerationProfile.attach(multiworld)
     multiworld.plando_options = args.plando_options
     multiworld.game = args.game.copy()
     multiworld.player_name = args.name.copy()
@@ -66,37 +84,38 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
-
-    logger.info('')
-
-    for player in multiworld.player_ids:
-        for item_name, count in multiworld.worlds[player].options.start_inventory.value.items():
-            for _ in range(count):
-                multiworld.push_precollected(multiworld.create_item(item_name, player))
-
-        for item_name, count in getattr(multiworld.worlds[player].options,
-                                        "start_inventory_from_pool",
-                                        StartInventoryPool({})).value.items():
-            for _ in range(count):
-                multiworld.push_precollected(multiworld.create_item(item_name, player))
-            # remove from_pool items also from early items handling, as starting is plenty early.
-            early = multiworld.early_items[player].get(item_name, 0)
-            if early:
-                multiworld.early_items[player][item_name] = max(0, early-count)
-                remaining_count = count-early
-                if remaining_count > 0:
-                    local_early = multiworld.local_early_items[player].get(item_name, 0)
-                    if local_early:
-                        multiworld.early_items[player][item_name] = max(0, local_early - remaining_count)
-                    del local_early
-            del early
-
-    logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
-
-    logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    with get_generation_process_pool(multiworld) as generation_pool:
+        AutoWorld.call_all(multiworld, "generate_early", process_pool=generation_pool)
+
+        logger.info('')
+
+        for player in multiworld.player_ids:
+            for item_name, count in multiworld.worlds[player].options.start_inventory.value.items():
+                for _ in range(count):
+                    multiworld.push_precollected(multiworld.create_item(item_name, player))
+
+            for item_name, count in getattr(multiworld.worlds[player].options,
+                                            "start_inventory_from_pool",
+                                            StartInventoryPool({})).value.items():
+                for _ in range(count):
+                    multiworld.push_precollected(multiworld.create_item(item_name, player))
+                # remove from_pool items also from early items handling, as starting is plenty early.
+                early = multiworld.early_items[player].get(item_name, 0)
+                if early:
+                    multiworld.early_items[player][item_name] = max(0, early-count)
+                    remaining_count = count-early
+                    if remaining_count > 0:
+                        local_early = multiworld.local_early_items[player].get(item_name, 0)
+                        if local_early:
+                            multiworld.early_items[player][item_name] = max(0, local_early - remaining_count)
+                        del local_early
+                del early
+
+        logger.info('Creating MultiWorld.')
+        AutoWorld.call_all(multiworld, "create_regions", process_pool=generation_pool)
+
+        logger.info('Creating Items.')
+        AutoWorld.call_all(multiworld, "create_items", process_pool=generation_pool)
 
     logger.info('Calculating Access Rules.')
 
@@ -187,15 +206,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with GenerationProfile.stage("fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with GenerationProfile.stage("balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -221,15 +242,18 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     output = tempfile.TemporaryDirectory()
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
-                          is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
+                          is not multiworld.worlds[player].generate_output.__code__
+                          or multiworld.worlds[player].output_in_process]
+        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool, \
+                get_output_process_pool(multiworld, output_players) as process_pool:
+            # a single sweep for the accessibility check, multidata spheres and playthrough
+            sphere_analysis_task = pool.submit(SphereAnalysis, multiworld, record_states=args.spoiler > 1)
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
                 output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
+                    pool.submit(AutoWorld.call_output, multiworld, player, temp_dir, process_pool))
 
             # collect ER hint info
             er_hint_data: dict[int, dict[int, str]] = {}
@@ -296,17 +320,21 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                             precollect_hint(location, auto_status)
 
                 # embedded data package
+                # built once per game in use, as worlds.network_data_package would import every world
+                game_worlds = {world.game: type(world) for world in multiworld.worlds.values()}
+                game_worlds["Archipelago"] = AutoWorld.AutoWorldRegister.world_types["Archipelago"]
+                game_data = worlds.game_data_cache or worlds.DataPackageCache.load(worlds.get_data_package_cache_key())
                 data_package = {
-                    game_world.game: worlds.network_data_package["games"][game_world.game]
-                    for game_world in multiworld.worlds.values()
+                    game: game_data[game]["data_package"] if game_data and game in game_data
+                    else game_world.get_data_package_data()
+                    for game, game_world in game_worlds.items()
                 }
-                data_package["Archipelago"] = worlds.network_data_package["games"]["Archipelago"]
 
                 checks_in_area: dict[int, dict[str, int | list[int]]] = {}
 
                 # get spheres -> filter address==None -> skip empty
                 spheres: list[dict[int, set[int]]] = []
-                for sphere in multiworld.get_sendable_spheres():
+                for sphere in sphere_analysis_task.result().get_sendable_spheres():
                     current_sphere: dict[int, set[int]] = collections.defaultdict(set)
                     for sphere_location in sphere:
                         current_sphere[sphere_location.player].add(sphere_location.address)
@@ -334,15 +362,16 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
+                multidata = compress_multidata(multidata, get_settings().generator.multidata_compresslevel,
+                                               os.cpu_count() or 1)
 
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
                     f.write(multidata)
 
             output_file_futures.append(pool.submit(write_multidata))
-            if not check_accessibility_task.result():
-                if not multiworld.can_beat_game():
+            sphere_analysis = sphere_analysis_task.result()
+            if not multiworld.fulfills_accessibility(sphere_analysis=sphere_analysis):
+                if not sphere_analysis.beatable:
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
                 else:
                     logger.warning("Location Accessibility requirements not fulfilled.")
@@ -353,19 +382,105 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
 
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            if args.spoiler > 1:
+                logger.info('Calculating playthrough.')
+                with GenerationProfile.stage("playthrough"):
+                    multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2,
+                                                          sphere_analysis=sphere_analysis)
 
-        if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            if args.spoiler:
+                multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
-        logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+            zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+            logger.info(f"Creating final archive at {zipfilename}")
+            write_output_zip(zipfilename, temp_dir, pool)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
+
+
+compressed_file_signatures = (
+    b"PK\x03\x04",  # zip, like patch files and other containers
+    b"\x1f\x8b",  # gzip
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"7z\xbc\xaf\x27\x1c",  # 7z
+)
+
+
+def is_compressed_file(path: str) -> bool:
+    """Returns if a file is multidata or starts like a compressed archive, so compressing it again is wasted time."""
+    if path.endswith(".archipelago"):
+        return True
+    with open(path, "rb") as f:
+        return f.read(6).startswith(compressed_file_signatures)
+
+
+def compress_zip_member(path: str, arcname: str, compression: int, compresslevel: int | None) -> bytes:
+    """Returns a zip with only the file at path in it, compressed like it would be by ZipFile.write."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, mode="w", compression=compression, compresslevel=compresslevel) as member_zip:
+        member_zip.write(path, arcname=arcname)
+    return buffer.getvalue()
+
+
+def add_zip_member(zf: zipfile.ZipFile, member_zip_data: bytes) -> None:
+    """Adds the member of a zip returned by compress_zip_member to zf without compressing it again."""
+    with zipfile.ZipFile(io.BytesIO(member_zip_data)) as member_zip:
+        zinfo, = member_zip.infolist()
+    name_length, extra_length = struct.unpack("<HH", member_zip_data[26:30])
+    member_end = zipfile.sizeFileHeader + name_length + extra_length + zinfo.compress_size
+    # ZipFile has no way to take compressed data as it is, so the local header and data are copied like ZipFile.write
+    # writes them, and the central directory entry is written from zinfo when zf is closed.
+    with zf._lock:
+        zf._writecheck(zinfo)
+        zf._didModify = True
+        zf.fp.seek(zf.start_dir)
+        zinfo.header_offset = zf.start_dir
+        zf.fp.write(memoryview(member_zip_data)[:member_end])
+        zf.start_dir = zf.fp.tell()
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+
+
+def write_output_zip(zipfilename: str, temp_dir: str, pool: concurrent.futures.Executor) -> None:
+    """Writes the files in temp_dir to a zip, compressing the files that are not compressed yet in pool."""
+    compression, compresslevel = get_settings().generator.output_compression.zip_arguments
+    members: list[tuple[os.DirEntry[str], concurrent.futures.Future[bytes] | None]] = []
+    for file in os.scandir(temp_dir):
+        if compression == zipfile.ZIP_STORED or is_compressed_file(file.path):
+            members.append((file, None))
+        else:
+            # zlib, bz2 and lzma release the GIL while compressing, so members are compressed in parallel
+            members.append((file, pool.submit(compress_zip_member, file.path, file.name, compression, compresslevel)))
+
+    with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for file, compressed_member in members:
+            if compressed_member:
+                add_zip_member(zf, compressed_member.result())
+            else:
+                zf.write(file.path, arcname=file.name)
+
+
+def get_generation_process_pool(multiworld: MultiWorld
+                                ) -> typing.ContextManager[concurrent.futures.ProcessPoolExecutor | None]:
+    """Returns a process pool to run the stages of worlds with isolated_generation in, if enabled in the host settings."""
+    generation_processes = get_settings().generator.generation_processes
+    isolated_players = [player for player in multiworld.player_ids if multiworld.worlds[player].isolated_generation]
+    if generation_processes < 2 or not isolated_players or multiprocessing.current_process().daemon:
+        return contextlib.nullcontext()
+    return concurrent.futures.ProcessPoolExecutor(min(generation_processes, len(isolated_players)),
+                                                  mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_output_process_pool(multiworld: MultiWorld, output_players: list[int]
+                            ) -> typing.ContextManager[concurrent.futures.ProcessPoolExecutor | None]:
+    """Returns a process pool to write the output of worlds with output_in_process in, if enabled in the host settings."""
+    output_processes = get_settings().generator.output_processes
+    process_players = [player for player in output_players if multiworld.worlds[player].output_in_process]
+    # daemonic processes, like WebHost generators, can't start processes of their own
+    if output_processes < 2 or not process_players or multiprocessing.current_process().daemon:
+        return contextlib.nullcontext()
+    # the pool starts its processes lazily from output threads, and forking while other threads run can copy held locks
+    return concurrent.futures.ProcessPoolExecutor(min(output_processes, len(process_players)),
+                                                  mp_context=multiprocessing.get_context("spawn"))
@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import asyncio
 import collections
+import concurrent.futures
 import contextlib
 import copy
 import datetime
@@ -13,6 +14,7 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import shlex
@@ -124,6 +126,111 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+append_only_save_sections = frozenset(("received_items", "location_checks"))
+"""Save sections whose lists and sets only ever grow, so an entry of the same length as before is unchanged."""
+
+
+def copy_save(save: typing.Dict[str, typing.Any],
+              previous: typing.Optional[typing.Dict[str, typing.Any]] = None) -> typing.Dict[str, typing.Any]:
+    """Copies the containers of a save from get_save, so later changes to the server's state don't show up in the copy.
+    Server state is only ever modified one container level below the save's sections.
+    Entries of append only sections that did not grow since the previous copy are shared with it instead of copied."""
+
+    def copy_section(key: str, section: typing.Dict[typing.Any, typing.Any]) -> typing.Dict[typing.Any, typing.Any]:
+        previous_section = previous.get(key) if previous and key in append_only_save_sections else None
+        if not isinstance(previous_section, dict):
+            return {sub_key: copy.copy(sub_value) for sub_key, sub_value in section.items()}
+        copied_section = {}
+        for sub_key, sub_value in section.items():
+            previous_value = previous_section.get(sub_key, None)
+            if type(previous_value) is type(sub_value) and len(previous_value) == len(sub_value):
+                copied_section[sub_key] = previous_value
+            else:
+                copied_section[sub_key] = copy.copy(sub_value)
+        return copied_section
+
+    return {key: copy_section(key, value) if isinstance(value, dict) else copy.copy(value)
+            for key, value in save.items()}
+
+
+def get_save_delta(previous: typing.Dict[str, typing.Any],
+                   save: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Gets the changes from the previous save to the current one. Dict sections of the save, like location_checks or
+    received_items, only contain the changed entries, with lists and sets that only grew reduced to their additions.
+    Returns an empty dict if nothing changed."""
+    replaced: typing.Dict[str, typing.Any] = {}
+    updated: typing.Dict[str, typing.Dict[typing.Any, typing.Any]] = {}
+    extended: typing.Dict[str, typing.Dict[typing.Any, typing.Any]] = {}
+    removed: typing.Dict[str, typing.List[typing.Any]] = {}
+    for key, value in save.items():
+        previous_value = previous.get(key, None)
+        if not isinstance(value, dict) or not isinstance(previous_value, dict):
+            if key not in previous or previous_value != value:
+                replaced[key] = value
+            continue
+        section_updated = {}
+        section_extended = {}
+        for sub_key, sub_value in value.items():
+            if sub_key not in previous_value:
+                section_updated[sub_key] = sub_value
+                continue
+            previous_sub_value = previous_value[sub_key]
+            if previous_sub_value is sub_value or previous_sub_value == sub_value:
+                continue
+            if type(sub_value) is list and type(previous_sub_value) is list \
+                    and sub_value[:len(previous_sub_value)] == previous_sub_value:
+                section_extended[sub_key] = sub_value[len(previous_sub_value):]
+            elif type(sub_value) is set and type(previous_sub_value) is set and previous_sub_value <= sub_value:
+                section_extended[sub_key] = sub_value - previous_sub_value
+            else:
+                section_updated[sub_key] = sub_value
+        if section_updated:
+            updated[key] = section_updated
+        if section_extended:
+            extended[key] = section_extended
+        section_removed = [sub_key for sub_key in previous_value if sub_key not in value]
+        if section_removed:
+            removed[key] = section_removed
+
+    delta = {"replace": replaced, "update": updated, "extend": extended, "remove": removed}
+    return {kind: changes for kind, changes in delta.items() if changes}
+
+
+def apply_save_delta(save: typing.Dict[str, typing.Any], delta: typing.Dict[str, typing.Dict[str, typing.Any]]):
+    """Applies changes from get_save_delta to a save, in place."""
+    save.update(delta.get("replace", {}))
+    for key, changes in delta.get("update", {}).items():
+        save[key].update(changes)
+    for key, changes in delta.get("extend", {}).items():
+        section = save[key]
+        for sub_key, additions in changes.items():
+            if isinstance(additions, list):
+                section[sub_key].extend(additions)
+            else:
+                section[sub_key].update(additions)
+    for key, sub_keys in delta.get("remove", {}).items():
+        section = save[key]
+        for sub_key in sub_keys:
+            del section[sub_key]
+
+
+def apply_save_log(save: typing.Dict[str, typing.Any],
+                   deltas: typing.Iterable[typing.Tuple[int, typing.Dict[str, typing.Dict[str, typing.Any]]]]) \
+        -> typing.Dict[str, typing.Any]:
+    """Applies logged (save_sequence, delta) pairs to a full save, skipping deltas already compacted into it.
+    Stops at the first gap in the sequence, as later deltas would be based on changes that were never written."""
+    sequence = save.get("save_sequence", 0)
+    for delta_sequence, delta in deltas:
+        if delta_sequence <= sequence:
+            continue
+        if delta_sequence != sequence + 1:
+            break
+        apply_save_delta(save, delta)
+        sequence = delta_sequence
+    save["save_sequence"] = sequence
+    return save
+
+
 class Client(Endpoint):
     version = Version(0, 0, 0)
     tags: typing.List[str]
@@ -215,6 +322,8 @@ class Context:
         self.slot_info = {}
         self.log_network = log_network
         self.endpoints = []
+        self.received_packets = 0
+        """packets received from all clients, a hoster process counts and resets this for its load report"""
         self.clients = {}
         self.compatibility: int = compatibility
         self.shutdown_task = None
@@ -254,9 +363,28 @@ class Context:
         self.commandprocessor = ServerCommandProcessor(self)
         self.embedded_blacklist = {"host", "port"}
         self.client_ids: typing.Dict[typing.Tuple[int, int], datetime.datetime] = {}
+        # slots that received items not yet sent to their clients by send_new_items
+        self.new_item_slots: typing.Set[team_slot] = set()
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        # wakes the auto saver thread to save right away
+        self.save_requested = threading.Event()
+        # the event loop saves are copied on, so the copies are consistent with the state clients change there
+        self.loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        # slots whose hints have to be rechecked before saving, because their location checks were loaded
+        self.stale_hint_slots: typing.Set[team_slot] = set()
+        # saves only write the changes since the previous save, with a full save once this many deltas were written
+        # or the deltas got larger than the last full save
+        self.save_compaction_interval = 30
+        self.save_sequence = 0
+        self._last_save: typing.Optional[typing.Dict[str, typing.Any]] = None
+        self._save_snapshots = 0
+        self._last_save_snapshot = 0
+        self._save_lock = threading.Lock()
+        self._save_deltas = 0
+        self._save_deltas_size = 0
+        self._full_save_size = 0
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -287,6 +415,9 @@ class Context:
     # Data package retrieval
     def _load_game_data(self):
         import worlds
+        if worlds.lazy_loading:
+            # game data is loaded once the multidata names its games, see _load_world_game_data
+            return
         self.gamespackage = worlds.network_data_package["games"]
 
         self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
@@ -301,6 +432,23 @@ class Context:
             del game_package["item_name_groups"]
             del game_package["location_name_groups"]
 
+    def _load_world_game_data(self, games: typing.Iterable[str]):
+        """Adds the data of installed worlds for games that were not loaded by _load_game_data."""
+        missing_games = [game for game in games if game not in self.gamespackage]
+        if not missing_games:
+            return
+        import worlds
+        # read from the data package cache, so worlds don't have to be imported
+        game_data = worlds.get_game_data()
+        for game in missing_games:
+            if game in game_data:
+                data_package = game_data[game]["data_package"]
+                self.gamespackage[game] = {key: value for key, value in data_package.items()
+                                           if key not in ("item_name_groups", "location_name_groups")}
+                self.item_name_groups[game] = data_package["item_name_groups"]
+                self.location_name_groups[game] = data_package["location_name_groups"]
+                self.non_hintable_names[game] = frozenset(game_data[game]["hint_blacklist"])
+
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
             if "checksum" in game_package:
@@ -439,13 +587,16 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > 4:
             raise Utils.VersionException("Incompatible multidata.")
+        if format_version == 4:
+            # sections are only decompressed once accessed
+            return Utils.LazyMultiData.from_bytes(data)
         return restricted_loads(zlib.decompress(data[1:]))
 
-    def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
+    def _load(self, decoded_obj: typing.MutableMapping[str, typing.Any], game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
 
         self.read_data = {}
@@ -489,8 +640,8 @@ class Context:
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda slot=slot: self.slot_data[slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -511,6 +662,8 @@ class Context:
             server_options = decoded_obj.get("server_options", {})
             self._set_options(server_options)
 
+        self._load_world_game_data({"Archipelago", *self.games.values()})
+
         # embedded data package
         for game_name, data in decoded_obj.get("datapackage", {}).items():
             if game_name in game_data_packages:
@@ -536,6 +689,11 @@ class Context:
     def save(self, now=False) -> bool:
         if self.saving:
             if now:
+                if self.auto_saver_thread and threading.current_thread() is not self.auto_saver_thread:
+                    # don't wait for the save on the event loop
+                    self.save_dirty = True
+                    self.save_requested.set()
+                    return True
                 self.save_dirty = False
                 return self._save()
 
@@ -545,28 +703,117 @@ class Context:
         return False
 
     def _save(self, exit_save: bool = False) -> bool:
+        snapshot, save = self._snapshot_save()
+        with self._save_lock:
+            try:
+                delta = self._prepare_save(snapshot, save, exit_save)
+                if delta is None:
+                    encoded_save = zlib.compress(pickle.dumps({**save, "save_sequence": self.save_sequence + 1}))
+                    with open(self.save_filename, "wb") as f:
+                        f.write(encoded_save)
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self.save_log_filename)  # the deltas are part of the full save now
+                elif delta:
+                    encoded_save = zlib.compress(pickle.dumps((self.save_sequence + 1, delta)))
+                    with open(self.save_log_filename, "ab") as f:
+                        f.write(len(encoded_save).to_bytes(4, "little") + encoded_save)
+                else:
+                    return True
+            except Exception as e:
+                self.logger.exception(e)
+                self._last_save = None  # a delta may have been written partially, continue with a full save
+                return False
+            else:
+                self._save_written(snapshot, save, len(encoded_save), delta is None)
+                return True
+
+    def _snapshot_save(self) -> typing.Tuple[int, typing.Dict[str, typing.Any]]:
+        """Copies the current save on the event loop, waiting for it if called from another thread.
+        Returns the number of the copy, which orders copies taken by different threads, and the copy."""
+        loop = self.loop
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
-        except Exception as e:
-            self.logger.exception(e)
-            return False
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop or loop is None or not loop.is_running():
+            return self._copy_save()
+        snapshot: concurrent.futures.Future[typing.Tuple[int, typing.Dict[str, typing.Any]]] = \
+            concurrent.futures.Future()
+
+        def copy_save_on_loop() -> None:
+            if snapshot.set_running_or_notify_cancel():
+                try:
+                    snapshot.set_result(self._copy_save())
+                except BaseException as e:
+                    snapshot.set_exception(e)
+
+        loop.call_soon_threadsafe(copy_save_on_loop)
+        try:
+            return snapshot.result(10)
+        except concurrent.futures.TimeoutError:
+            if not snapshot.cancel():
+                return snapshot.result()
+            # the event loop is stuck or shutting down and won't change state anymore
+            return self._copy_save()
+
+    def _copy_save(self) -> typing.Tuple[int, typing.Dict[str, typing.Any]]:
+        self._save_snapshots += 1
+        return self._save_snapshots, copy_save(self.get_save(), self._last_save)
+
+    def _prepare_save(self, snapshot: int, save: typing.Dict[str, typing.Any], full: bool = False) \
+            -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """Returns the changes of a copy from _snapshot_save since the last written save, or None if a full save is
+        due instead. Returns no changes for a copy older than the last written save."""
+        if snapshot < self._last_save_snapshot:
+            return {}
+        if full or self._last_save is None or self._save_deltas >= self.save_compaction_interval \
+                or self._save_deltas_size > self._full_save_size:
+            return None
+        return get_save_delta(self._last_save, save)
+
+    def _save_written(self, snapshot: int, save: typing.Dict[str, typing.Any], size: int, full: bool):
+        """Makes a copy from _snapshot_save that was written successfully the base for the next delta."""
+        self.save_sequence += 1
+        self._last_save = save
+        self._last_save_snapshot = snapshot
+        if full:
+            self._save_deltas = 0
+            self._save_deltas_size = 0
+            self._full_save_size = size
         else:
-            return True
+            self._save_deltas += 1
+            self._save_deltas_size += size
+
+    @property
+    def save_log_filename(self) -> str:
+        return self.save_filename + ".log"
+
+    def _read_save_log(self) -> typing.Iterator[typing.Tuple[int, typing.Dict[str, typing.Dict[str, typing.Any]]]]:
+        try:
+            with open(self.save_log_filename, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        while position + 4 <= len(data):
+            size = int.from_bytes(data[position:position + 4], "little")
+            position += 4
+            if position + size > len(data):
+                break  # incomplete delta of an interrupted save
+            yield restricted_loads(zlib.decompress(data[position:position + size]))
+            position += size
 
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
             try:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
-                    self.set_save(save_data)
+                    self.set_save(apply_save_log(save_data, self._read_save_log()))
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -575,6 +822,9 @@ class Context:
 
     def _start_async_saving(self, atexit_save: bool = True):
         if not self.auto_saver_thread:
+            with contextlib.suppress(RuntimeError):
+                self.loop = asyncio.get_running_loop()
+
             def save_regularly():
                 # time.time() is platform dependent, so using the expensive datetime method instead
                 def get_datetime_second():
@@ -585,15 +835,18 @@ class Context:
                 while not self.exit_event.is_set():
                     try:
                         next_wakeup = (second - get_datetime_second()) % self.auto_save_interval
-                        time.sleep(max(1.0, next_wakeup))
+                        self.save_requested.wait(max(1.0, next_wakeup))
+                        self.save_requested.clear()
                         if self.save_dirty:
                             self.logger.debug("Saving via thread.")
-                            self._save()
+                            # changes made while saving mark the save dirty again
+                            self.save_dirty = False
+                            if not self._save():
+                                self.save_dirty = True
                     except OperationalError as e:
+                        self.save_dirty = True
                         self.logger.exception(e)
                         self.logger.info(f"Saving failed. Retry in {self.auto_save_interval} seconds.")
-                    else:
-                        self.save_dirty = False
                 if not atexit_save:  # if atexit is used, that keeps a reference anyway
                     queue_gc()
 
@@ -605,7 +858,9 @@ class Context:
                 atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
+        # hints of other slots are rechecked whenever their location checks change
+        for team, slot in list(self.stale_hint_slots):
+            self.recheck_hints(team, slot)
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
@@ -650,6 +905,7 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        self.stale_hint_slots.update(self.hints)
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -668,6 +924,7 @@ class Context:
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        self.save_sequence = savedata.get("save_sequence", 0)
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -686,6 +943,10 @@ class Context:
         will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
         pair that has at least one hint modified will be added to the set.
         """
+        if self.stale_hint_slots:
+            self.stale_hint_slots = {(stale_team, stale_slot) for stale_team, stale_slot in self.stale_hint_slots
+                                     if (team is not None and team != stale_team) or
+                                     (slot is not None and slot != stale_slot)}
         for hint_team, hint_slot in self.hints:
             if team != hint_team and team is not None:
                 continue  # Check specified team only, all if team is None
@@ -856,6 +1117,7 @@ async def server(websocket: "ServerConnection", path: str = "/", ctx: Context =
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
+                ctx.received_packets += 1
                 await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
@@ -1022,19 +1284,26 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+    """Sends ReceivedItems to the clients of slots that got items since the last call, see Context.new_item_slots.
+    Clients of a slot that receive the same items share one encoded message."""
+    new_item_slots, ctx.new_item_slots = ctx.new_item_slots, set()
+    for team, slot in new_item_slots:
+        receivers: typing.Dict[typing.Tuple[bool, bool, int], typing.List[Client]] = {}
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if not client.no_items:
+                receivers.setdefault((client.remote_start_inventory, client.remote_items, client.send_index),
+                                     []).append(client)
+        for (remote_start_inventory, remote_items, send_index), clients in receivers.items():
+            start_inventory = get_start_inventory(ctx, slot, remote_start_inventory)
+            items = get_received_items(ctx, team, slot, remote_items)
+            if len(start_inventory) + len(items) > send_index:
+                first_new_item = max(0, send_index - len(start_inventory))
+                msg = ctx.dumper([{
+                    "cmd": "ReceivedItems",
+                    "index": send_index,
+                    "items": start_inventory[send_index:] + items[first_new_item:]}])
+                async_start(ctx.broadcast_send_encoded_msgs(clients, msg))
+                for client in clients:
                     client.send_index = len(start_inventory) + len(items)
 
 
@@ -1083,6 +1352,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_item_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1592,6 +1862,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_item_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -2101,7 +2372,11 @@ class ServerCommandProcessor(CommonCommandProcessor):
         """Save current state to multidata"""
         if self.ctx.saving:
             self.ctx.save(True)
-            self.output("Game saved")
+            if self.ctx.auto_saver_thread and threading.current_thread() is not self.ctx.auto_saver_thread:
+                # the auto saver thread writes it
+                self.output("Save requested")
+            else:
+                self.output("Game saved")
             return True
         else:
             self.output("Saving is disabled.")
@@ -2584,6 +2859,8 @@ async def main(args: argparse.Namespace):
 client_message_processor = ClientMessageProcessor
 
 if __name__ == '__main__':
+    # only import the worlds of games in the multidata
+    os.environ.setdefault("ARCHIPELAGO_LAZY_WORLDS", "1")
     try:
         asyncio.run(main(parse_args()))
     except asyncio.exceptions.CancelledError:
@@ -106,10 +106,20 @@ def _scan_for_TypedTuples(obj: typing.Any) -> typing.Any:
     return obj
 
 
+def _encode_default(obj: typing.Any) -> typing.Any:
+    # read-only collections that are not dicts or sets, like the WebHost's shared static game data
+    if isinstance(obj, typing.Mapping):
+        return dict(obj.items())
+    if isinstance(obj, typing.AbstractSet):
+        return list(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
 _encode = JSONEncoder(
     ensure_ascii=False,
     check_circular=False,
     separators=(',', ':'),
+    default=_encode_default,
 ).encode
 
 
@@ -403,20 +413,34 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
-    def find_item(self, slots: typing.Set[int], seeked_item_id: int
-                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        # inverted indices, so hints and collects only have to look at matching locations
+        self._item_index: typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int]]] = {}
+        self._receiver_index: typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int, int, int]]]] \
+            = {}
         for finding_player, check_data in self.items():
             for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+                found = finding_player, location_id, item_id, receiving_player, item_flags
+                self._item_index.setdefault(item_id, []).append(found)
+                self._receiver_index.setdefault(receiving_player, {}).setdefault(item_id, []).append(found)
+
+    def find_item(self, slots: typing.Set[int], seeked_item_id: int
+                  ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        matches = [self._receiver_index[slot][seeked_item_id] for slot in slots
+                   if seeked_item_id in self._receiver_index.get(slot, ())]
+        if len(matches) == 1:
+            yield from matches[0]
+        elif matches:
+            # interleave the matches of multiple slots in location order
+            for found in self._item_index[seeked_item_id]:
+                if found[3] in slots:
+                    yield found
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        for item_locations in self._receiver_index.get(slot, {}).values():
+            for source_slot, location_id, *_ in item_locations:
+                all_locations[source_slot].add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
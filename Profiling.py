@@ -0,0 +1,303 @@
+"""
+Profiling of generation, enabled by Generate's --profile.
+
+While a GenerationProfile is active, it records the wall time and allocations of every world stage call and of
+stages of Main, like fill and balancing, how often locations, entrances and regions of each world are checked with
+can_reach and how long access rules take. The report is written as json and as folded stacks, which flamegraph tools
+like flamegraph.pl, speedscope or inferno read.
+"""
+from __future__ import annotations
+
+import collections
+import contextlib
+import dataclasses
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, ClassVar, ContextManager, Counter, Dict, Iterator, List, Optional, Tuple, \
+    TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from BaseClasses import CollectionState, MultiWorld, Region
+
+__all__ = ["GenerationProfile"]
+
+logger = logging.getLogger("Profiling")
+
+SpotKey = Tuple[Optional["Stage"], int, str, str]
+"""stage, player, spot type and spot name"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Stage:
+    name: str
+    player: Optional[int] = None
+    game: Optional[str] = None
+    """the game of a world type's stage method"""
+    parent: Optional[Stage] = None
+
+
+@dataclasses.dataclass
+class StageRecord:
+    calls: int = 0
+    time: float = 0.0
+    allocated: int = 0
+    """bytes still allocated when the stage returned"""
+    peak: int = 0
+    """most bytes allocated at once during the stage"""
+
+
+@dataclasses.dataclass
+class RuleRecord:
+    calls: int = 0
+    time: float = 0.0
+    """time in can_reach of the spot, without nested can_reach calls of other locations and entrances"""
+
+
+class _StageFrame:
+    __slots__ = ("stage", "start_memory", "peak")
+
+    def __init__(self, stage: Stage, start_memory: int) -> None:
+        self.stage = stage
+        self.start_memory = start_memory
+        self.peak = start_memory
+
+
+class GenerationProfile:
+    """
+    Records a generation while active, usable as a context manager. Only one profile can be active at a time.
+    Access rules and can_reach calls are recorded by temporarily wrapping can_reach of Location, Entrance and Region,
+    so overrides of can_reach in subclasses are not seen. Allocations are traced with tracemalloc, which slows
+    generation down noticeably. Stages running in parallel threads share the memory counters of tracemalloc.
+    """
+    active: ClassVar[Optional[GenerationProfile]] = None
+
+    multiworld: Optional[MultiWorld]
+    stages: Dict[Stage, StageRecord]
+    rules: Dict[SpotKey, RuleRecord]
+    can_reach_calls: Counter[Tuple[Optional[Stage], int, str]]
+    """per stage, player and spot type"""
+    top_rules: int
+    """amount of the slowest access rules to report"""
+
+    _local: threading.local
+    _originals: Dict[type, Callable[..., bool]]
+    _start: float
+    _time: float
+    _stop_tracing: bool
+
+    def __init__(self, top_rules: int = 50) -> None:
+        self.multiworld = None
+        self.stages = collections.defaultdict(StageRecord)
+        self.rules = collections.defaultdict(RuleRecord)
+        self.can_reach_calls = collections.Counter()
+        self.top_rules = top_rules
+        self._local = threading.local()
+        self._originals = {}
+        self._time = 0.0
+        self._stop_tracing = False
+
+    def __enter__(self) -> GenerationProfile:
+        from BaseClasses import Entrance, Location, Region
+        assert GenerationProfile.active is None, "Another GenerationProfile is already active."
+        GenerationProfile.active = self
+        self._stop_tracing = not tracemalloc.is_tracing()
+        if self._stop_tracing:
+            tracemalloc.start()
+        for spot_type in (Location, Entrance):
+            self._originals[spot_type] = spot_type.can_reach
+            spot_type.can_reach = self._wrap_access_check(spot_type.can_reach, spot_type.__name__)
+        self._originals[Region] = Region.can_reach
+        Region.can_reach = self._wrap_region_check(Region.can_reach)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._time = time.perf_counter() - self._start
+        for spot_type, can_reach in self._originals.items():
+            spot_type.can_reach = can_reach
+        self._originals.clear()
+        if self._stop_tracing:
+            tracemalloc.stop()
+        GenerationProfile.active = None
+
+    @classmethod
+    def attach(cls, multiworld: MultiWorld) -> None:
+        """Sets the multiworld the active profile, if any, reports on."""
+        if cls.active:
+            cls.active.multiworld = multiworld
+
+    @classmethod
+    def stage(cls, name: str, player: Optional[int] = None, game: Optional[str] = None) -> ContextManager[None]:
+        """Records the code in the context as a stage of the active profile, if any."""
+        profile = cls.active
+        if profile is None:
+            return contextlib.nullcontext()
+        return profile._record_stage(name, player, game)
+
+    def _get_stack(self) -> List[_StageFrame]:
+        stack: Optional[List[_StageFrame]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+            self._local.child_time = 0.0
+        return stack
+
+    @contextlib.contextmanager
+    def _record_stage(self, name: str, player: Optional[int], game: Optional[str]) -> Iterator[None]:
+        stack = self._get_stack()
+        parent = stack[-1] if stack else None
+        memory, peak = tracemalloc.get_traced_memory()
+        if parent:
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+        frame = _StageFrame(Stage(name, player, game, parent.stage if parent else None), memory)
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            taken = time.perf_counter() - start
+            stack.pop()
+            memory, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            if parent:
+                parent.peak = max(parent.peak, frame.peak)
+            record = self.stages[frame.stage]
+            record.calls += 1
+            record.time += taken
+            record.allocated += memory - frame.start_memory
+            record.peak = max(record.peak, frame.peak - frame.start_memory)
+
+    def _current_stage(self) -> Optional[Stage]:
+        stack = self._get_stack()
+        return stack[-1].stage if stack else None
+
+    def _wrap_access_check(self, can_reach: Callable[[Any, CollectionState], bool],
+                           spot_type: str) -> Callable[[Any, CollectionState], bool]:
+        def profiled_can_reach(spot: Any, state: CollectionState) -> bool:
+            stage = self._current_stage()
+            local = self._local
+            outer_child_time = local.child_time
+            local.child_time = 0.0
+            start = time.perf_counter()
+            try:
+                return can_reach(spot, state)
+            finally:
+                taken = time.perf_counter() - start
+                record = self.rules[stage, spot.player, spot_type, spot.name]
+                record.calls += 1
+                record.time += taken - local.child_time
+                local.child_time = outer_child_time + taken
+                self.can_reach_calls[stage, spot.player, spot_type] += 1
+
+        return profiled_can_reach
+
+    def _wrap_region_check(self, can_reach: Callable[[Region, CollectionState], bool]
+                           ) -> Callable[[Region, CollectionState], bool]:
+        def profiled_can_reach(region: Region, state: CollectionState) -> bool:
+            self.can_reach_calls[self._current_stage(), region.player, "Region"] += 1
+            return can_reach(region, state)
+
+        return profiled_can_reach
+
+    def get_stage_label(self, stage: Stage) -> str:
+        if stage.player is not None:
+            return f"{stage.name} ({self.get_world_label(stage.player)})"
+        if stage.game is not None:
+            return f"{stage.name} ({stage.game})"
+        return stage.name
+
+    def get_world_label(self, player: int) -> str:
+        if self.multiworld is None:
+            return f"Player {player}"
+        return f"Player {player} {self.multiworld.player_name[player]} ({self.multiworld.game[player]})"
+
+    def get_report(self) -> Dict[str, Any]:
+        """Returns the recording as json compatible data, with stage times in seconds and allocations in bytes."""
+        worlds: Dict[int, Dict[str, Any]] = {}
+
+        def get_world_stage(player: int, stage: Stage) -> Dict[str, Any]:
+            world = worlds.get(player)
+            if world is None:
+                world = worlds[player] = {"player": player, "time": 0.0, "rule_time": 0.0, "stages": {}}
+                if self.multiworld:
+                    world["name"] = self.multiworld.player_name[player]
+                    world["game"] = self.multiworld.game[player]
+            return world["stages"].setdefault(self.get_stage_label(stage) if stage.player is None else stage.name, {
+                "calls": 0, "time": 0.0, "allocated": 0, "peak": 0, "rule_time": 0.0,
+                "can_reach": {"Location": 0, "Entrance": 0, "Region": 0}})
+
+        stages: List[Dict[str, Any]] = []
+        for stage, record in self.stages.items():
+            if stage.player is None:
+                stages.append({"stage": self.get_stage_label(stage), "calls": record.calls, "time": record.time,
+                               "allocated": record.allocated, "peak": record.peak})
+            else:
+                # the same stage may be recorded nested in different stages
+                world_stage = get_world_stage(stage.player, stage)
+                world_stage["calls"] += record.calls
+                world_stage["time"] += record.time
+                world_stage["allocated"] += record.allocated
+                world_stage["peak"] = max(world_stage["peak"], record.peak)
+                worlds[stage.player]["time"] += record.time
+        for (stage, player, spot_type), calls in self.can_reach_calls.items():
+            get_world_stage(player, stage or Stage("other"))["can_reach"][spot_type] += calls
+        for (stage, player, spot_type, spot_name), record in self.rules.items():
+            get_world_stage(player, stage or Stage("other"))["rule_time"] += record.time
+            worlds[player]["rule_time"] += record.time
+            if not stage or stage.player != player:
+                # time spent outside of the world's own stages
+                worlds[player]["time"] += record.time
+        slowest_rules = sorted(self.rules.items(), key=lambda rule: rule[1].time, reverse=True)[:self.top_rules]
+        return {
+            "seed_name": self.multiworld.seed_name if self.multiworld else None,
+            "time": self._time,
+            "stages": sorted(stages, key=lambda stage: stage["time"], reverse=True),
+            "worlds": sorted(worlds.values(), key=lambda world: world["time"], reverse=True),
+            "slowest_rules": [{
+                "stage": self.get_stage_label(stage) if stage else None,
+                "player": player,
+                "type": spot_type,
+                "name": spot_name,
+                "calls": record.calls,
+                "time": record.time,
+            } for (stage, player, spot_type, spot_name), record in slowest_rules]
+        }
+
+    def get_folded_stacks(self) -> List[str]:
+        """Returns the recorded times in microseconds as folded stacks, one "frame;frame;frame count" per line."""
+        times: Dict[Tuple[str, ...], float] = {("generation",): self._time}
+
+        def get_stack(stage: Optional[Stage]) -> Tuple[str, ...]:
+            if stage is None:
+                return "generation",
+            return get_stack(stage.parent) + (self.get_stage_label(stage),)
+
+        for stage, record in self.stages.items():
+            times[get_stack(stage)] = record.time
+        for (stage, player, spot_type, spot_name), record in self.rules.items():
+            stack = get_stack(stage)
+            if not stage or stage.player != player:
+                stack += self.get_world_label(player),
+            stack += f"{spot_type} {spot_name}",
+            times[stack] = times.get(stack, 0.0) + record.time
+
+        # the times are totals including nested frames, while folded stacks count the time of the last frame only
+        self_times = dict(times)
+        for stack, taken in times.items():
+            for depth in range(len(stack) - 1, 0, -1):
+                if stack[:depth] in times:
+                    self_times[stack[:depth]] -= taken
+                    break
+        return [f"{';'.join(frame.replace(';', ',') for frame in stack)} {round(taken * 1_000_000)}"
+                for stack, taken in self_times.items() if taken > 0]
+
+    def write(self, file_base: str) -> None:
+        """Writes the report to file_base_profile.json and the folded stacks to file_base_profile.folded."""
+        with open(f"{file_base}_profile.json", "w", encoding="utf-8") as f:
+            json.dump(self.get_report(), f, indent=1)
+        with open(f"{file_base}_profile.folded", "w", encoding="utf-8") as f:
+            f.write("\n".join(self.get_folded_stacks()) + "\n")
+        logger.info(f"Wrote generation profile to {file_base}_profile.json and {file_base}_profile.folded")
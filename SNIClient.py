@@ -113,6 +113,33 @@ class SNIClientCommandProcessor(ClientCommandProcessor):
     #     return True
 
 
+class SNESReadCache:
+    """
+    Memory read with snes_read_multiple during the current game_watcher tick. snes_read answers reads of any part of it
+    from here instead of asking SNI again, until the next tick or until the memory is written with snes_write.
+    """
+    blocks: typing.List[typing.Tuple[int, bytes]]
+
+    def __init__(self) -> None:
+        self.blocks = []
+
+    def get(self, address: int, size: int) -> typing.Optional[bytes]:
+        for start, data in self.blocks:
+            if start <= address and address + size <= start + len(data):
+                return data[address - start:address - start + size]
+        return None
+
+    def add(self, address: int, data: bytes) -> None:
+        self.blocks.append((address, data))
+
+    def invalidate(self, address: int, size: int) -> None:
+        self.blocks = [(start, data) for start, data in self.blocks
+                       if start + len(data) <= address or address + size <= start]
+
+    def clear(self) -> None:
+        self.blocks = []
+
+
 class SNIContext(CommonContext):
     command_processor: typing.Type[SNIClientCommandProcessor] = SNIClientCommandProcessor
     game: typing.Optional[str] = None  # set in validate_rom
@@ -127,6 +154,7 @@ class SNIContext(CommonContext):
     snes_reconnect_address: typing.Optional[str]
     snes_recv_queue: "asyncio.Queue[bytes]"
     snes_request_lock: asyncio.Lock
+    snes_read_cache: SNESReadCache
     snes_write_buffer: typing.List[typing.Tuple[int, bytes]]
     snes_connector_lock: threading.Lock
     death_state: DeathState
@@ -153,6 +181,7 @@ class SNIContext(CommonContext):
         self.snes_reconnect_address = None
         self.snes_recv_queue = asyncio.Queue()
         self.snes_request_lock = asyncio.Lock()
+        self.snes_read_cache = SNESReadCache()
         self.snes_write_buffer = []
         self.snes_connector_lock = threading.Lock()
         self.death_state = DeathState.alive  # for death link flop behaviour
@@ -504,6 +533,7 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
 
         ctx.snes_state = SNESState.SNES_DISCONNECTED
         ctx.snes_recv_queue = asyncio.Queue()
+        ctx.snes_read_cache.clear()
         ctx.hud_message_queue = []
 
         ctx.rom = None
@@ -514,7 +544,20 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
             ctx.snes_autoreconnect_task = asyncio.create_task(snes_autoreconnect(ctx), name="snes auto-reconnect")
 
 
-async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+def coalesce_snes_ranges(ranges: typing.Iterable[typing.Tuple[int, int]]) -> typing.List[typing.Tuple[int, int]]:
+    """Merges adjacent and overlapping (address, size) ranges, returning them sorted by address."""
+    merged: typing.List[typing.Tuple[int, int]] = []
+    for address, size in sorted(ranges):
+        if merged and address <= merged[-1][0] + merged[-1][1]:
+            start, merged_size = merged[-1]
+            merged[-1] = start, max(merged_size, address + size - start)
+        else:
+            merged.append((address, size))
+    return merged
+
+
+async def _snes_get_address(ctx: SNIContext, ranges: typing.Sequence[typing.Tuple[int, int]]) -> typing.Optional[bytes]:
+    """Reads all (address, size) ranges with a single GetAddress request, returning their data concatenated."""
     try:
         await ctx.snes_request_lock.acquire()
 
@@ -529,13 +572,14 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
         GetAddress_Request: SNESRequest = {
             "Opcode": "GetAddress",
             "Space": "SNES",
-            "Operands": [hex(address)[2:], hex(size)[2:]]
+            "Operands": [operand for address, size in ranges for operand in (hex(address)[2:], hex(size)[2:])]
         }
         try:
             await ctx.snes_socket.send(dumps(GetAddress_Request))
         except ConnectionClosed:
             return None
 
+        size = sum(size for address, size in ranges)
         data: bytes = bytes()
         while len(data) < size:
             try:
@@ -544,7 +588,8 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
                 break
 
         if len(data) != size:
-            snes_logger.error('Error reading %s, requested %d bytes, received %d' % (hex(address), size, len(data)))
+            snes_logger.error('Error reading %s, requested %d bytes, received %d' %
+                              (", ".join(hex(address) for address, _ in ranges), size, len(data)))
             if len(data):
                 snes_logger.error(str(data))
                 snes_logger.warning('Communication Failure with SNI')
@@ -557,6 +602,37 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
         ctx.snes_request_lock.release()
 
 
+async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+    cached = ctx.snes_read_cache.get(address, size)
+    if cached is not None:
+        return cached
+    return await _snes_get_address(ctx, ((address, size),))
+
+
+async def snes_read_multiple(ctx: SNIContext, ranges: typing.Sequence[typing.Tuple[int, int]]
+                             ) -> typing.Optional[typing.List[bytes]]:
+    """
+    Reads multiple (address, size) ranges with a single request, merging adjacent and overlapping ones.
+    The read memory is kept in ctx.snes_read_cache for the rest of the game_watcher tick, so snes_read of any part of
+    it doesn't cost another request.
+
+    :return: The data of each range, in the order of ranges, or None if reading failed.
+    """
+    cache = ctx.snes_read_cache
+    cached = [cache.get(address, size) for address, size in ranges]
+    missing = coalesce_snes_ranges(address_size for address_size, data in zip(ranges, cached) if data is None)
+    if missing:
+        data = await _snes_get_address(ctx, missing)
+        if data is None:
+            return None
+        position = 0
+        for address, size in missing:
+            cache.add(address, data[position:position + size])
+            position += size
+    return [data if data is not None else typing.cast(bytes, cache.get(address, size))
+            for (address, size), data in zip(ranges, cached)]
+
+
 async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int, bytes]]) -> bool:
     try:
         await ctx.snes_request_lock.acquire()
@@ -568,6 +644,7 @@ async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int,
         PutAddress_Request: SNESRequest = {"Opcode": "PutAddress", "Operands": [], 'Space': 'SNES'}
         try:
             for address, data in write_list:
+                ctx.snes_read_cache.invalidate(address, len(data))
                 PutAddress_Request['Operands'] = [hex(address)[2:], hex(len(data))[2:]]
                 if ctx.snes_socket is not None:
                     await ctx.snes_socket.send(dumps(PutAddress_Request))
@@ -607,6 +684,7 @@ async def game_watcher(ctx: SNIContext) -> None:
         except asyncio.TimeoutError:
             pass
         ctx.watcher_event.clear()
+        ctx.snes_read_cache.clear()
 
         if not ctx.rom or not ctx.client_handler:
             ctx.finished_game = False
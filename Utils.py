@@ -12,6 +12,7 @@ import pickle
 import functools
 import io
 import collections
+import contextlib
 import importlib
 import logging
 import warnings
@@ -463,6 +464,102 @@ def restricted_loads(s: bytes) -> Any:
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+multidata_split_sections = frozenset(("slot_data",))
+"""Multidata sections that are stored as one part per key, so a single slot's data can be loaded on its own."""
+
+
+def compress_multidata(multidata: typing.Mapping[str, Any], level: int = 9, threads: int = 1) -> bytes:
+    """
+    Encodes multidata into the sectioned .archipelago format (version 4).
+    Every top level key is pickled and compressed on its own, so readers only have to decompress what they use.
+    Layout: format version byte, 4 byte little endian index length, compressed index, compressed sections.
+
+    :param level: zlib compression level of the sections, the result is readable the same way at every level
+    :param threads: amount of threads to compress sections in, zlib does not hold the GIL while compressing
+    """
+    import concurrent.futures
+    import zlib
+
+    def compress(value: Any) -> bytes:
+        return zlib.compress(pickle.dumps(value), level)
+
+    values: typing.List[Any] = []
+    for key, value in multidata.items():
+        if key in multidata_split_sections:
+            values.extend(value.values())
+        else:
+            values.append(value)
+    with concurrent.futures.ThreadPoolExecutor(min(threads, len(values))) if threads > 1 and len(values) > 1 \
+            else contextlib.nullcontext() as pool:
+        compressed_values = pool.map(compress, values) if pool else map(compress, values)
+
+        sections = bytearray()
+
+        def add_section() -> typing.Tuple[int, int]:
+            compressed = next(compressed_values)
+            start = len(sections)
+            sections.extend(compressed)
+            return start, len(compressed)
+
+        index: Dict[str, Any] = {}
+        for key, value in multidata.items():
+            if key in multidata_split_sections:
+                index[key] = {sub_key: add_section() for sub_key in value}
+            else:
+                index[key] = add_section()
+    compressed_index = zlib.compress(pickle.dumps(index), level)
+    return bytes([4]) + len(compressed_index).to_bytes(4, "little") + compressed_index + sections
+
+
+class LazyMultiData(typing.MutableMapping[Any, Any]):
+    """Multidata read from the sectioned .archipelago format, decompressing each section on first access."""
+    _sections: memoryview
+    _index: Dict[Any, Any]
+    _loaded: Dict[Any, Any]
+
+    def __init__(self, sections: memoryview, index: Dict[Any, Any]) -> None:
+        self._sections = sections
+        self._index = index
+        self._loaded = {}
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> LazyMultiData:
+        import zlib
+
+        view = memoryview(data)
+        index_length = int.from_bytes(view[1:5], "little")
+        index = restricted_loads(zlib.decompress(view[5:5 + index_length]))
+        return cls(view[5 + index_length:], index)
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._loaded:
+            return self._loaded[key]
+        section = self._index[key]
+        if isinstance(section, dict):
+            value = LazyMultiData(self._sections, section)
+        else:
+            import zlib
+
+            start, length = section
+            value = restricted_loads(zlib.decompress(self._sections[start:start + length]))
+        self._loaded[key] = value
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._index.setdefault(key, None)
+        self._loaded[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        del self._index[key]
+        self._loaded.pop(key, None)
+
+    def __iter__(self) -> typing.Iterator[Any]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
 class ByValue:
     """
     Mixin for enums to pickle value instead of name (restores pre-3.11 behavior). Use as left-most parent.
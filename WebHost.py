@@ -26,7 +26,7 @@ if not os.path.exists(configpath):  # fall back to config.yaml in home
 
 def get_app() -> "Flask":
     from WebHostLib import register, cache, app as raw_app
-    from WebHostLib.models import db
+    from WebHostLib.models import add_missing_columns, db
 
     app = raw_app
     if os.path.exists(configpath) and not app.config["TESTING"]:
@@ -50,6 +50,7 @@ def get_app() -> "Flask":
     register()
     cache.init_app(app)
     db.bind(**app.config["PONY"])
+    add_missing_columns()
     db.generate_mapping(create_tables=True)
     return app
 
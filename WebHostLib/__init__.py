@@ -25,6 +25,9 @@ app.jinja_env.filters['get_file_safe_name'] = get_file_safe_name
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# if set, the rooms of each hoster share one port, HOSTER_BASE_PORT + hoster index, and are told apart by their id in
+# the connection's path, e.g. /connect host:port/room-id. Clients have to support paths. Keep out of 49152-65535.
+app.config["HOSTER_BASE_PORT"] = 0
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -53,6 +56,8 @@ app.config["PONY"] = {
     'create_db': True
 }
 app.config["MAX_ROLL"] = 20
+# number of rooms whose decoded tracker data is kept between requests
+app.config["TRACKER_CACHE_ROOMS"] = 64
 app.config["CACHE_TYPE"] = "SimpleCache"
 app.config["HOST_ADDRESS"] = ""
 app.config["ASSET_RIGHTS"] = False
@@ -76,6 +81,18 @@ app.jinja_env.filters['suuid'] = lambda value: base64.urlsafe_b64encode(value.by
 app.jinja_env.filters["title_sorted"] = title_sorted
 
 
+def get_room_address(room) -> str:
+    """Returns the address to connect to a running room, with the room id as path if it shares its hoster's port."""
+    address = f"{app.config['HOST_ADDRESS']}:{room.last_port}"
+    base_port = app.config["HOSTER_BASE_PORT"]
+    if base_port and base_port <= room.last_port < base_port + app.config["HOSTERS"]:
+        address += "/" + app.jinja_env.filters["suuid"](room.id)
+    return address
+
+
+app.jinja_env.filters["room_address"] = get_room_address
+
+
 def register():
     """Import submodules, triggering their registering on flask routing.
     Note: initializes worlds subsystem."""
@@ -3,6 +3,9 @@ from __future__ import annotations
 import json
 import logging
 import multiprocessing
+import os
+import queue
+import socket
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
@@ -23,6 +26,30 @@ def stop():
     stop_event = _stop_event
     _stop_event = Event()  # new event for new threads
     stop_event.set()
+    notify_room_activity()
+    notify_generation_queued()
+
+
+def wait_for_activity(notifications: typing.Optional[socket.socket], stop_event: Event) -> bool:
+    """Waits for a notification, at most ACTIVITY_POLL_INTERVAL, or polls shortly without a notification socket.
+    Returns False once the thread should stop."""
+    if not notifications:
+        return not stop_event.wait(0.1)
+    try:
+        notifications.recv(1)
+    except socket.timeout:
+        return not stop_event.is_set()
+    # notifications that arrived meanwhile are covered by the next check as well
+    timeout = notifications.gettimeout()
+    notifications.settimeout(0)
+    try:
+        while True:
+            notifications.recv(1)
+    except BlockingIOError:
+        pass
+    finally:
+        notifications.settimeout(timeout)
+    return not stop_event.is_set()
 
 
 def handle_generation_success(seed_id):
@@ -99,27 +126,59 @@ def cleanup():
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
 
 
+def backfill_deadlines() -> None:
+    """set the deadline of rooms created before it was stored, so the autohost can find them by it"""
+    backfilled = 0
+    with db_session:
+        while True:
+            rooms = Room.select(lambda room: room.deadline is None)[:1000]
+            if not rooms:
+                break
+            for room in rooms:
+                room.deadline = room.last_activity + timedelta(seconds=room.timeout)
+            commit()
+            backfilled += len(rooms)
+    if backfilled:
+        logging.info(f"Set the deadline of {backfilled} Rooms.")
+
+
+def get_hoster(hosters: typing.Sequence[MultiworldInstance], room: Room) -> MultiworldInstance:
+    """Returns the hoster a room is running on, or the least loaded hoster if it is not running."""
+    for hoster in hosters:
+        if room.id in hoster.room_ids:
+            return hoster
+    return min(hosters, key=MultiworldInstance.get_load)
+
+
 def autohost(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autohost"):
                 cleanup()
+                backfill_deadlines()
                 hosters = []
                 for x in range(config["HOSTERS"]):
                     hoster = MultiworldInstance(config, x)
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                socket_path = get_activity_socket_path("autohost")
+                notifications = open_notification_socket(socket_path, ACTIVITY_POLL_INTERVAL)
+                try:
+                    while True:
+                        for hoster in hosters:
+                            hoster.update()
+                        with db_session:
+                            # every room before its deadline, also ones without new activity that shut down early,
+                            # found through the index on deadline; rooms still running are skipped by start_room
+                            rooms = select(room for room in Room if room.deadline > datetime.utcnow())
+                            for room in rooms:
+                                get_hoster(hosters, room).start_room(room)
+                        if not wait_for_activity(notifications, stop_event):
+                            break
+                finally:
+                    close_notification_socket(notifications, socket_path)
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -132,7 +191,8 @@ def autogen(config: dict):
         stop_event = _stop_event
         try:
             with Locker("autogen"):
-
+                # generators only import the worlds of the games they generate, inherited through the environment
+                os.environ.setdefault("ARCHIPELAGO_LAZY_WORLDS", "1")
                 with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
                                           initargs=(config,), maxtasksperchild=10) as generator_pool:
                     with db_session:
@@ -150,14 +210,22 @@ def autogen(config: dict):
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
-                    while not stop_event.wait(0.1):
-                        with db_session:
-                            # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
-                                generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation)
+                    socket_path = get_activity_socket_path("autogen")
+                    notifications = open_notification_socket(socket_path, ACTIVITY_POLL_INTERVAL)
+                    try:
+                        while True:
+                            with db_session:
+                                # for update locks the database row(s) during transaction,
+                                # preventing writes from elsewhere
+                                to_start = select(
+                                    generation for generation in Generation
+                                    if generation.state == STATE_QUEUED).for_update()
+                                for generation in to_start:
+                                    launch_generator(generator_pool, generation)
+                            if not wait_for_activity(notifications, stop_event):
+                                break
+                    finally:
+                        close_notification_socket(notifications, socket_path)
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -175,8 +243,13 @@ class MultiworldInstance():
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.shared_port = config["HOSTER_BASE_PORT"] + id if config["HOSTER_BASE_PORT"] else 0
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.load_reports = multiprocessing.Queue()
+        self.load: typing.Optional[HosterLoad] = None
+        self.unreported_clients = 0
+        """slots of rooms started since the last load report, which can't be part of it yet"""
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -186,19 +259,36 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.load_reports,
+                                                self.shared_port),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
-        while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
-        if room_id in self.room_ids:
+    def update(self):
+        """Collects the rooms that shut down and the latest load report of the hoster process."""
+        try:
+            while True:
+                self.room_ids.remove(self.rooms_shutting_down.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            while True:
+                self.load = self.load_reports.get_nowait()
+                self.unreported_clients = 0
+        except queue.Empty:
+            pass
+
+    def get_load(self) -> float:
+        return (self.load.score if self.load else 0) + self.unreported_clients
+
+    def start_room(self, room: Room):
+        if room.id in self.room_ids:
             pass  # should already be hosted currently.
         else:
-            self.room_ids.add(room_id)
-            self.rooms_to_start.put(room_id)
+            self.room_ids.add(room.id)
+            self.unreported_clients += len(room.seed.slots)
+            self.rooms_to_start.put(room.id)
 
     def stop(self):
         if self.process:
@@ -214,5 +304,7 @@ class MultiworldInstance():
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
-from .customserver import run_server_process, get_static_server_data
+from .customserver import ACTIVITY_POLL_INTERVAL, HosterLoad, close_notification_socket, \
+    get_activity_socket_path, get_static_server_data, notify_generation_queued, notify_room_activity, \
+    open_notification_socket, run_server_process
 from .generate import gen_game
@@ -1,28 +1,36 @@
 from __future__ import annotations
 
 import asyncio
-import collections
+import base64
+import contextlib
 import datetime
 import functools
 import logging
 import multiprocessing
+import os
 import pickle
 import random
 import socket
+import struct
+import tempfile
 import threading
 import time
 import typing
 import sys
+from http import HTTPStatus
+from multiprocessing.shared_memory import SharedMemory
+from uuid import UUID
 
 import websockets
-from pony.orm import commit, db_session, select
+from pony.orm import commit, db_session, delete, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert, \
+    apply_save_log
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, SaveDelta, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -57,10 +65,36 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+# seconds between checks for commands of a room that frontends on this machine notify, for ones on other machines
+COMMAND_POLL_INTERVAL = 60
+# seconds between checks for commands of a room without local sockets to be notified through
+COMMAND_POLL_INTERVAL_UNNOTIFIED = 5
+# seconds between checks for room activity and queued generations, which frontends on this machine notify about
+ACTIVITY_POLL_INTERVAL = 5
+# seconds between load reports of a hoster process to the autohost
+LOAD_REPORT_INTERVAL = 5
+
+
+class HosterLoad(typing.NamedTuple):
+    """Load of a hoster process, reported to the autohost to place new rooms on the least loaded hoster."""
+    rooms: int
+    clients: int
+    packets_per_second: float
+    rss: int
+    """resident memory in bytes, 0 if psutil is not installed"""
+    loop_lag: float
+    """seconds the event loop woke up late for the report"""
+
+    @property
+    def score(self) -> float:
+        """The load weighted in connected clients: 10 packets per second, 10ms of lag or 128MiB count as one."""
+        return self.clients + self.packets_per_second / 10 + self.loop_lag * 100 + self.rss / 2 ** 27
+
+
 class WebHostContext(Context):
     room_id: int
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
+    def __init__(self, static_server_data: typing.Mapping[str, typing.Any], logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
@@ -84,20 +118,32 @@ class WebHostContext(Context):
         for key, value in self.static_server_data.items():
             # NOTE: attributes are mutable and shared, so they will have to be copied before being modified
             setattr(self, key, value)
-        self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
+
+    def _load_world_game_data(self, games: typing.Iterable[str]):
+        pass  # static server data already has every installed game
 
     def listen_to_db_commands(self):
         cmdprocessor = DBCommandProcessor(self)
+        notifications = open_command_socket(self.room_id)
 
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
+        try:
+            while not self.exit_event.is_set():
+                with db_session:
+                    commands = select(command for command in Command if command.room.id == self.room_id)
+                    if commands:
+                        for command in commands:
+                            self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
+                            command.delete()
+                        commit()
+                if notifications:
+                    try:
+                        notifications.recv(1)
+                    except socket.timeout:
+                        pass  # commands may come from a frontend on another machine, which can't notify us
+                else:
+                    time.sleep(COMMAND_POLL_INTERVAL_UNNOTIFIED)
+        finally:
+            close_notification_socket(notifications, get_command_socket_path(self.room_id))
 
     @db_session
     def load(self, room_id: int):
@@ -119,6 +165,12 @@ class WebHostContext(Context):
         self.location_name_groups = {"Archipelago": static_location_name_groups.get("Archipelago", {})}
         missing_checksum = False
 
+        if "datapackage" not in multidata:
+            # Game rolled on old AP without any data package, use all static data
+            self.gamespackage = static_gamespackage
+            self.item_name_groups = static_item_name_groups
+            self.location_name_groups = static_location_name_groups
+
         for game in list(multidata.get("datapackage", {})):
             game_data = multidata["datapackage"][game]
             if "checksum" in game_data:
@@ -139,31 +191,38 @@ class WebHostContext(Context):
             self.item_name_groups[game] = static_item_name_groups.get(game, {})
             self.location_name_groups[game] = static_location_name_groups.get(game, {})
 
-        if not game_data_packages and not missing_checksum:
-            # all static -> use the static dicts directly
-            self.gamespackage = static_gamespackage
-            self.item_name_groups = static_item_name_groups
-            self.location_name_groups = static_location_name_groups
+        # only the games of this room are referenced, so the static data of other games doesn't get unpickled
         return self._load(multidata, game_data_packages, True)
 
     @db_session
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
-            savegame_data = Room.get(id=self.room_id).multisave
+            savegame_data = load_room_save(Room.get(id=self.room_id))
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                self.set_save(savegame_data)
             self._start_async_saving(atexit_save=False)
         threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
 
-    @db_session
     def _save(self, exit_save: bool = False) -> bool:
-        room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
-        # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
-        if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
-            room.last_activity = datetime.datetime.utcnow()
-        return True
+        snapshot, save = self._snapshot_save()
+        with self._save_lock, db_session:
+            room = Room.get(id=self.room_id)
+            delta = self._prepare_save(snapshot, save, exit_save)
+            if delta is None:
+                encoded_save = pickle.dumps({**save, "save_sequence": self.save_sequence + 1})
+                room.multisave = encoded_save
+                delete(save_delta for save_delta in SaveDelta if save_delta.room == room)
+            elif delta:
+                encoded_save = pickle.dumps(delta)
+                SaveDelta(room=room, sequence=self.save_sequence + 1, data=encoded_save)
+            # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
+            if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
+                room.last_activity = datetime.datetime.utcnow()
+            commit()
+            if delta is None or delta:
+                self._save_written(snapshot, save, len(encoded_save), delta is None)
+            return True
 
     def get_save(self) -> dict:
         d = super(WebHostContext, self).get_save()
@@ -171,37 +230,416 @@ class WebHostContext(Context):
         return d
 
 
+def load_room_save(room: Room, multisave: typing.Optional[bytes] = None) -> typing.Dict[str, typing.Any]:
+    """Loads the save of a room from its last full save and the deltas written since. Empty if it was never saved.
+
+    :param multisave: the already loaded room.multisave, loaded from room if not supplied
+    """
+    if multisave is None:
+        multisave = room.multisave
+    if not multisave:
+        return {}
+    deltas = select((save_delta.sequence, save_delta.data) for save_delta in SaveDelta
+                    if save_delta.room == room).order_by(1)
+    return apply_save_log(restricted_loads(multisave),
+                          ((sequence, restricted_loads(data)) for sequence, data in deltas))
+
+
+def get_command_socket_path(room_id: UUID) -> str:
+    return os.path.join(tempfile.gettempdir(), f"ap_room_{room_id.hex}.sock")
+
+
+def get_activity_socket_path(name: str) -> str:
+    """Path of the socket the autohost or autogen thread of this machine waits on, by name of the thread."""
+    return os.path.join(tempfile.gettempdir(), f"ap_{name}.sock")
+
+
+def is_notification_socket_open(path: str) -> bool:
+    """Returns True if a process waits on the notification socket at path, False if it doesn't exist or is left behind
+    by a process that didn't shut down cleanly."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def open_notification_socket(path: str, timeout: float) -> typing.Optional[socket.socket]:
+    """Opens a local socket to wait on for notifications, timing out after timeout seconds to check the database anyway.
+    Returns None if local sockets aren't supported or another process waits on path already, in which case the
+    database has to be polled."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    if is_notification_socket_open(path):
+        logging.warning(f"Notification socket {path} is in use by another process, polling instead.")
+        return None
+    notifications = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)  # left behind by a process that didn't shut down cleanly
+        notifications.bind(path)
+    except OSError as e:
+        logging.warning(f"Could not open notification socket {path}, polling instead: {e}")
+        notifications.close()
+        return None
+    notifications.settimeout(timeout)
+    return notifications
+
+
+def close_notification_socket(notifications: typing.Optional[socket.socket], path: str) -> None:
+    if notifications:
+        notifications.close()
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+
+
+def send_notification(path: str) -> None:
+    """Wakes up whatever waits on the notification socket at path, if it is on this machine."""
+    if not hasattr(socket, "AF_UNIX"):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as notifier:
+        with contextlib.suppress(OSError):
+            notifier.sendto(b"\0", path)
+
+
+def open_command_socket(room_id: UUID) -> typing.Optional[socket.socket]:
+    """Opens the socket a room waits on for notifications about new commands, so it doesn't have to poll the database.
+    Returns None if local sockets aren't supported, in which case the room polls more often."""
+    return open_notification_socket(get_command_socket_path(room_id), COMMAND_POLL_INTERVAL)
+
+
+def notify_room_commands(room_id: UUID) -> None:
+    """Wakes up the room to run its new commands right away, if it is hosted on this machine.
+    Otherwise the room picks them up after COMMAND_POLL_INTERVAL."""
+    send_notification(get_command_socket_path(room_id))
+
+
+def notify_room_activity() -> None:
+    """Wakes up the autohost to start rooms with new activity right away, if it runs on this machine.
+    Otherwise it picks them up after ACTIVITY_POLL_INTERVAL."""
+    send_notification(get_activity_socket_path("autohost"))
+
+
+def notify_generation_queued() -> None:
+    """Wakes up the autogen to start queued generations right away, if it runs on this machine.
+    Otherwise it picks them up after ACTIVITY_POLL_INTERVAL."""
+    send_notification(get_activity_socket_path("autogen"))
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
 
+def get_room_id_from_path(path: str) -> typing.Optional[UUID]:
+    """Returns the room id from the path of a connection to a shared hoster port, a short uuid like in room urls."""
+    try:
+        return UUID(bytes=base64.urlsafe_b64decode(path.split("?", 1)[0].strip("/") + "=="))
+    except ValueError:
+        return None
+
+
+class RoutedRoomServer:
+    """
+    Takes the place of the websockets server of a room, for rooms sharing the port of their hoster process.
+    Like the server it stands in for, closing ws_server closes all connections to the room and stops accepting new ones.
+    """
+    def __init__(self, ctx: WebHostContext, routes: typing.Dict[UUID, WebHostContext]):
+        self.ctx = ctx
+        self.routes = routes
+        self.ws_server = self
+        routes[ctx.room_id] = ctx
+
+    def close(self) -> None:
+        if self.routes.get(self.ctx.room_id) is self.ctx:
+            del self.routes[self.ctx.room_id]
+        for client in list(self.ctx.endpoints):
+            asyncio.create_task(client.socket.close())
+
+
+class StaticServerData:
+    """
+    Static game data of all worlds, written into shared memory once by the launching process.
+    Room processes map the same memory and read it through views, so no process holds its own copy of the data.
+    """
+    categories = ("gamespackage", "item_name_groups", "location_name_groups", "non_hintable_names")
+
+    _memory: typing.Optional[SharedMemory]
+
+    def __init__(self, memory_name: str, index: typing.Dict[str, typing.Dict[str, typing.Any]]):
+        self.memory_name = memory_name
+        self.index = index
+        self._memory = None
+
+    @classmethod
+    def create(cls, games: typing.Dict[str, typing.Dict[str, typing.Any]]) -> StaticServerData:
+        buffer = bytearray()
+
+        def add(data: bytes) -> int:
+            offset = len(buffer)
+            buffer.extend(data)
+            return offset
+
+        def add_groups(groups: typing.Mapping[str, typing.Iterable[str]]) -> int:
+            member_offsets = [add(SharedNames.pack(list(members))) for members in groups.values()]
+            return add(SharedNames.pack(list(groups), member_offsets))
+
+        index: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        for game, game_data in games.items():
+            package = game_data["gamespackage"]
+            index[game] = {
+                # name to id tables are replaced by their offset
+                "gamespackage": {key: add(SharedNames.pack(list(value), list(value.values())))
+                                 if isinstance(value, dict) else value for key, value in package.items()},
+                "tables": frozenset(key for key, value in package.items() if isinstance(value, dict)),
+                "item_name_groups": add_groups(game_data["item_name_groups"]),
+                "location_name_groups": add_groups(game_data["location_name_groups"]),
+                "non_hintable_names": add(SharedNames.pack(list(game_data["non_hintable_names"]))),
+            }
+        memory = SharedMemory(create=True, size=max(1, len(buffer)))
+        memory.buf[:len(buffer)] = buffer
+        static_server_data = cls(memory.name, index)
+        static_server_data._memory = memory
+        return static_server_data
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        # only the location of the data is sent to room processes
+        return {"memory_name": self.memory_name, "index": self.index}
+
+    def __setstate__(self, state: typing.Dict[str, typing.Any]) -> None:
+        self.__init__(state["memory_name"], state["index"])
+
+    @property
+    def buffer(self) -> memoryview:
+        if self._memory is None:
+            self._memory = SharedMemory(name=self.memory_name)
+        return self._memory.buf
+
+    def get(self, game: str, category: str) -> typing.Any:
+        record = self.index[game]
+        if category == "gamespackage":
+            return SharedGamePackage(self.buffer, record)
+        if category == "non_hintable_names":
+            return SharedNames(self.buffer, record[category])
+        return SharedGroups(self.buffer, record[category])
+
+    def unlink(self) -> None:
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def as_dict(self) -> typing.Dict[str, typing.Mapping[str, typing.Any]]:
+        """Returns the data in the layout of Context's attributes."""
+        data: typing.Dict[str, typing.Mapping[str, typing.Any]] = {
+            category: StaticGameDataView(self, category) for category in self.categories
+        }
+        data["non_hintable_names"] = StaticGameDataView(self, "non_hintable_names", frozenset())
+        return data
+
+
+class StaticGameDataView(typing.Mapping[str, typing.Any]):
+    """Read-only mapping of game name to one category of StaticServerData"""
+    _missing: typing.Any
+
+    def __init__(self, data: StaticServerData, category: str, missing: typing.Any = None):
+        self.data = data
+        self.category = category
+        self._missing = missing
+
+    def __getitem__(self, game: str) -> typing.Any:
+        if game not in self.data.index:
+            if self._missing is None:
+                raise KeyError(game)
+            return self._missing
+        return self.data.get(game, self.category)
+
+    def __contains__(self, game: object) -> bool:
+        return game in self.data.index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.data.index)
+
+    def __len__(self) -> int:
+        return len(self.data.index)
+
+
+class SharedNames(typing.AbstractSet[str]):
+    """
+    Read-only set of names in shared memory, in their original order. Names are decoded when they are read, and looked
+    up by binary search over their encoded bytes.
+    Layout: count, whether numbers follow, count + 1 name offsets, count indices in sorted order, padding to 8 bytes,
+    count numbers if any, then the UTF-8 encoded names.
+    """
+    header = struct.Struct("<2I")
+
+    def __init__(self, buffer: memoryview, offset: int):
+        self.buffer = buffer
+        self.count, has_numbers = self.header.unpack_from(buffer, offset)
+        self.offsets = offset + self.header.size
+        self.order = self.offsets + 4 * (self.count + 1)
+        self.numbers = -(-(self.order + 4 * self.count) // 8) * 8
+        self.names = self.numbers + (8 * self.count if has_numbers else 0)
+
+    @classmethod
+    def pack(cls, names: typing.Sequence[str], numbers: typing.Optional[typing.Sequence[int]] = None) -> bytes:
+        """Returns names, and numbers belonging to them, in the layout read by SharedNames, padded to 8 bytes."""
+        encoded = [name.encode() for name in names]
+        offsets = [0]
+        for name in encoded:
+            offsets.append(offsets[-1] + len(name))
+        order = sorted(range(len(encoded)), key=encoded.__getitem__)
+        data = bytearray(cls.header.pack(len(encoded), numbers is not None))
+        data += struct.pack(f"<{len(offsets)}I{len(order)}I", *offsets, *order)
+        data += bytes(-len(data) % 8)
+        if numbers is not None:
+            data += struct.pack(f"<{len(numbers)}q", *numbers)
+        data += b"".join(encoded)
+        data += bytes(-len(data) % 8)
+        return bytes(data)
+
+    def find(self, name: object) -> int:
+        """Returns the position of name, or -1 if it is not in this set."""
+        if not isinstance(name, str):
+            return -1
+        key = name.encode()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            position, = struct.unpack_from("<I", self.buffer, self.order + 4 * middle)
+            start, end = struct.unpack_from("<2I", self.buffer, self.offsets + 4 * position)
+            candidate = bytes(self.buffer[self.names + start:self.names + end])
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return position
+        return -1
+
+    def number(self, position: int) -> int:
+        return struct.unpack_from("<q", self.buffer, self.numbers + 8 * position)[0]
+
+    def iter_numbers(self) -> typing.Iterator[int]:
+        return iter(struct.unpack_from(f"<{self.count}q", self.buffer, self.numbers))
+
+    def __contains__(self, name: object) -> bool:
+        return self.find(name) >= 0
+
+    def __iter__(self) -> typing.Iterator[str]:
+        offsets = struct.unpack_from(f"<{self.count + 1}I", self.buffer, self.offsets)
+        names = self.names
+        for start, end in zip(offsets, offsets[1:]):
+            yield str(self.buffer[names + start:names + end], "utf-8")
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SharedNameMapping(typing.Mapping[str, int]):
+    """Read-only mapping of names to numbers in shared memory, like a world's item_name_to_id"""
+
+    def __init__(self, buffer: memoryview, offset: int):
+        self.keys_view = SharedNames(buffer, offset)
+
+    def __getitem__(self, name: str) -> int:
+        position = self.keys_view.find(name)
+        if position < 0:
+            raise KeyError(name)
+        return self.keys_view.number(position)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.keys_view
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.keys_view)
+
+    def __len__(self) -> int:
+        return len(self.keys_view)
+
+    def items(self) -> typing.ItemsView[str, int]:
+        return SharedNameItems(self)
+
+    def values(self) -> typing.ValuesView[int]:
+        return SharedNameValues(self)
+
+
+class SharedNameItems(typing.ItemsView[str, int]):
+    _mapping: SharedNameMapping
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[str, int]]:
+        # reads the numbers in order, instead of looking up every name
+        return zip(self._mapping.keys_view, self._mapping.keys_view.iter_numbers())
+
+
+class SharedNameValues(typing.ValuesView[int]):
+    _mapping: SharedNameMapping
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return self._mapping.keys_view.iter_numbers()
+
+
+class SharedGroups(typing.Mapping[str, typing.AbstractSet[str]]):
+    """Read-only mapping of group names to their members in shared memory"""
+
+    def __init__(self, buffer: memoryview, offset: int):
+        self.keys_view = SharedNames(buffer, offset)
+
+    def __getitem__(self, name: str) -> SharedNames:
+        position = self.keys_view.find(name)
+        if position < 0:
+            raise KeyError(name)
+        return SharedNames(self.keys_view.buffer, self.keys_view.number(position))
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.keys_view
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.keys_view)
+
+    def __len__(self) -> int:
+        return len(self.keys_view)
+
+
+class SharedGamePackage(typing.Mapping[str, typing.Any]):
+    """Read-only data package of a game in shared memory, with its name to id tables read through SharedNameMapping"""
+
+    def __init__(self, buffer: memoryview, record: typing.Dict[str, typing.Any]):
+        self.buffer = buffer
+        self.package: typing.Dict[str, typing.Any] = record["gamespackage"]
+        self.tables: typing.FrozenSet[str] = record["tables"]
+
+    def __getitem__(self, key: str) -> typing.Any:
+        if key in self.tables:
+            return SharedNameMapping(self.buffer, self.package[key])
+        return self.package[key]
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self.package)
+
+    def __len__(self) -> int:
+        return len(self.package)
+
+
 @cache_argsless
-def get_static_server_data() -> dict:
+def get_static_server_data() -> StaticServerData:
+    import atexit
     import worlds
-    data = {
-        "non_hintable_names": {
-            world_name: world.hint_blacklist
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "gamespackage": {
-            world_name: {
+    static_server_data = StaticServerData.create({
+        game: {
+            "non_hintable_names": frozenset(game_data["hint_blacklist"]),
+            "gamespackage": {
                 key: value
-                for key, value in game_package.items()
+                for key, value in game_data["data_package"].items()
                 if key not in ("item_name_groups", "location_name_groups")
-            }
-            for world_name, game_package in worlds.network_data_package["games"].items()
-        },
-        "item_name_groups": {
-            world_name: world.item_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-        "location_name_groups": {
-            world_name: world.location_name_groups
-            for world_name, world in worlds.AutoWorldRegister.world_types.items()
-        },
-    }
-
-    return data
+            },
+            "item_name_groups": game_data["data_package"]["item_name_groups"],
+            "location_name_groups": game_data["data_package"]["location_name_groups"],
+        }
+        for game, game_data in worlds.get_game_data().items()
+    })
+    atexit.register(static_server_data.unlink)
+    return static_server_data
 
 
 def set_up_logging(room_id) -> logging.Logger:
@@ -224,9 +662,15 @@ def set_up_logging(room_id) -> logging.Logger:
     return logger
 
 
-def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
+def run_server_process(name: str, ponyconfig: dict, static_server_data: StaticServerData,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       load_reports: multiprocessing.Queue, shared_port: int = 0):
+    """
+    Runs rooms sent through rooms_to_run until the process is terminated.
+    If shared_port is set, all rooms share one listener on that port, which routes connections by the room id in the
+    path, instead of each room listening on its own port.
+    """
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -251,18 +695,21 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
 
     import gc
 
+    static_game_data = static_server_data.as_dict()
+
     if not cert_file:
         def get_ssl_context():
             return None
     else:
-        load_date = None
+        load_date = datetime.date.today()
         ssl_context = load_server_cert(cert_file, cert_key_file)
 
         def get_ssl_context():
-            nonlocal load_date, ssl_context
+            nonlocal load_date
             today = datetime.date.today()
             if load_date != today:
-                ssl_context = load_server_cert(cert_file, cert_key_file)
+                # reloaded in place, so a shared listener that is already open picks up the renewed certificate
+                ssl_context.load_cert_chain(cert_file, cert_key_file if cert_key_file else cert_file)
                 load_date = today
             return ssl_context
 
@@ -270,34 +717,62 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    room_contexts: typing.Dict[UUID, WebHostContext] = {}
+    routed_rooms: typing.Dict[UUID, WebHostContext] = {}
+    """rooms accepting connections on the shared port"""
+
+    async def report_load():
+        try:
+            import psutil
+        except ImportError:
+            process = None
+        else:
+            process = psutil.Process()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOAD_REPORT_INTERVAL)
+            elapsed = loop.time() - start
+            clients = packets = 0
+            for ctx in room_contexts.values():
+                clients += len(ctx.endpoints)
+                packets += ctx.received_packets
+                ctx.received_packets = 0
+            load_reports.put(HosterLoad(len(room_contexts), clients, packets / elapsed,
+                                        process.memory_info().rss if process else 0,
+                                        elapsed - LOAD_REPORT_INTERVAL))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(static_game_data, logger)
+                room_contexts[room_id] = ctx
                 ctx.load(room_id)
                 ctx.init_save()
                 assert ctx.server is None
-                try:
-                    ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=get_ssl_context())
-
-                    await ctx.server
-                except OSError:  # likely port in use
-                    ctx.server = websockets.serve(
-                        functools.partial(server, ctx=ctx), ctx.host, 0, ssl=get_ssl_context())
-
-                    await ctx.server
-                port = 0
-                for wssocket in ctx.server.ws_server.sockets:
-                    socketname = wssocket.getsockname()
-                    if wssocket.family == socket.AF_INET6:
-                        # Prefer IPv4, as most users seem to not have working ipv6 support
-                        if not port:
+                if shared_port:
+                    ctx.server = RoutedRoomServer(ctx, routed_rooms)
+                    port = shared_port
+                else:
+                    try:
+                        ctx.server = websockets.serve(
+                            functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=get_ssl_context())
+
+                        await ctx.server
+                    except OSError:  # likely port in use
+                        ctx.server = websockets.serve(
+                            functools.partial(server, ctx=ctx), ctx.host, 0, ssl=get_ssl_context())
+
+                        await ctx.server
+                    port = 0
+                    for wssocket in ctx.server.ws_server.sockets:
+                        socketname = wssocket.getsockname()
+                        if wssocket.family == socket.AF_INET6:
+                            # Prefer IPv4, as most users seem to not have working ipv6 support
+                            if not port:
+                                port = socketname[1]
+                        elif wssocket.family == socket.AF_INET:
                             port = socketname[1]
-                    elif wssocket.family == socket.AF_INET:
-                        port = socketname[1]
                 if port:
                     ctx.logger.info(f'Hosting game at {host}:{port}')
                     with db_session:
@@ -331,6 +806,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 try:
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
+                    notify_room_commands(room_id)  # stop waiting for commands
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
                     with (db_session):
                         # ensure the Room does not spin up again on its own, minute of safety buffer
@@ -339,6 +815,9 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                                              datetime.timedelta(minutes=1, seconds=room.timeout)
                     logging.info(f"Shutting down room {room_id} on {name}.")
                 finally:
+                    room_contexts.pop(room_id, None)
+                    if routed_rooms.get(room_id) is ctx:
+                        del routed_rooms[room_id]
                     await asyncio.sleep(5)
                     rooms_shutting_down.put(room_id)
 
@@ -363,6 +842,22 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logging.info(f"Starting room {next_room} on {name}.")
                 del task  # delete reference to task object
 
+    load_reporter = loop.create_task(report_load())
+    if shared_port:
+        def check_room(path: str, request_headers: typing.Any) -> typing.Optional[tuple]:
+            get_ssl_context()  # renews the certificate of the listener
+            if get_room_id_from_path(path) not in routed_rooms:
+                return HTTPStatus.NOT_FOUND, [], b"No room with this id is running on this port.\n"
+            return None
+
+        async def route_connection(websocket) -> None:
+            ctx = routed_rooms.get(get_room_id_from_path(websocket.path))
+            if ctx:  # otherwise the room closed since the request was checked
+                await server(websocket, websocket.path, ctx)
+
+        loop.run_until_complete(websockets.serve(route_connection, "", shared_port, ssl=get_ssl_context(),
+                                                 process_request=check_room))
+        logging.info(f"Hosting rooms of {name} at {host}:{shared_port}")
     starter = Starter()
     starter.daemon = True
     starter.start()
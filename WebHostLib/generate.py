@@ -19,6 +19,7 @@ from WebHostLib import app
 from settings import ServerOptions, GeneratorOptions
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
+from .customserver import notify_generation_queued
 from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
 from .upload import upload_zip_to_db
 
@@ -92,6 +93,7 @@ def start_generation(options: Dict[str, Union[dict, str]], meta: Dict[str, Any])
             state=STATE_QUEUED,
             owner=session["_id"])
         commit()
+        notify_generation_queued()
 
         return redirect(url_for("wait_seed", seed=gen.id))
     else:
@@ -140,6 +142,7 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
         erargs.skip_output = False
         erargs.spoiler_only = False
         erargs.csv_output = False
+        erargs.profile = False
 
         name_counter = Counter()
         for player, (playerfile, settings) in enumerate(gen_options.items(), 1):
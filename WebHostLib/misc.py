@@ -9,6 +9,7 @@ from werkzeug.utils import secure_filename
 
 from worlds.AutoWorld import AutoWorldRegister
 from . import app, cache
+from .customserver import notify_room_activity, notify_room_commands
 from .models import Seed, Room, Command, UUID, uuid4
 
 
@@ -175,6 +176,7 @@ def host_room_command(room: UUID):
         if cmd:
             Command(room=room, commandtext=cmd)
             commit()
+            notify_room_commands(room.id)
     return redirect(url_for("host_room", room=room.id))
 
 
@@ -190,6 +192,8 @@ def host_room(room: UUID):
                       or room.last_activity < now - datetime.timedelta(seconds=room.timeout))
     with db_session:
         room.last_activity = now  # will trigger a spinup, if it's not already running
+        commit()
+    notify_room_activity()
 
     browser_tokens = "Mozilla", "Chrome", "Safari"
     automated = ("update" in request.args
@@ -1,6 +1,8 @@
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, DatabaseError, PrimaryKey, Required, Set, Optional, buffer, LongStr, commit, db_session, \
+    rollback
 
 db = Database()
 
@@ -25,12 +27,21 @@ class Room(db.Entity):
     owner = Required(UUID, index=True)
     commands = Set('Command')
     seed = Required('Seed', index=True)
-    multisave = Optional(buffer, lazy=True)
+    multisave = Optional(buffer, lazy=True)  # last full save, see save_deltas for changes since
+    save_deltas = Set('SaveDelta')
     show_spoiler = Required(int, default=0)  # 0 -> never, 1 -> after completion, -> 2 always
     timeout = Required(int, default=lambda: 48 * 60 * 60)  # seconds since last activity to shutdown
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
+    # last_activity + timeout, the time the room shuts down without further activity. Index used by autohost
+    deadline = Optional(datetime, index=True)
+
+    def before_insert(self):
+        self.deadline = self.last_activity + timedelta(seconds=self.timeout)
+
+    def before_update(self):
+        self.deadline = self.last_activity + timedelta(seconds=self.timeout)
 
 
 class Seed(db.Entity):
@@ -50,6 +61,13 @@ class Command(db.Entity):
     commandtext = Required(str)
 
 
+class SaveDelta(db.Entity):
+    id = PrimaryKey(int, auto=True)
+    room = Required(Room, index=True)
+    sequence = Required(int)  # save_sequence of the room's save after this delta is applied
+    data = Required(bytes)
+
+
 class Generation(db.Entity):
     id = PrimaryKey(UUID, default=uuid4)
     owner = Required(UUID)
@@ -61,3 +79,31 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+def add_missing_columns() -> None:
+    """
+    generate_mapping only creates missing tables, so this adds columns that were added to existing tables since.
+    Has to be called after binding db and before generating its mapping.
+    """
+    provider = db.provider
+    table = provider.normalize_name("Room")
+    column = provider.normalize_name("deadline")
+    with db_session:
+        if not provider.table_exists(db.get_connection(), table):
+            return  # generate_mapping creates it with all columns
+        try:
+            # qualified, as SQLite reads an unknown quoted column name as a string
+            db.execute(f"SELECT {provider.quote_name(table)}.{provider.quote_name(column)} "
+                       f"FROM {provider.quote_name(table)} WHERE 0 = 1")
+        except DatabaseError:
+            rollback()
+        else:
+            return
+        sql_type = provider.get_converter_by_attr(Room.deadline).get_sql_type()
+        db.execute(f"ALTER TABLE {provider.quote_name(table)} ADD COLUMN {provider.quote_name(column)} {sql_type}")
+        index = provider.get_default_index_name(table, [column])
+        db.execute(f"CREATE INDEX {provider.quote_name(index)} ON {provider.quote_name(table)} "
+                   f"({provider.quote_name(column)})")
+        commit()
+    logging.info(f"Added the {column} column to the {table} table.")
@@ -1,18 +1,24 @@
+import copy
 import datetime
 import collections
+import hashlib
+import threading
+import weakref
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
+from typing import Any, Callable, Dict, List, MutableMapping, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
 from email.utils import parsedate_to_datetime
 
 from flask import make_response, render_template, request, Request, Response
+from pony.orm import select
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .customserver import load_room_save
+from .models import GameDataPackage, Room, SaveDelta
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
@@ -43,23 +49,37 @@ def _cache_results(func: Callable) -> Callable:
 
 @dataclass
 class TrackerData:
-    """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
+    """A helper dataclass for the tracker data of a room, kept between HTTP requests by get_tracker_data while the
+    room's multisave doesn't change.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
     subsequent helper method calls do not need to recompute results during the lifetime of this instance.
     """
     room: Room
-    _multidata: Dict[str, Any]
+    _multidata: MutableMapping[str, Any]
     _multisave: Dict[str, Any]
     _tracker_cache: Dict[str, Any]
 
-    def __init__(self, room: Room):
-        """Initialize a new RoomMultidata object for the current room."""
+    def __init__(self, room: Room, multisave: Optional[Dict[str, Any]] = None,
+                 seed_data: Optional["TrackerData"] = None):
+        """Initialize a new RoomMultidata object for the current room.
+
+        :param multisave: the already loaded save of the room, loaded from room if not supplied
+        :param seed_data: an earlier TrackerData of the same room, to reuse its multidata and lookup tables
+        """
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multisave = load_room_save(room) if multisave is None else multisave
         self._tracker_cache = {}
+        if seed_data:
+            self._multidata = seed_data._multidata
+            self.item_name_to_id = seed_data.item_name_to_id
+            self.location_name_to_id = seed_data.location_name_to_id
+            self.item_id_to_name = seed_data.item_id_to_name
+            self.location_id_to_name = seed_data.location_id_to_name
+            self._lookup_tables = seed_data._lookup_tables
+            return
 
+        self._multidata = Context.decompress(room.seed.multidata)
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
         self.location_name_to_id: Dict[str, Dict[str, int]] = {}
 
@@ -70,16 +90,17 @@ class TrackerData:
         self.location_id_to_name: Dict[str, Dict[int, str]] = KeyedDefaultDict(lambda game_name: {
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
+        # keeps the shared lookup tables alive for as long as this data is in use
+        self._lookup_tables: List[_LookupTables] = []
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            lookup_tables = _get_lookup_tables(game_package["checksum"])
+            self._lookup_tables.append(lookup_tables)
+            self.item_id_to_name[game] = lookup_tables.item_id_to_name
+            self.location_id_to_name[game] = lookup_tables.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = lookup_tables.item_name_to_id
+            self.location_name_to_id[game] = lookup_tables.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -140,12 +161,14 @@ class TrackerData:
         """Retrieves a set of all hints relevant for a particular player."""
         return self._multisave.get("hints", {}).get((team, player), set())
 
-    @_cache_results
     def get_player_last_activity(self, team: int, player: int) -> Optional[datetime.timedelta]:
         """Retrieves the relative timedelta for when a particular player was last active.
         Returns None if no activity was ever recorded.
         """
-        return self.get_room_last_activity().get((team, player), None)
+        timestamp = self._get_room_activity_timestamps().get((team, player), None)
+        if timestamp is None:
+            return None
+        return datetime.datetime.utcnow() - datetime.datetime.utcfromtimestamp(timestamp)
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
@@ -269,16 +292,23 @@ class TrackerData:
         return long_player_names
 
     @_cache_results
+    def _get_room_activity_timestamps(self) -> Dict[TeamPlayer, float]:
+        """Retrieves a dictionary of all players and the timestamp of their last activity."""
+        return {
+            (team, player): timestamp
+            for (team, player), timestamp in self._multisave.get("client_activity_timers", [])
+        }
+
     def get_room_last_activity(self) -> Dict[TeamPlayer, datetime.timedelta]:
         """Retrieves a dictionary of all players and the timedelta from now to their last activity.
         Does not include players who have no activity recorded.
+        Not cached, as TrackerData is kept across requests while the multisave doesn't change.
         """
-        last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = datetime.datetime.utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
-            last_activity[team, player] = now - datetime.datetime.utcfromtimestamp(timestamp)
-
-        return last_activity
+        return {
+            team_player: now - datetime.datetime.utcfromtimestamp(timestamp)
+            for team_player, timestamp in self._get_room_activity_timestamps().items()
+        }
 
     @_cache_results
     def get_room_videos(self) -> Dict[TeamPlayer, Tuple[str, str]]:
@@ -298,6 +328,69 @@ class TrackerData:
         return self._multidata.get("spheres", [])
 
 
+class _LookupTables:
+    """Id and name lookup tables of one game data package, shared by all TrackerData using its checksum."""
+    def __init__(self, game_package: Dict[str, Any]):
+        self.item_name_to_id: Dict[str, int] = game_package["item_name_to_id"]
+        self.location_name_to_id: Dict[str, int] = game_package["location_name_to_id"]
+        self.item_id_to_name: Dict[int, str] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+            id: name for name, id in self.item_name_to_id.items()})
+        self.location_id_to_name: Dict[int, str] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+            id: name for name, id in self.location_name_to_id.items()})
+
+
+class _TrackerCacheEntry(NamedTuple):
+    save_version: Tuple[bytes, Optional[int]]
+    tracker_data: TrackerData
+
+
+_lookup_tables: "weakref.WeakValueDictionary[str, _LookupTables]" = weakref.WeakValueDictionary()
+_tracker_data_cache: "collections.OrderedDict[UUID, _TrackerCacheEntry]" = collections.OrderedDict()
+_tracker_cache_lock = threading.Lock()
+
+
+def _get_lookup_tables(checksum: str) -> _LookupTables:
+    with _tracker_cache_lock:
+        lookup_tables = _lookup_tables.get(checksum, None)
+    if not lookup_tables:
+        lookup_tables = _LookupTables(restricted_loads(GameDataPackage.get(checksum=checksum).data))
+        with _tracker_cache_lock:
+            lookup_tables = _lookup_tables.setdefault(checksum, lookup_tables)
+    return lookup_tables
+
+
+def get_tracker_data(room: Room) -> TrackerData:
+    """Returns TrackerData for the room, reusing the data of previous requests as long as the multisave is unchanged.
+    If the multisave changed, only the multisave is loaded again.
+    Least recently used rooms are evicted once more than TRACKER_CACHE_ROOMS are cached.
+    """
+    multisave: bytes = room.multisave or b""
+    last_delta = select(save_delta.sequence for save_delta in SaveDelta if save_delta.room == room).max()
+    save_version = hashlib.blake2b(multisave, digest_size=16).digest(), last_delta
+    with _tracker_cache_lock:
+        cached = _tracker_data_cache.get(room.id, None)
+        if cached:
+            _tracker_data_cache.move_to_end(room.id)
+
+    if cached and cached.save_version == save_version:
+        # results of previous requests are still valid, only the database session changed
+        tracker_data = copy.copy(cached.tracker_data)
+        tracker_data.room = room
+        return tracker_data
+
+    if cached:
+        tracker_data = TrackerData(room, load_room_save(room, multisave), cached.tracker_data)
+    else:
+        tracker_data = TrackerData(room, load_room_save(room, multisave))
+
+    with _tracker_cache_lock:
+        _tracker_data_cache[room.id] = _TrackerCacheEntry(save_version, tracker_data)
+        _tracker_data_cache.move_to_end(room.id)
+        while len(_tracker_data_cache) > max(app.config["TRACKER_CACHE_ROOMS"], 1):
+            _tracker_data_cache.popitem(last=False)
+    return tracker_data
+
+
 def _process_if_request_valid(incoming_request: Request, room: Optional[Room]) -> Optional[Response]:
     if not room:
         abort(404)
@@ -341,7 +434,7 @@ def get_player_tracker(tracker: UUID, tracked_team: int, tracked_player: int, ge
 
 def get_timeout_and_player_tracker(room: Room, tracked_team: int, tracked_player: int, generic: bool)\
         -> Tuple[int, datetime.datetime, str]:
-    tracker_data = TrackerData(room)
+    tracker_data = get_tracker_data(room)
 
     # Load and render the game-specific player tracker, or fallback to generic tracker if none exists.
     game_specific_tracker = _player_trackers.get(tracker_data.get_player_game(tracked_team, tracked_player), None)
@@ -383,7 +476,7 @@ def get_multiworld_tracker(tracker: UUID, game: str) -> Response:
 
 def get_timeout_and_multiworld_tracker(room: Room, game: str)\
         -> Tuple[int, datetime.datetime, str]:
-    tracker_data = TrackerData(room)
+    tracker_data = get_tracker_data(room)
     enabled_trackers = list(get_enabled_multiworld_trackers(room).keys())
     if game in _multiworld_trackers:
         tracker = _multiworld_trackers[game](tracker_data, enabled_trackers)
@@ -483,7 +576,7 @@ def get_multiworld_sphere_tracker(tracker: UUID):
     if not room:
         abort(404)
 
-    tracker_data = TrackerData(room)
+    tracker_data = get_tracker_data(room)
     return render_generic_multiworld_sphere_tracker(tracker_data)
 
 
@@ -2212,7 +2305,8 @@ if "Starcraft 2" in network_data_package["games"]:
             "Progressive Protoss Air Armor":      104 + SC2LOTV_ITEM_ID_OFFSET,
         }
 
-        inventory: collections.Counter = tracker_data.get_player_inventory_counts(team, player)
+        # copied, as the cached inventory is shared with other trackers and later requests
+        inventory: collections.Counter = collections.Counter(tracker_data.get_player_inventory_counts(team, player))
         for grouped_item_name, grouped_item_id in grouped_item_ids.items():
             count: int = inventory[grouped_item_id]
             if count > 0:
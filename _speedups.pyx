@@ -13,7 +13,7 @@ import warnings
 from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
-from libc.stdint cimport int64_t, uint32_t
+from libc.stdint cimport int64_t, uint32_t, UINT32_MAX
 from collections import defaultdict
 
 cdef extern from *:
@@ -27,6 +27,7 @@ cdef extern from *:
 ctypedef uint32_t ap_player_t  # on AMD64 this is faster (and smaller) than 64bit ints
 ctypedef uint32_t ap_flags_t
 ctypedef int64_t ap_id_t
+ctypedef uint32_t ap_entry_index_t  # index into LocationStore.entries
 
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
@@ -84,6 +85,7 @@ cdef class LocationStore:
     # with sender, location, (item, receiver, flags).
     # This implementation is a flat list of (sender, location, item, receiver, flags) using native integers
     # as well as some mapping arrays used to speed up stuff, saving a lot of memory while speeding up hints.
+    # Hints and collects use the item and receiver indices, which point into entries in the same order as entries.
     # Using std::map might be worth investigating, but memory overhead would be ~100% compared to arrays.
 
     cdef Pool _mem
@@ -92,6 +94,10 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ap_entry_index_t* item_index  # 400KB/100k items, entries sorted by item
+    cdef ap_entry_index_t* receiver_index  # 400KB/100k items, entries sorted by receiver
+    cdef IndexEntry* receiver_ranges  # 16KB/1000 players, start and count in receiver_index
+    cdef size_t receiver_ranges_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +106,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(ap_entry_index_t) * self.entry_count * 2 + sizeof(IndexEntry) * self.receiver_ranges_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -117,6 +124,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -131,6 +139,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -144,15 +153,22 @@ cdef class LocationStore:
         if not count:
             warnings.warn("Game has no locations")
 
+        if count > UINT32_MAX:
+            raise ValueError("Too many locations")
+
         # allocate the arrays and invalidate index (0xff...)
         if count:
             # leaving entries as NULL if there are none, makes potential memory errors more visible
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+            self.item_index = <ap_entry_index_t*>self._mem.alloc(count, sizeof(ap_entry_index_t))
+            self.receiver_index = <ap_entry_index_t*>self._mem.alloc(count, sizeof(ap_entry_index_t))
+        self.receiver_ranges = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
 
         assert (not self.entries) == (not count)
         assert self.sender_index
+        assert self.receiver_ranges
         assert self._raw_proxies
 
         # build entries and index
@@ -170,8 +186,27 @@ cdef class LocationStore:
                     self.entries[i].flags = data[2]  # initialized to 0 during alloc
                 # Ignoring extra data. warn?
                 self.sender_index[sender].count += 1
+                self.receiver_ranges[self.entries[i].receiver].count += 1
                 i += 1
 
+        # build item index, keeping entries with the same item in order
+        items = [self.entries[i].item for i in range(count)]
+        for i, entry_index in enumerate(sorted(range(count), key=items.__getitem__)):
+            self.item_index[i] = entry_index
+        del items
+
+        # build receiver index, a counting sort that keeps entries with the same receiver in order
+        cdef size_t receiver_start = 0
+        for i in range(max_receiver + 1):
+            self.receiver_ranges[i].start = receiver_start
+            receiver_start += self.receiver_ranges[i].count
+            self.receiver_ranges[i].count = 0
+        cdef IndexEntry* receiver_range
+        for i in range(count):
+            receiver_range = self.receiver_ranges + self.entries[i].receiver
+            self.receiver_index[receiver_range.start + receiver_range.count] = i
+            receiver_range.count += 1
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -187,6 +222,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_ranges_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -215,21 +251,60 @@ cdef class LocationStore:
         return self._items
 
     # specialized accessors
+    cdef IndexEntry _find_item_range(self, ap_id_t item) noexcept nogil:
+        # binary search for the first and one past the last entry with item in item_index
+        cdef IndexEntry found
+        cdef size_t l = 0
+        cdef size_t r = self.entry_count
+        cdef size_t m
+        while l < r:
+            m = (l + r) // 2
+            if self.entries[self.item_index[m]].item < item:
+                l = m + 1
+            else:
+                r = m
+        found.start = l
+        r = self.entry_count
+        while l < r:
+            m = (l + r) // 2
+            if self.entries[self.item_index[m]].item <= item:
+                l = m + 1
+            else:
+                r = m
+        found.count = l - found.start
+        return found
+
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
         cdef ap_player_t receiver
         cdef ap_player_set* receivers
         cdef size_t slot_count = len(slots)
+        cdef IndexEntry item_range
+        cdef IndexEntry receiver_range
+        cdef LocationEntry* entry
+        cdef size_t i
         if slot_count == 1:
-            # specialized implementation for single slot
+            # specialized implementation for single slot, walking whichever index has fewer candidates
             receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+            if receiver >= self.receiver_ranges_size:
+                return
+            item_range = self._find_item_range(item)
+            receiver_range = self.receiver_ranges[receiver]
+            if receiver_range.count < item_range.count:
+                for i in range(receiver_range.start, receiver_range.start + receiver_range.count):
+                    entry = self.entries + self.receiver_index[i]
+                    if entry.item == item:
+                        yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+            else:
+                for i in range(item_range.start, item_range.start + item_range.count):
+                    entry = self.entries + self.item_index[i]
+                    if entry.receiver == receiver:
+                        yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
         elif slot_count:
             # generic implementation with lookup in set
+            item_range = self._find_item_range(item)
+            if not item_range.count:
+                return
             receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
             if not receivers:
                 raise MemoryError()
@@ -237,25 +312,27 @@ cdef class LocationStore:
                 for receiver in slots:
                     if not ap_player_set_add(receivers, receiver):
                         raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+                for i in range(item_range.start, item_range.start + item_range.count):
+                    entry = self.entries + self.item_index[i]
+                    if ap_player_set_contains(receivers, entry.receiver):
+                        yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
             finally:
                 ap_player_set_free(receivers)
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
         cdef ap_player_t receiver = slot
+        cdef LocationEntry* entry
+        cdef size_t i
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if receiver >= self.receiver_ranges_size:
+            return all_locations
+        cdef IndexEntry receiver_range = self.receiver_ranges[receiver]
+        for i in range(receiver_range.start, receiver_range.start + receiver_range.count):
+            entry = self.entries + self.receiver_index[i]
+            sender: int = entry.sender
+            if sender not in all_locations:
+                all_locations[sender] = set()
+            all_locations[sender].add(entry.location)
         return all_locations
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
@@ -5,7 +5,7 @@ import time
 from collections import deque
 from collections.abc import Callable, Iterable
 
-from BaseClasses import CollectionState, Entrance, Region, EntranceType
+from BaseClasses import CollectionState, Entrance, Item, Location, Region, EntranceType
 from Options import Accessibility
 from worlds.AutoWorld import World
 
@@ -136,6 +136,68 @@ class EntranceLookup:
         return len(self.dead_ends) + len(self.others)
 
 
+class AdvancementSweep:
+    """
+    Sweeps a CollectionState for advancements like CollectionState.sweep_for_advancements, while keeping an index of
+    the advancement locations that are not collected yet. Following sweeps only check the locations in newly reachable
+    regions and the ones whose access rule failed before, instead of filtering all filled locations of the multiworld.
+    """
+    unreached: dict[Region, list[Location]]
+    """Uncollected advancement locations by the region they are in, for regions that haven't been reached yet"""
+    blocked: set[Location]
+    """Uncollected advancement locations in reached regions, which couldn't be reached themselves"""
+    reached_regions: dict[int, set[Region]]
+    """The regions per player whose locations have been moved out of unreached"""
+
+    def __init__(self, state: CollectionState):
+        self.unreached = {}
+        self.blocked = set()
+        self.reached_regions = {player: set() for player in state.multiworld.get_all_ids()}
+        for location in state.multiworld.get_filled_locations():
+            if location.advancement and location not in state.advancements:
+                self.unreached.setdefault(location.parent_region, []).append(location)
+
+    def copy(self) -> "AdvancementSweep":
+        ret = AdvancementSweep.__new__(AdvancementSweep)
+        # the location lists are never modified, only removed from the dict as a whole
+        ret.unreached = self.unreached.copy()
+        ret.blocked = self.blocked.copy()
+        ret.reached_regions = {player: regions.copy() for player, regions in self.reached_regions.items()}
+        return ret
+
+    def _pop_newly_reached(self, state: CollectionState, player: int, candidates: list[Location]) -> None:
+        if state.stale[player]:
+            state.update_reachable_regions(player)
+        reached_regions = self.reached_regions[player]
+        for region in state.reachable_regions[player] - reached_regions:
+            reached_regions.add(region)
+            candidates.extend(self.unreached.pop(region, ()))
+
+    def sweep(self, state: CollectionState, players: Iterable[int]) -> None:
+        """
+        Collects all reachable advancements into state.
+
+        :param players: The players whose region graph changed since the last sweep, besides through collected items
+        """
+        changed_players = set(players)
+        while True:
+            candidates = list(self.blocked)
+            for player in changed_players:
+                self._pop_newly_reached(state, player, candidates)
+            reachable_advancements = [location for location in candidates if location.can_reach(state)]
+            self.blocked.update(candidates)
+            if not reachable_advancements:
+                return
+            self.blocked.difference_update(reachable_advancements)
+            state.unshare_locations()
+            changed_players = set()
+            for advancement in reachable_advancements:
+                state.advancements.add(advancement)
+                assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
+                if state.collect(advancement.item, True, advancement):
+                    changed_players.add(advancement.item.player)
+
+
 class ERPlacementState:
     """The state of an ongoing or completed entrance randomization"""
     placements: list[Entrance]
@@ -148,6 +210,7 @@ class ERPlacementState:
     """The CollectionState backing the entrance randomization logic"""
     coupled: bool
     """Whether entrance randomization is operating in coupled mode"""
+    _advancement_sweep: AdvancementSweep | None
 
     def __init__(self, world: World, coupled: bool):
         self.placements = []
@@ -155,6 +218,16 @@ class ERPlacementState:
         self.world = world
         self.coupled = coupled
         self.collection_state = world.multiworld.get_all_state(False, True)
+        self._advancement_sweep = None
+
+    def sweep_for_advancements(self) -> None:
+        """Collects the advancements that became reachable through the placements since the last sweep."""
+        if self._advancement_sweep is None:
+            self._advancement_sweep = AdvancementSweep(self.collection_state)
+            players = self.world.multiworld.get_all_ids()
+        else:
+            players = (self.world.player,)
+        self._advancement_sweep.sweep(self.collection_state, players)
 
     @property
     def placed_regions(self) -> set[Region]:
@@ -188,11 +261,15 @@ class ERPlacementState:
         copied_state = self.collection_state.copy()
         # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
         # propagate back to the real multiworld.
+        copied_state.unshare_player(self.world.player)
         copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
         copied_state.blocked_connections[self.world.player].remove(source_exit)
         copied_state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
         copied_state.update_reachable_regions(self.world.player)
-        copied_state.sweep_for_advancements()
+        if self._advancement_sweep is None:
+            copied_state.sweep_for_advancements()
+        else:
+            self._advancement_sweep.copy().sweep(copied_state, (self.world.player,))
         # test that at there are newly reachable randomized exits that are ACTUALLY reachable
         available_randomized_exits = copied_state.blocked_connections[self.world.player]
         for _exit in available_randomized_exits:
@@ -365,7 +442,7 @@ def randomize_entrances(
             entrance_lookup.remove(entrance)
         # propagate new connections
         er_state.collection_state.update_reachable_regions(world.player)
-        er_state.collection_state.sweep_for_advancements()
+        er_state.sweep_for_advancements()
         if on_connect:
             on_connect(er_state, placed_exits)
 
@@ -450,10 +527,8 @@ def randomize_entrances(
                                 # pretend that this was successful to retry the current stage
                                 return True
 
-            unplaced_entrances = [entrance for region in world.multiworld.get_regions(world.player)
-                                  for entrance in region.entrances if not entrance.parent_region]
-            unplaced_exits = [exit_ for region in world.multiworld.get_regions(world.player)
-                              for exit_ in region.exits if not exit_.connected_region]
+            unplaced_entrances = [*entrance_lookup.dead_ends, *entrance_lookup.others]
+            unplaced_exits = [exit_ for exit_ in exits if not exit_.connected_region]
             entrance_kind = "dead ends" if dead_end else "non-dead ends"
             region_access_requirement = "requires" if require_new_exits else "does not require"
             raise EntranceRandomizationError(
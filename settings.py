@@ -25,25 +25,26 @@ __all__ = [
 no_gui = False
 skip_autosave = False
 _world_settings_name_cache: dict[str, str] = {}  # TODO: cache on disk and update when worlds change
-_world_settings_name_cache_updated = False
+_world_settings_name_cache_updated = 0  # number of loaded worlds when the cache was last updated
 _lock = Lock()
 
 
 def _update_cache() -> None:
     """Load all worlds and update world_settings_name_cache"""
     global _world_settings_name_cache_updated
-    if _world_settings_name_cache_updated:
+    from worlds.AutoWorld import AutoWorldRegister
+    # with lazy loading, worlds imported after the last update still have to be added
+    if _world_settings_name_cache_updated == len(AutoWorldRegister.world_types):
         return
 
     try:
-        from worlds.AutoWorld import AutoWorldRegister
         for world in AutoWorldRegister.world_types.values():
             annotation = world.__annotations__.get("settings", None)
             if annotation is None or annotation == "ClassVar[Optional['Group']]":
                 continue
             _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
     finally:
-        _world_settings_name_cache_updated = True
+        _world_settings_name_cache_updated = len(AutoWorldRegister.world_types)
 
 
 def fmt_doc(cls: type, level: int) -> str:
@@ -675,6 +676,48 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class RollProcesses(int):
+        """
+        Processes to read player files and roll their options with. Results are identical to rolling in one process.
+        0 -> one per CPU core when there are many player files
+        1 -> no process pool
+        """
+
+    class OutputProcesses(int):
+        """
+        Processes to write the output files of worlds that declare output_in_process with, like patches of ROM games.
+        0 or 1 -> write all output in threads of the generating process
+        """
+
+    class GenerationProcesses(int):
+        """
+        Processes to run generate_early, create_regions and create_items of worlds that declare isolated_generation in.
+        Results are identical to running them in the generating process.
+        0 or 1 -> run all worlds in the generating process
+        """
+
+    class OutputCompression(str):
+        """
+        How the output zip compresses files that are not compressed yet, like the spoiler log.
+        stored, deflated, bzip2 or lzma, optionally followed by a level, like "deflated 6".
+        Patch files, multidata and other files that are compressed already are always stored as they are.
+        """
+
+        @property
+        def zip_arguments(self) -> typing.Tuple[int, typing.Optional[int]]:
+            """Returns the compression and compresslevel arguments of zipfile for this setting."""
+            import zipfile
+            name, _, level = self.partition(" ")
+            compression = {"stored": zipfile.ZIP_STORED, "deflated": zipfile.ZIP_DEFLATED,
+                           "bzip2": zipfile.ZIP_BZIP2, "lzma": zipfile.ZIP_LZMA}[name.strip().lower()]
+            return compression, int(level) if level.strip() else None
+
+    class MultidataCompressLevel(int):
+        """
+        zlib compression level of the multidata (.archipelago) from 0 to 9. Lower levels are faster but larger.
+        Every level can be read by any server that reads the current multidata format.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -684,6 +727,11 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    roll_processes: RollProcesses = RollProcesses(0)
+    output_processes: OutputProcesses = OutputProcesses(0)
+    generation_processes: GenerationProcesses = GenerationProcesses(0)
+    output_compression: OutputCompression = OutputCompression("deflated 9")
+    multidata_compresslevel: MultidataCompressLevel = MultidataCompressLevel(9)
     loglevel: str = "info"
     logtime: bool = False
 
@@ -849,6 +897,8 @@ class Settings(Group):
 
     def dump(self, f: TextIO, level: int = 0) -> None:
         # load all world setting classes
+        from worlds.AutoWorld import AutoWorldRegister
+        AutoWorldRegister.world_types.load_pending()
         _update_cache()
         for key in _world_settings_name_cache:
             self.__getattribute__(key)  # load all worlds
@@ -0,0 +1,58 @@
+def run_location_store_benchmark():
+    """Time hint and collect lookups of LocationStore and report the memory used by each implementation."""
+    import logging
+    import random
+    import tracemalloc
+    import typing
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from NetUtils import LocationStore, _LocationStore
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    players = 300
+    locations_per_player = 400
+    item_types = 200
+    lookups = 10_000
+
+    rnd = random.Random(0)
+    locations: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]] = {
+        player: {
+            location: (rnd.randrange(item_types), rnd.randint(1, players), 0)
+            for location in range(locations_per_player)
+        } for player in range(1, players + 1)
+    }
+
+    implementations = [("pure python", _LocationStore)]
+    if LocationStore is not _LocationStore:
+        implementations.append(("_speedups", LocationStore))
+
+    for name, store_type in implementations:
+        tracemalloc.start()
+        with TimeIt(f"{name} build of {players * locations_per_player} locations", logger):
+            store = store_type(locations)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        logger.info(f"{name} uses {memory / 1024 / 1024:.2f} MiB")
+
+        with TimeIt(f"{name} {lookups} single slot hints", logger):
+            for i in range(lookups):
+                for _ in store.find_item({i % players + 1}, i % item_types):
+                    pass
+        with TimeIt(f"{name} {lookups} team hints", logger):
+            for i in range(lookups):
+                for _ in store.find_item({i % players + 1, (i + 1) % players + 1}, i % item_types):
+                    pass
+        with TimeIt(f"{name} {players} collects", logger):
+            for player in range(1, players + 1):
+                store.get_for_player(player)
+        del store
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
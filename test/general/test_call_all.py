@@ -0,0 +1,70 @@
+import concurrent.futures
+import unittest
+from typing import Any, ClassVar, Tuple
+from unittest import mock
+
+from BaseClasses import MultiWorld
+from Main import get_generation_process_pool
+from worlds.AutoWorld import AutoWorldRegister, call_all, isolated_stages
+from . import gen_steps, setup_multiworld
+
+
+def summarize(multiworld: MultiWorld) -> Tuple[Any, ...]:
+    """Returns what the isolated stages create, in a form that can be compared between multiworlds."""
+    return (
+        [(item.name, item.player) for item in multiworld.itempool],
+        [(region.name, region.player, [location.name for location in region.locations],
+          [(exit_.name, exit_.connected_region.name if exit_.connected_region else None) for exit_ in region.exits])
+         for region in multiworld.get_regions()],
+        [(location.name, location.item.name) for location in multiworld.get_filled_locations()],
+        {player: [item.name for item in items] for player, items in multiworld.precollected_items.items()},
+        multiworld.early_items, multiworld.local_early_items,
+    )
+
+
+class TestIsolatedGeneration(unittest.TestCase):
+    pool: ClassVar[concurrent.futures.ProcessPoolExecutor]
+    isolated_worlds = [world_type for world_type in AutoWorldRegister.world_types.values()
+                       if world_type.isolated_generation]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        multiworld = setup_multiworld(cls.isolated_worlds, ())
+        with mock.patch("Main.get_settings") as get_settings:
+            get_settings.return_value.generator.generation_processes = 2
+            pool = get_generation_process_pool(multiworld)
+        assert isinstance(pool, concurrent.futures.ProcessPoolExecutor)
+        cls.pool = pool
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.pool.shutdown()
+
+    def test_results_identical(self) -> None:
+        """Tests that running the isolated stages in the pool gives the same results as running them here."""
+        for world_type in self.isolated_worlds:
+            with self.subTest(world_type.game):
+                serial = setup_multiworld([world_type, world_type], (), seed=1)
+                pooled = setup_multiworld([world_type, world_type], (), seed=1)
+                worlds = dict(pooled.worlds)
+                for stage in isolated_stages:
+                    call_all(serial, stage)
+                    call_all(pooled, stage, process_pool=self.pool)
+                self.assertEqual(summarize(serial), summarize(pooled))
+                for player in pooled.player_ids:
+                    self.assertIsNot(pooled.worlds[player], worlds[player])
+                    self.assertIs(pooled.worlds[player].multiworld, pooled)
+                # the merged regions and locations have to work with the stages that follow
+                for stage in gen_steps[len(isolated_stages):]:
+                    call_all(pooled, stage)
+                self.assertTrue(pooled.can_beat_game(pooled.get_all_state(False)))
+
+    def test_serial_fallback(self) -> None:
+        """Tests that isolated worlds that can't be pickled run in this process."""
+        world_type = self.isolated_worlds[0]
+        multiworld = setup_multiworld([world_type, world_type], (), seed=1)
+        unpicklable, picklable = multiworld.worlds[1], multiworld.worlds[2]
+        unpicklable.callback = lambda: None
+        call_all(multiworld, "generate_early", process_pool=self.pool)
+        self.assertIs(multiworld.worlds[1], unpicklable)
+        self.assertIsNot(multiworld.worlds[2], picklable)
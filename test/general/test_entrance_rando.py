@@ -436,6 +436,25 @@ class TestRandomizeEntrances(unittest.TestCase):
         self.assertTrue(("region0_right", "region4_left") in result.pairings
                         or ("region0_right2", "region4_left") in result.pairings)
 
+    def test_sweeps_events_of_placed_regions(self):
+        """tests that events are collected as their regions get placed, like a full sweep would"""
+        multiworld = generate_test_multiworld()
+        generate_disconnected_region_grid(multiworld, 3)
+        multiworld.get_region("region8", 1).add_event("Event 8")
+        # in an earlier placed region, but only reachable after region8 has been placed
+        multiworld.get_region("region0", 1).add_event("Event 0", rule=lambda state: state.has("Event 8", 1))
+        collected_events: list[set[str]] = []
+
+        def record_events(er_state: ERPlacementState, _: list[Entrance]):
+            full_state = er_state.collection_state.copy()
+            full_state.sweep_for_advancements()
+            self.assertEqual(full_state.advancements, er_state.collection_state.advancements)
+            collected_events.append({location.name for location in er_state.collection_state.advancements})
+
+        randomize_entrances(multiworld.worlds[1], True, directionally_matched_group_lookup, on_connect=record_events)
+        self.assertEqual({"Event 0", "Event 8"}, collected_events[-1])
+        self.assertNotIn({"Event 0"}, collected_events)
+
     def test_fails_when_mismatched_entrance_and_exit_count(self):
         """tests that entrance randomization fast-fails if the input exit and entrance count do not match"""
         multiworld = generate_test_multiworld()
@@ -134,6 +134,29 @@ class TestImplemented(unittest.TestCase):
                                       f"\n{reachable_only_with_explicit}")
                 self.fail("Unreachable")
 
+    def test_incremental_reachability_spheres(self):
+        """Tests that worlds using incremental reachability produce identical spheres as when rechecking every blocked
+        entrance."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            if not world_type.incremental_reachability:
+                continue
+            multiworld = setup_solo_multiworld(world_type)
+            world = multiworld.get_game_worlds(game_name)[0]
+            with self.subTest(game=game_name, seed=multiworld.seed):
+                distribute_items_restrictive(multiworld)
+                call_all(multiworld, "post_fill")
+
+                incremental_spheres = list(multiworld.get_spheres())
+                world.incremental_reachability = False
+                full_spheres = list(multiworld.get_spheres())
+
+                for sphere_num, (sphere_incremental, sphere_full) in enumerate(
+                        zip(incremental_spheres, full_spheres), start=1):
+                    self.assertEqual(sphere_incremental, sphere_full,
+                                     f"Sphere {sphere_num} differs with incremental reachability. Entrance access "
+                                     f"rules may depend on state that isn't changed through CollectionState.add_item.")
+                self.assertEqual(len(incremental_spheres), len(full_spheres))
+
     def test_no_items_or_locations_or_regions_submitted_in_init(self):
         """Test that worlds don't submit items/locations/regions to the multiworld in __init__"""
         for game_name, world_type in AutoWorldRegister.world_types.items():
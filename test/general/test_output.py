@@ -0,0 +1,104 @@
+import concurrent.futures
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+import zipfile
+from typing import Any, Tuple
+from unittest import mock
+
+from Main import get_output_process_pool, write_output_zip
+from settings import GeneratorOptions
+from worlds.AutoWorld import call_output
+from . import TestWorld, generate_test_multiworld
+
+
+def write_pid(output_data: Any, output_directory: str) -> None:
+    """Writes the ID of the process writing the output, to the path prepared for it."""
+    with open(output_data, "w") as f:
+        f.write(str(os.getpid()))
+
+
+class TestOutputInProcess(unittest.TestCase):
+    def test_call_output(self) -> None:
+        """Tests that output_in_process worlds prepare their output where they generate and write it in the pool."""
+        writing_threads = []
+
+        def prepare_output(world: TestWorld, output_directory: str) -> Tuple[str, str]:
+            self.assertIs(threading.current_thread(), threading.main_thread())
+            return os.path.join(output_directory, f"{world.player_name}.txt"), world.player_name
+
+        def write_output(output_data: Any, output_directory: str) -> None:
+            writing_threads.append(threading.current_thread())
+            file_path, contents = pickle.loads(pickle.dumps(output_data))
+            with open(file_path, "w") as f:
+                f.write(contents)
+
+        multiworld = generate_test_multiworld(2)
+        with mock.patch.object(TestWorld, "output_in_process", True), \
+                mock.patch.object(TestWorld, "prepare_output", prepare_output), \
+                mock.patch.object(TestWorld, "write_output", staticmethod(write_output)), \
+                tempfile.TemporaryDirectory() as temp_dir:
+            with concurrent.futures.ThreadPoolExecutor(1) as pool:
+                call_output(multiworld, 1, temp_dir, pool)
+            call_output(multiworld, 2, temp_dir)
+            self.assertIsNot(writing_threads[0], threading.main_thread())
+            self.assertIs(writing_threads[1], threading.main_thread())
+            for player in multiworld.player_ids:
+                with open(os.path.join(temp_dir, f"{multiworld.player_name[player]}.txt")) as f:
+                    self.assertEqual(f.read(), multiworld.player_name[player])
+
+    def test_process_pool(self) -> None:
+        """Tests that worlds write their output in the processes of the output pool, started from output threads."""
+        def prepare_output(world: TestWorld, output_directory: str) -> str:
+            return os.path.join(output_directory, f"{world.player_name}.txt")
+
+        multiworld = generate_test_multiworld(2)
+        with mock.patch.object(TestWorld, "output_in_process", True), \
+                mock.patch.object(TestWorld, "prepare_output", prepare_output), \
+                mock.patch.object(TestWorld, "write_output", staticmethod(write_pid)), \
+                mock.patch("Main.get_settings") as get_settings, \
+                tempfile.TemporaryDirectory() as temp_dir:
+            get_settings.return_value.generator.output_processes = 2
+            with get_output_process_pool(multiworld, list(multiworld.player_ids)) as process_pool:
+                self.assertIsInstance(process_pool, concurrent.futures.ProcessPoolExecutor)
+                with concurrent.futures.ThreadPoolExecutor(2) as pool:
+                    for future in [pool.submit(call_output, multiworld, player, temp_dir, process_pool)
+                                   for player in multiworld.player_ids]:
+                        future.result()
+            for player in multiworld.player_ids:
+                with open(os.path.join(temp_dir, f"{multiworld.player_name[player]}.txt")) as f:
+                    self.assertNotEqual(int(f.read()), os.getpid())
+
+
+class TestOutputZip(unittest.TestCase):
+    def test_write_output_zip(self) -> None:
+        """Tests that members compressed in the pool make up a valid zip with the same contents as the files."""
+        files = {
+            "AP_1_Spoiler.txt": b"spoiler " * 100000,
+            "AP_1.archipelago": os.urandom(1000),
+            "AP_1_P1.aplttp": b"PK\x03\x04" + os.urandom(1000),
+            "empty.txt": b"",
+        }
+        for output_compression in ("stored", "deflated 6", "bzip2", "lzma"):
+            with self.subTest(output_compression), \
+                    mock.patch("Main.get_settings") as get_settings, \
+                    tempfile.TemporaryDirectory() as temp_dir, \
+                    tempfile.TemporaryDirectory() as zip_dir:
+                get_settings.return_value.generator.output_compression = \
+                    GeneratorOptions.OutputCompression(output_compression)
+                compression, _ = get_settings.return_value.generator.output_compression.zip_arguments
+                for name, data in files.items():
+                    with open(os.path.join(temp_dir, name), "wb") as f:
+                        f.write(data)
+                zipfilename = os.path.join(zip_dir, "AP_1.zip")
+                with concurrent.futures.ThreadPoolExecutor(2) as pool:
+                    write_output_zip(zipfilename, temp_dir, pool)
+
+                with zipfile.ZipFile(zipfilename) as zf:
+                    self.assertIsNone(zf.testzip())
+                    self.assertEqual({name: zf.read(name) for name in zf.namelist()}, files)
+                    self.assertEqual(zf.getinfo("AP_1_Spoiler.txt").compress_type, compression)
+                    self.assertEqual(zf.getinfo("AP_1.archipelago").compress_type, zipfile.ZIP_STORED)
+                    self.assertEqual(zf.getinfo("AP_1_P1.aplttp").compress_type, zipfile.ZIP_STORED)
@@ -1,8 +1,11 @@
 import unittest
+from collections import Counter
+from unittest import mock
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, Item, ItemClassification, Region
+from Fill import distribute_items_restrictive
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld, gen_steps
+from . import generate_test_multiworld, setup_solo_multiworld, gen_steps
 
 
 class TestBase(unittest.TestCase):
@@ -79,3 +82,100 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+
+class TestIncrementalReachability(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.world = self.multiworld.worlds[1]
+        self.world.incremental_reachability = True
+        self.checks = Counter()
+        menu = self.multiworld.get_region("Menu", 1)
+        self.regions = {name: Region(name, 1, self.multiworld) for name in ("A", "B", "C", "D")}
+        self.multiworld.regions += self.regions.values()
+        self.connect(menu, "A", lambda state: state.has("Key A", 1))
+        self.connect(self.regions["A"], "B", lambda state: state.has_all(("Key A", "Key B"), 1))
+        self.connect(menu, "C", lambda state: state.has("Key C", 1, 2))
+        # iterates prog_items, so it can't be traced back to item names
+        self.connect(menu, "D", lambda state: len(state.prog_items[1]) >= 3)
+
+    def connect(self, source: Region, target: str, rule) -> None:
+        def counted_rule(state: CollectionState) -> bool:
+            self.checks[target] += 1
+            return rule(state)
+        source.connect(self.regions[target], f"To {target}", counted_rule)
+
+    def collect(self, state: CollectionState, item_name: str) -> None:
+        state.collect(Item(item_name, ItemClassification.progression, None, 1), True)
+
+    def reachable(self, state: CollectionState) -> set:
+        return {name for name, region in self.regions.items() if region.can_reach(state)}
+
+    def test_only_affected_entrances_rechecked(self) -> None:
+        """Tests that collecting an item only rechecks blocked entrances that depend on it."""
+        state = CollectionState(self.multiworld)
+        self.assertEqual(self.reachable(state), set())
+        self.checks.clear()
+        self.collect(state, "Key B")
+        self.assertEqual(self.reachable(state), set())
+        # "To A" and "To C" never read "Key B", "To D" is opaque
+        self.assertEqual(self.checks, Counter({"D": 1}))
+        self.checks.clear()
+        self.collect(state, "Key A")
+        self.assertEqual(self.reachable(state), {"A", "B"})
+        self.assertEqual(self.checks, Counter({"A": 1, "B": 1, "D": 1}))
+        self.checks.clear()
+        self.collect(state, "Key C")
+        self.assertEqual(self.reachable(state), {"A", "B", "D"})
+        self.assertEqual(self.checks, Counter({"C": 1, "D": 1}))
+        self.collect(state, "Key C")
+        self.assertEqual(self.reachable(state), {"A", "B", "C", "D"})
+
+    def test_matches_full_recheck(self) -> None:
+        """Tests that incremental reachability finds the same regions as rechecking every entrance."""
+        items = ("Key C", "Key B", "Key C", "Key A")
+        incremental_state = CollectionState(self.multiworld)
+        self.world.incremental_reachability = False
+        full_state = CollectionState(self.multiworld)
+        for item_name in items:
+            self.world.incremental_reachability = False
+            self.collect(full_state, item_name)
+            expected = self.reachable(full_state)
+            self.world.incremental_reachability = True
+            self.collect(incremental_state, item_name)
+            self.assertEqual(self.reachable(incremental_state), expected, item_name)
+            self.assertEqual(self.reachable(incremental_state.copy()), expected, item_name)
+
+    def test_untraceable_changes_recheck_everything(self) -> None:
+        """Tests that state changed without add_item falls back to rechecking every blocked entrance."""
+        state = CollectionState(self.multiworld)
+        self.assertEqual(self.reachable(state), set())
+        state.prog_items[1]["Key A"] += 1
+        state.stale[1] = True
+        self.assertEqual(self.reachable(state), {"A"})
+
+    def test_collect_without_add_item_rechecks_everything(self) -> None:
+        """Tests that World.collect changing state without add_item is detected, even after earlier add_item calls."""
+        state = CollectionState(self.multiworld)
+        self.assertEqual(self.reachable(state), set())
+        self.collect(state, "Key B")
+        self.assertIsInstance(state.stale[1], set)
+
+        def collect(state: CollectionState, item: Item) -> bool:
+            state.prog_items[1]["Key A"] += 1
+            return True
+        self.world.collect = collect
+        self.collect(state, "Key Ring")
+        self.assertEqual(self.reachable(state), {"A", "B"})
+
+    def test_spheres_match_full_recheck(self) -> None:
+        """Tests that A Link to the Past, which uses incremental reachability, finds the same spheres as without it."""
+        world_type = AutoWorldRegister.world_types["A Link to the Past"]
+        self.assertTrue(world_type.incremental_reachability)
+        multiworld = setup_solo_multiworld(world_type, seed=0)
+        distribute_items_restrictive(multiworld)
+        spheres = []
+        for incremental in (True, False):
+            with mock.patch.object(world_type, "incremental_reachability", incremental):
+                spheres.append([{location.name for location in sphere} for sphere in multiworld.get_spheres()])
+        self.assertEqual(spheres[0], spheres[1])
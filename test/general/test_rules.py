@@ -0,0 +1,116 @@
+import copy
+import pickle
+import unittest
+
+from BaseClasses import CollectionState, Item, ItemClassification, ItemIndex, Location, Region
+from worlds.generic.Rules import (And, CanReach, Count, Has, HasAll, HasAny, Lambda, Or, add_rule, always, never,
+                                  set_rule)
+from . import generate_test_multiworld
+
+
+class TestRuleTrees(unittest.TestCase):
+    def test_and_simplification(self) -> None:
+        """Tests that And flattens nested Ands, drops always and merges item rules of a player."""
+        rule = And(Has("A", 1), And(Has("B", 1), always), HasAll(["A", "C"], 1), Has("A", 1, 3), Has("A", 2))
+        self.assertIsInstance(rule, And)
+        self.assertEqual(set(rule.rules), {HasAll(["B", "C"], 1), Has("A", 1, 3), Has("A", 2)})
+        self.assertIs(And(Has("A", 1), never), never)
+        self.assertIs(And(always, always), always)
+        self.assertEqual(And(Has("A", 1), Has("A", 1)), Has("A", 1))
+
+    def test_or_simplification(self) -> None:
+        """Tests that Or flattens nested Ors, drops never and merges item rules of a player."""
+        rule = Or(Has("A", 1, 2), Or(Has("A", 1, 3), never), HasAny(["B", "C"], 1), Has("B", 1, 2), CanReach("R", 1))
+        self.assertIsInstance(rule, Or)
+        self.assertEqual(set(rule.rules), {Has("A", 1, 2), HasAny(["B", "C"], 1), CanReach("R", 1)})
+        self.assertIs(Or(Has("A", 1), always), always)
+        self.assertIs(Or(never, never), never)
+
+    def test_constant_item_rules(self) -> None:
+        """Tests that item rules that don't depend on the state decide a combination instead of being merged away."""
+        self.assertIs(Or(Has("A", 1, 0), Has("B", 1), Has("C", 1)), always)
+        self.assertIs(Or(Count(["A", "B"], 1, 0), Has("C", 1)), always)
+        self.assertIs(And(HasAny([], 1), Has("C", 1)), never)
+        self.assertEqual(And(HasAll([], 1), Has("A", 1, -1), Has("C", 1)), Has("C", 1))
+
+    def test_pickle(self) -> None:
+        """Tests that combinations survive pickling and deep copies, as part of a multiworld or on their own."""
+        rule = And(Has("A", 1, 2), Or(HasAny(["B", "C"], 1), CanReach("R", 1)), HasAll(["D", "E"], 1))
+        for copied in (pickle.loads(pickle.dumps(rule)), copy.deepcopy(rule)):
+            self.assertIsInstance(copied, And)
+            self.assertEqual(copied, rule)
+        self.assertIs(pickle.loads(pickle.dumps(always)), always)
+        self.assertIs(copy.deepcopy(never), never)
+
+    def test_evaluation(self) -> None:
+        """Tests that rule trees evaluate like the equivalent lambdas, also when their last decisive rule changes."""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        cave = Region("Cave", 1, multiworld)
+        multiworld.regions.append(cave)
+        menu.connect(cave, "Cave Entrance", Has("Lamp", 1))
+        location = Location(1, "Chest", None, menu)
+        menu.locations.append(location)
+        set_rule(location, Count(["Key", "Big Key"], 1, 2))
+        add_rule(location, lambda state: state.has("Sword", 1))
+        add_rule(location, CanReach("Cave", 1) | HasAny(["Bombs", "Hookshot"], 1), "and")
+        self.assertIsInstance(location.access_rule, And)
+        self.assertEqual(sum(isinstance(rule, Lambda) for rule in location.access_rule.rules), 1)
+
+        def collect(*item_names: str) -> CollectionState:
+            state = CollectionState(multiworld)
+            for item_name in item_names:
+                state.collect(Item(item_name, ItemClassification.progression, None, 1), True)
+            return state
+
+        self.assertFalse(location.can_reach(collect()))
+        self.assertFalse(location.can_reach(collect("Key", "Key")))
+        self.assertFalse(location.can_reach(collect("Key", "Big Key", "Sword")))
+        self.assertTrue(location.can_reach(collect("Key", "Big Key", "Sword", "Lamp")))
+        self.assertTrue(location.can_reach(collect("Key", "Key", "Sword", "Hookshot")))
+        self.assertFalse(location.can_reach(collect("Key", "Sword", "Hookshot")))
+        self.assertFalse(location.can_reach(collect("Key", "Key", "Hookshot")))
+
+    def test_cache(self) -> None:
+        """Tests that combinations cache their result per state, until the state or its reachable regions change."""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        cave = Region("Cave", 1, multiworld)
+        multiworld.regions.append(cave)
+        menu.connect(cave, "Cave Entrance", Has("Lamp", 1))
+        calls = []
+        rule = And(Has("Sword", 1), Or(CanReach("Cave", 1), Lambda(lambda state: calls.append(state) or False)))
+
+        state = CollectionState(multiworld)
+        state.collect(Item("Sword", ItemClassification.progression, None, 1), True)
+        state.update_reachable_regions(1)
+        self.assertFalse(rule(state))
+        self.assertFalse(rule(state))
+        self.assertEqual(len(calls), 1)
+        copied = state.copy()
+        self.assertFalse(rule(copied))
+        self.assertEqual(len(calls), 1)
+
+        copied.collect(Item("Lamp", ItemClassification.progression, None, 1), True)
+        self.assertTrue(rule(copied))
+        self.assertFalse(rule(state))
+        self.assertEqual(len(calls), 2)
+
+    def test_indexed_item_counts(self) -> None:
+        """Tests that item rules read ItemCounts by index and evaluate like they do on a Counter."""
+        multiworld = generate_test_multiworld()
+        rules = [Has("Key", 1, 2), HasAll(["Key", "Sword"], 1), HasAny(["Bombs", "Sword"], 1),
+                 Count(["Key", "Big Key"], 1, 3), Has("Never Collected", 1)]
+        item_sets = [(), ("Key",), ("Key", "Key"), ("Sword", "Key"), ("Big Key", "Key", "Key"), ("Bombs",)]
+        results = {}
+        for indexed in (False, True):
+            multiworld.worlds[1].indexed_item_counts = indexed
+            for item_names in item_sets:
+                state = CollectionState(multiworld)
+                for item_name in item_names:
+                    state.collect(Item(item_name, ItemClassification.progression, None, 1), True)
+                for rule in (*rules, *map(pickle.loads, map(pickle.dumps, rules))):
+                    results.setdefault((rule, item_names), set()).add(rule(state))
+        self.assertTrue(all(len(result) == 1 for result in results.values()), results)
+        item_index = ItemIndex.get(type(multiworld.worlds[1]))
+        self.assertEqual(rules[1]._indices, (item_index, (item_index.indices["Key"], item_index.indices["Sword"])))
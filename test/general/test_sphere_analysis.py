@@ -0,0 +1,29 @@
+import unittest
+
+from BaseClasses import SphereAnalysis
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import setup_solo_multiworld
+
+
+class TestSphereAnalysis(unittest.TestCase):
+    def test_matches_separate_sweeps(self):
+        """Tests that the shared sweep gives the same results as the accessibility check and beatability sweeps."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest(game=game_name):
+                multiworld = setup_solo_multiworld(world_type)
+                distribute_items_restrictive(multiworld)
+                call_all(multiworld, "post_fill")
+                sphere_analysis = SphereAnalysis(multiworld, record_states=True)
+                self.assertEqual(sphere_analysis.beatable, multiworld.can_beat_game())
+                if multiworld.get_filled_locations():  # without locations, the sweep can't confirm accessibility
+                    self.assertEqual(multiworld.fulfills_accessibility(sphere_analysis=sphere_analysis),
+                                     multiworld.fulfills_accessibility())
+                self.assertEqual(len(sphere_analysis.states), len(sphere_analysis.events))
+                self.assertEqual(len(sphere_analysis.events), len(sphere_analysis.spheres) + 1)
+
+                reached = {location for sphere in sphere_analysis.spheres for location in sphere}
+                reached.update(location for events in sphere_analysis.events for location in events)
+                self.assertEqual(reached | sphere_analysis.unreachable, set(multiworld.get_filled_locations()))
+                if all(multiworld.get_spheres()):  # no empty sphere before unreachable locations
+                    self.assertFalse(sphere_analysis.unreachable)
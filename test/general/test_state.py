@@ -1,7 +1,9 @@
 import unittest
+from collections import Counter
 
+from BaseClasses import CollectionState, Item, ItemClassification, ItemCounts, ItemIndex, Location, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +29,119 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            region = Region("Locked", player, self.multiworld)
+            self.multiworld.regions.append(region)
+            menu.connect(region, f"To Locked {player}", lambda state, p=player: state.has("Key", p))
+            region.add_event("Event", "Event Item", location_type=Location, item_type=Item)
+
+    def create_key(self, player: int) -> Item:
+        return Item("Key", ItemClassification.progression, None, player)
+
+    def test_copy_shares_until_modified(self) -> None:
+        """Tests that copies share per-player structures until one of the states modifies them."""
+        state = CollectionState(self.multiworld)
+        state.sweep_for_advancements()
+        copied_state = state.copy()
+        for player in self.multiworld.player_ids:
+            self.assertIs(state.prog_items[player], copied_state.prog_items[player])
+            self.assertIs(state.reachable_regions[player], copied_state.reachable_regions[player])
+        self.assertIs(state.path, copied_state.path)
+
+        copied_state.collect(self.create_key(1), True)
+        self.assertIsNot(state.prog_items[1], copied_state.prog_items[1])
+        self.assertIs(state.prog_items[2], copied_state.prog_items[2])
+
+    def test_search_shares_until_found(self) -> None:
+        """Tests that searching a copy for reachable regions only unshares its structures once it finds a new one."""
+        state = CollectionState(self.multiworld)
+        state.update_reachable_regions(1)
+        copied_state = state.copy()
+        copied_state.stale[1] = True
+        self.assertFalse(self.multiworld.get_region("Locked", 1).can_reach(copied_state))
+        self.assertIs(state.reachable_regions[1], copied_state.reachable_regions[1])
+        self.assertIs(state.blocked_connections[1], copied_state.blocked_connections[1])
+
+        copied_state.prog_items[1] = Counter({"Key": 1})  # replaced instead of modified, so nothing gets unshared
+        copied_state.stale[1] = True
+        self.assertTrue(self.multiworld.get_region("Locked", 1).can_reach(copied_state))
+        self.assertIsNot(state.reachable_regions[1], copied_state.reachable_regions[1])
+        self.assertNotIn(self.multiworld.get_region("Locked", 1), state.reachable_regions[1])
+
+    def test_modifications_stay_local(self) -> None:
+        """Tests that collecting into a copy or its source doesn't leak into the other state."""
+        state = CollectionState(self.multiworld)
+        locked = self.multiworld.get_region("Locked", 1)
+        event = self.multiworld.get_location("Event", 1)
+        self.assertFalse(locked.can_reach(state))
+        copied_state = state.copy()
+
+        copied_state.collect(self.create_key(1))
+        self.assertTrue(locked.can_reach(copied_state))
+        self.assertIn(event, copied_state.advancements)
+        self.assertFalse(locked.can_reach(state))
+        self.assertEqual(state.count("Key", 1), 0)
+        self.assertNotIn(event, state.advancements)
+        self.assertNotIn(locked, state.path)
+
+        state.collect(self.create_key(2), True)
+        self.assertEqual(copied_state.count("Key", 2), 0)
+        copied_state.remove(self.create_key(1))
+        self.assertFalse(locked.can_reach(copied_state))
+        self.assertEqual(state.count("Key", 1), 0)
+
+
+class TestItemCounts(unittest.TestCase):
+    class World:
+        item_name_to_id = {"Sword": 3, "Shield": 1, "Bow": 2}
+        item_name_groups = {"Weapons": {"Sword", "Bow"}, "Defense": {"Shield"}, "Nothing": set()}
+
+    def test_counts(self) -> None:
+        """Tests that ItemCounts counts like a Counter, also for names without an item ID."""
+        item_index = ItemIndex(self.World)  # type: ignore[arg-type]
+        self.assertEqual(item_index.names[1:], ["Shield", "Bow", "Sword"])
+        self.assertEqual(ItemCounts(item_index)["Unknown"], 0)
+        counts = ItemCounts(item_index)
+        counts["Sword"] += 2
+        counts.update(["Bow", "Event"])
+        self.assertEqual(counts["Sword"], 2)
+        self.assertEqual(counts["Shield"], 0)
+        self.assertEqual(counts["Event"], 1)
+        self.assertNotIn("Shield", counts)
+        self.assertIn("Event", counts)
+        self.assertEqual(dict(counts), {"Bow": 1, "Sword": 2, "Event": 1})
+        self.assertEqual(counts.total(), 4)
+        self.assertEqual(counts.count_group("Weapons"), 3)
+        self.assertEqual(counts.count_group_unique("Weapons"), 2)
+        self.assertEqual(counts.count_group("Defense"), 0)
+        self.assertEqual(counts.count_group("Nothing"), 0)
+
+        copied_counts = counts.copy()
+        del copied_counts["Sword"]
+        copied_counts["Late Event"] = 1
+        self.assertEqual(dict(copied_counts), {"Bow": 1, "Event": 1, "Late Event": 1})
+        self.assertEqual(counts["Sword"], 2)
+        self.assertEqual(counts["Late Event"], 0)
+
+    def test_collection_state(self) -> None:
+        """Tests that CollectionState uses ItemCounts for worlds with indexed_item_counts."""
+        multiworld = generate_test_multiworld(2)
+        multiworld.worlds[1].indexed_item_counts = True
+        state = CollectionState(multiworld)
+        self.assertIsInstance(state.prog_items[1], ItemCounts)
+        self.assertNotIsInstance(state.prog_items[2], ItemCounts)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        copied_state = state.copy()
+        self.assertTrue(copied_state.has("Key", 1, 2))
+        copied_state.remove(Item("Key", ItemClassification.progression, None, 1))
+        self.assertEqual(copied_state.count("Key", 1), 1)
+        self.assertEqual(state.count("Key", 1), 2)
+        copied_state.remove(Item("Key", ItemClassification.progression, None, 1))
+        self.assertFalse(copied_state.has("Key", 1))
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import worlds
+from worlds import DataPackageCache
+from worlds.AutoWorld import AutoWorldRegister, WorldTypes
+
+
+class TestWorldManifest(unittest.TestCase):
+    def test_manifest_matches_worlds(self):
+        """Tests that the manifest maps every loaded game to its unchanged world source."""
+        manifest = worlds.load_manifest()
+        if not manifest:
+            self.skipTest("World manifest could not be written.")
+        sources = {world_source.module_name: world_source for world_source in worlds.world_sources}
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            world_source = sources.get(".".join(world_type.__module__.split(".", 2)[:2]))
+            if world_source is None:
+                continue  # registered outside of worlds, like the test world
+            with self.subTest(game=game_name):
+                entry = manifest[world_source.resolved_path]
+                self.assertEqual(entry["key"], world_source.get_key())
+                self.assertIn(game_name, entry["games"])
+
+    def test_pending_worlds_load_on_lookup(self):
+        """Tests that pending games get their world source loaded once, when they are first looked up."""
+        world_types = WorldTypes()
+
+        class Source:
+            module_name = "worlds.test_pending_source"
+            loads = 0
+
+            def load(self) -> bool:
+                self.loads += 1
+                world_types["Game A"] = world_types["Game B"] = AutoWorldRegister.world_types["Archipelago"]
+                return True
+
+        source = Source()
+        world_types.pending.update({"Game A": source, "Game B": source})
+        self.assertEqual(list(world_types), [])
+        self.assertNotIn("Game C", world_types)
+        self.assertIsNone(world_types.get("Game C"))
+        self.assertIn("Game A", world_types)
+        self.assertIs(world_types["Game B"], AutoWorldRegister.world_types["Archipelago"])
+        self.assertEqual(source.loads, 1)
+        self.assertFalse(world_types.pending)
+        with self.assertRaises(KeyError):
+            world_types["Game C"]
+
+    def test_data_package_cache_roundtrip(self):
+        """Tests that the data package cache only loads for its key and unpickles games on first access."""
+        game_data = worlds.build_game_data({})
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                mock.patch.object(DataPackageCache, "get_path", return_value=os.path.join(temp_dir, "cache.bin")):
+            DataPackageCache.write("key", game_data)
+            self.assertIsNone(DataPackageCache.load("other key"))
+            cache = DataPackageCache.load("key")
+            self.assertIsNotNone(cache)
+            self.assertEqual(list(cache), list(game_data))
+            self.assertFalse(cache._loaded)
+            self.assertEqual(cache["Archipelago"], game_data["Archipelago"])
+            self.assertEqual(list(cache._loaded), ["Archipelago"])
+            del cache  # release the mapped file before cleanup
+
+    def test_game_data_matches_worlds(self):
+        """Tests that the game data, possibly read from the cache, matches the data of the loaded worlds."""
+        game_data = worlds.get_game_data()
+        for game_name, game_package in worlds.network_data_package["games"].items():
+            if game_name not in game_data:
+                continue  # registered outside of worlds, like the test world
+            with self.subTest(game=game_name):
+                cached_package = game_data[game_name]["data_package"]
+                for key in ("item_name_to_id", "location_name_to_id", "item_name_groups", "location_name_groups"):
+                    self.assertEqual(cached_package[key], game_package[key])
+                self.assertEqual(set(game_data[game_name]["hint_blacklist"]),
+                                 AutoWorldRegister.world_types[game_name].hint_blacklist)
@@ -112,6 +112,16 @@ class Base:
             self.assertEqual(sorted(self.store.find_item(set(range(2048)), 13)),
                              [(1, 13, 13, 1, 0)])
 
+        def test_find_item_order(self) -> None:
+            # indexed lookup has to produce the same results in the same order as scanning all locations
+            for slots in ({1}, {2}, {1, 2}, {1, 3, 4, 5}):
+                for item_id in (11, 12, 13, 21, 22, 23, 99):
+                    expected = [(sender, location, item, receiver, flags)
+                                for sender, locations in self.store.items()
+                                for location, (item, receiver, flags) in locations.items()
+                                if item == item_id and receiver in slots]
+                    self.assertEqual(list(self.store.find_item(slots, item_id)), expected)
+
         def test_get_for_player(self) -> None:
             self.assertEqual(self.store.get_for_player(3), {4: {9}})
             self.assertEqual(self.store.get_for_player(1), {1: {13}, 2: {22, 23}})
@@ -72,6 +72,25 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile(self):
+        import json
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--profile']
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        profile_base = os.path.join(self.output_tempdir.name, f"AP_{multiworld.seed_name}_profile")
+        with open(f"{profile_base}.json", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertEqual([world["player"] for world in report["worlds"]], [1])
+        self.assertIn("create_regions", report["worlds"][0]["stages"])
+        self.assertIn("fill", [stage["stage"] for stage in report["stages"]])
+        with open(f"{profile_base}.folded", encoding="utf-8") as f:
+            self.assertTrue(all(line.startswith("generation") for line in f.read().splitlines()))
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,8 +127,9 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile = None
 
-    def test_generate_yaml(self):
+    def generate_weights(self, *args: str) -> tuple:
         from settings import get_settings
         from Utils import user_path, local_path
         settings = get_settings()
@@ -119,15 +139,16 @@ class TestGenerateWeights(TestGenerateMain):
         user_path_backup = user_path.cached_path
         user_path.cached_path = local_path()
         try:
-            sys.argv = [sys.argv[0], "--seed", "1"]
-            namespace, seed = Generate.main()
+            sys.argv = [sys.argv[0], "--seed", "1", *args]
+            return Generate.main()
         finally:
             user_path.cached_path = user_path_backup
 
+    def assertWeightsResults(self, namespace, seed: int):
         # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
         expected_results = {
-            "accessibility": [0, 2, 0, 2, 2],
-            "progression_balancing": [0, 50, 99, 0, 50],
+            "accessibility": [0, 0, 0, 2, 2],
+            "progression_balancing": [0, 99, 0, 99, 0],
         }
 
         self.assertEqual(seed, 1)
@@ -137,3 +158,33 @@ class TestGenerateWeights(TestGenerateMain):
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+    def test_generate_yaml(self):
+        self.assertWeightsResults(*self.generate_weights("--roll_processes", "1"))
+
+    def test_generate_yaml_process_pool(self):
+        """Tests that rolling in a process pool gives the same results as rolling in one process."""
+        self.assertWeightsResults(*self.generate_weights("--roll_processes", "2"))
+
+
+class TestReadWeightsYamls(unittest.TestCase):
+    """Tests the parsed yaml cache of Generate.read_weights_yamls."""
+
+    def test_cache(self):
+        from unittest import mock
+
+        with TemporaryDirectory() as temp_dir, \
+                mock.patch("Generate.cache_path", lambda *path: os.path.join(temp_dir, "cache", *path)):
+            yaml_path = os.path.join(temp_dir, "player.yaml")
+            with open(yaml_path, "w") as f:
+                f.write("name: Player\ngame: Archipelago\n---\n")
+            parsed = Generate.read_weights_yamls(yaml_path)
+            self.assertEqual(parsed, ({"name": "Player", "game": "Archipelago"}, None))
+            self.assertEqual(len(os.listdir(os.path.join(temp_dir, "cache", "parsed_yaml"))), 1)
+
+            with mock.patch("Generate.parse_yamls", side_effect=AssertionError("cached yaml was parsed again")):
+                self.assertEqual(Generate.read_weights_yamls(yaml_path), parsed)
+
+            with open(yaml_path, "w") as f:
+                f.write("name: Other\ngame: Archipelago\n")
+            self.assertEqual(Generate.read_weights_yamls(yaml_path), ({"name": "Other", "game": "Archipelago"},))
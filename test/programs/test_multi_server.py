@@ -1,5 +1,19 @@
+import asyncio
+import os
+import pickle
+import random
+import tempfile
+import threading
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import unittest.mock
+import zlib
+from pathlib import Path
+
+from MultiServer import Client, Context, ServerCommandProcessor, apply_save_log, copy_save, get_save_delta, \
+    send_items_to, send_new_items
+from NetUtils import NetworkItem
+from Utils import LazyMultiData, compress_multidata, restricted_loads
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +52,186 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestMultidataFormat(unittest.TestCase):
+    def setUp(self) -> None:
+        with (Path(__file__).parent.parent / "webhost" / "data" / "One_Archipelago.archipelago").open("rb") as f:
+            self.legacy_data = f.read()
+
+    def test_roundtrip(self) -> None:
+        """Tests that the sectioned format contains the same data as the single compressed pickle."""
+        legacy = Context.decompress(self.legacy_data)
+        sectioned = Context.decompress(compress_multidata(legacy))
+        self.assertIsInstance(sectioned, LazyMultiData)
+        self.assertEqual(list(sectioned), list(legacy))
+        for key, value in legacy.items():
+            self.assertEqual(dict(sectioned[key]) if key == "slot_data" else sectioned[key], value, key)
+
+    def test_compression_settings(self) -> None:
+        """Tests that every compression level, compressed in threads or not, is read the same way."""
+        legacy = Context.decompress(self.legacy_data)
+        for level, threads in ((0, 1), (1, 4), (9, 4)):
+            with self.subTest(level=level, threads=threads):
+                sectioned = Context.decompress(compress_multidata(legacy, level, threads))
+                for key, value in legacy.items():
+                    self.assertEqual(dict(sectioned[key]) if key == "slot_data" else sectioned[key], value, key)
+
+    def test_lazy_sections(self) -> None:
+        """Tests that sections are only decompressed once accessed, and slot data per slot."""
+        legacy = Context.decompress(self.legacy_data)
+        sectioned = Context.decompress(compress_multidata(legacy))
+        with unittest.mock.patch("Utils.restricted_loads", wraps=restricted_loads) as loads:
+            slot_data = sectioned["slot_data"]
+            loads.assert_not_called()
+            self.assertEqual(slot_data[1], legacy["slot_data"][1])
+            self.assertEqual(slot_data[1], legacy["slot_data"][1])
+            self.assertEqual(loads.call_count, 1)
+            self.assertEqual(sectioned["version"], legacy["version"])
+            self.assertEqual(loads.call_count, 2)
+
+
+class NoGameDataContext(Context):
+    def _load_game_data(self) -> None:
+        pass  # not needed for these tests, and game data can only be loaded by one Context per process
+
+
+class SaveContext(NoGameDataContext):
+    save: typing.Dict[str, typing.Any]
+
+    def get_save(self) -> typing.Dict[str, typing.Any]:
+        return self.save
+
+
+class TestSaveDelta(unittest.TestCase):
+    def setUp(self) -> None:
+        self.save = {
+            "version": 2,
+            "received_items": {(0, 1, True): [NetworkItem(1, 2, 2, 0)]},
+            "location_checks": {(0, 1): {1, 2}, (0, 2): {3}},
+            "hints_used": {(0, 1): 1},
+            "random_state": random.Random(0).getstate(),
+        }
+
+    def test_delta_roundtrip(self) -> None:
+        """Tests that applying the delta between two saves recreates the later one, with only changes included."""
+        previous = copy_save(self.save)
+        self.save["received_items"][0, 1, True].append(NetworkItem(3, 4, 2, 0))
+        self.save["location_checks"][0, 2].add(4)
+        self.save["location_checks"][0, 3] = {5}
+        del self.save["hints_used"][0, 1]
+        self.save["random_state"] = random.Random(1).getstate()
+
+        delta = get_save_delta(previous, self.save)
+        self.assertEqual(delta["extend"]["received_items"], {(0, 1, True): [NetworkItem(3, 4, 2, 0)]})
+        self.assertEqual(delta["extend"]["location_checks"], {(0, 2): {4}})
+        self.assertNotIn((0, 1), delta["extend"]["location_checks"])
+        self.assertEqual(apply_save_log(previous, [(1, delta)]), {**self.save, "save_sequence": 1})
+        self.assertEqual(get_save_delta(self.save, copy_save(self.save)), {})
+
+    def test_copy_shares_unchanged(self) -> None:
+        """Tests that copies share entries of append only sections that did not grow with the previous copy."""
+        previous = copy_save(self.save)
+        self.save["location_checks"][0, 2].add(4)
+        copied = copy_save(self.save, previous)
+        self.assertIs(copied["location_checks"][0, 1], previous["location_checks"][0, 1])
+        self.assertIsNot(copied["location_checks"][0, 2], previous["location_checks"][0, 2])
+        self.assertIsNot(copied["location_checks"][0, 2], self.save["location_checks"][0, 2])
+        self.assertIs(copied["received_items"][0, 1, True], previous["received_items"][0, 1, True])
+        self.assertIsNot(copied["hints_used"], previous["hints_used"])
+        self.assertEqual(copied, self.save)
+
+    def test_save_log(self) -> None:
+        """Tests that saves append deltas to the log and that compaction writes a full save again."""
+        ctx = SaveContext("", 0, "", "", 0, 0, False)
+        ctx.save = self.save
+        with tempfile.TemporaryDirectory() as directory:
+            ctx.save_filename = os.path.join(directory, "test.apsave")
+
+            def load() -> typing.Dict[str, typing.Any]:
+                with open(ctx.save_filename, "rb") as f:
+                    return apply_save_log(pickle.loads(zlib.decompress(f.read())), ctx._read_save_log())
+
+            self.assertTrue(ctx._save())
+            self.assertFalse(os.path.exists(ctx.save_log_filename))
+            for item in range(3):
+                self.save["received_items"][0, 1, True].append(NetworkItem(item, 4, 2, 0))
+                self.assertTrue(ctx._save())
+            self.assertEqual(len(list(ctx._read_save_log())), 3)
+            self.assertEqual(load(), {**self.save, "save_sequence": 4})
+
+            self.assertTrue(ctx._save(True))
+            self.assertFalse(os.path.exists(ctx.save_log_filename))
+            self.assertEqual(load(), {**self.save, "save_sequence": 5})
+
+
+class TestSaveOffLoop(unittest.IsolatedAsyncioTestCase):
+    async def test_copy_on_loop(self) -> None:
+        """Tests that saving from another thread copies the save on the event loop and writes it in that thread."""
+        loop_thread = threading.current_thread()
+        copying_threads: typing.List[threading.Thread] = []
+
+        class ThreadRecordingContext(SaveContext):
+            def get_save(self) -> typing.Dict[str, typing.Any]:
+                copying_threads.append(threading.current_thread())
+                return super().get_save()
+
+        ctx = ThreadRecordingContext("", 0, "", "", 0, 0, False)
+        ctx.save = {"version": 2, "received_items": {(0, 1, True): [NetworkItem(1, 2, 2, 0)]}}
+        ctx.loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory() as directory:
+            ctx.save_filename = os.path.join(directory, "test.apsave")
+            self.assertTrue(await ctx.loop.run_in_executor(None, ctx._save))
+            self.assertEqual(copying_threads, [loop_thread])
+            self.assertTrue(os.path.exists(ctx.save_filename))
+
+    async def test_save_now_wakes_saver(self) -> None:
+        """Tests that saving right away from the event loop leaves the save to the auto saver thread."""
+        ctx = NoGameDataContext("", 0, "", "", 0, 0, False)
+        ctx.saving = True
+        ctx.auto_saver_thread = threading.Thread(target=lambda: None)
+        with unittest.mock.patch.object(ctx, "_save") as save:
+            self.assertTrue(ctx.save(True))
+        save.assert_not_called()
+        self.assertTrue(ctx.save_dirty)
+        self.assertTrue(ctx.save_requested.is_set())
+
+        processor = ServerCommandProcessor(ctx)
+        with unittest.mock.patch.object(ctx, "_save") as save, unittest.mock.patch.object(processor, "output") as output:
+            self.assertTrue(processor._cmd_save())
+        save.assert_not_called()
+        output.assert_called_once_with("Save requested")
+
+
+class RecordingContext(NoGameDataContext):
+    sent: typing.List[typing.Tuple[typing.List[Client], str]]
+
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Client], msg: str) -> bool:
+        self.sent.append((list(endpoints), msg))
+        return True
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    async def test_only_new_items_sent(self) -> None:
+        """Tests that only slots with new items get ReceivedItems, encoded once for clients at the same index."""
+        ctx = RecordingContext("", 0, "", "", 0, 0, False)
+        ctx.sent = []
+        ctx.clients = {0: {1: [], 2: []}}
+        for slot in (1, 1, 2):
+            client = Client(None, ctx)
+            client.team, client.slot = 0, slot
+            client.items_handling = 0b111
+            ctx.clients[0][slot].append(client)
+
+        send_items_to(ctx, 0, 1, NetworkItem(1, 2, 2, 0), NetworkItem(3, 4, 2, 0))
+        send_new_items(ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(len(ctx.sent), 1)
+        clients, msg = ctx.sent[0]
+        self.assertEqual(clients, ctx.clients[0][1])
+        self.assertEqual(len(ctx.loader(msg)[0]["items"]), 2)
+        self.assertEqual([client.send_index for client in ctx.clients[0][1]], [2, 2])
+
+        send_new_items(ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(len(ctx.sent), 1)
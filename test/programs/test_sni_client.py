@@ -0,0 +1,67 @@
+import json
+import unittest
+from typing import List, Union
+
+from SNIClient import SNESState, SNIContext, coalesce_snes_ranges, snes_read, snes_read_multiple, snes_write
+
+
+class FakeSNISocket:
+    open = True
+    closed = False
+
+    def __init__(self, ctx: SNIContext) -> None:
+        self.ctx = ctx
+        self.memory = bytearray(range(256)) * 256
+        self.requests: List[dict] = []
+        self.pending_write: List[int] = []
+
+    async def send(self, message: Union[str, bytes]) -> None:
+        if isinstance(message, bytes):
+            address, size = self.pending_write
+            self.memory[address:address + size] = message
+            return
+        request = json.loads(message)
+        self.requests.append(request)
+        operands = [int(operand, 16) for operand in request["Operands"]]
+        if request["Opcode"] == "PutAddress":
+            self.pending_write = operands
+            return
+        data = b"".join(bytes(self.memory[address:address + size])
+                        for address, size in zip(operands[::2], operands[1::2]))
+        # SNI may split the reply into several messages
+        for start in range(0, len(data), 5):
+            self.ctx.snes_recv_queue.put_nowait(data[start:start + 5])
+
+
+class TestSNIRead(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.ctx = SNIContext("", "", "")
+        self.ctx.snes_state = SNESState.SNES_ATTACHED
+        self.socket = FakeSNISocket(self.ctx)
+        self.ctx.snes_socket = self.socket  # type: ignore[assignment]
+
+    def test_coalesce(self) -> None:
+        self.assertEqual([(0x10, 8), (0x20, 4)], coalesce_snes_ranges([(0x20, 2), (0x14, 4), (0x10, 6), (0x21, 3)]))
+        self.assertEqual([(0x10, 4), (0x15, 1)], coalesce_snes_ranges([(0x15, 1), (0x10, 4), (0x11, 1)]))
+
+    async def test_read_multiple(self) -> None:
+        """Tests that a batched read is one request with merged ranges, which later reads are answered from."""
+        reads = await snes_read_multiple(self.ctx, ((0x120, 2), (0x100, 4), (0x104, 4), (0x102, 1)))
+        self.assertEqual([b"\x20\x21", b"\x00\x01\x02\x03", b"\x04\x05\x06\x07", b"\x02"], reads)
+        self.assertEqual(1, len(self.socket.requests))
+        self.assertEqual(["100", "8", "120", "2"], self.socket.requests[0]["Operands"])
+
+        self.assertEqual(b"\x05\x06", await snes_read(self.ctx, 0x105, 2))
+        self.assertEqual(1, len(self.socket.requests))
+        self.assertEqual(b"\x07\x08", await snes_read(self.ctx, 0x107, 2))
+        self.assertEqual(2, len(self.socket.requests))
+
+    async def test_write_invalidates(self) -> None:
+        """Tests that written memory is read again instead of answered from the cache."""
+        await snes_read_multiple(self.ctx, ((0x100, 8),))
+        await snes_write(self.ctx, [(0x104, b"\xff")])
+        self.assertEqual(b"\xff", await snes_read(self.ctx, 0x104, 1))
+
+        self.ctx.snes_read_cache.clear()
+        self.socket.memory[0x100] = 0xee
+        self.assertEqual(b"\xee", await snes_read(self.ctx, 0x100, 1))
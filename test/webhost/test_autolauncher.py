@@ -0,0 +1,95 @@
+import os
+import queue
+import socket
+import tempfile
+import unittest
+from types import SimpleNamespace
+from uuid import uuid4
+
+
+class TestRoomPlacement(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import MultiworldInstance
+
+        config = {"PONY": {}, "SELFLAUNCHCERT": None, "SELFLAUNCHKEY": None, "HOST_ADDRESS": "",
+                  "HOSTER_BASE_PORT": 0}
+        self.hosters = [MultiworldInstance(config, hoster_id) for hoster_id in range(2)]
+        for hoster in self.hosters:
+            # queue.Queue makes puts visible immediately, while multiprocessing's queues use a feeder thread
+            hoster.rooms_to_start = queue.Queue()
+            hoster.rooms_shutting_down = queue.Queue()
+            hoster.load_reports = queue.Queue()
+
+    @staticmethod
+    def create_room(slots: int) -> SimpleNamespace:
+        return SimpleNamespace(id=uuid4(), seed=SimpleNamespace(slots=[object()] * slots))
+
+    def report(self, hoster_id: int, clients: int) -> None:
+        from WebHostLib.customserver import HosterLoad
+
+        self.hosters[hoster_id].load_reports.put(HosterLoad(1, clients, 0, 0, 0))
+        for hoster in self.hosters:
+            hoster.update()
+
+    def test_least_loaded(self) -> None:
+        """Tests that new rooms are placed on the least loaded hoster, counting rooms not yet reported."""
+        from WebHostLib.autolauncher import get_hoster
+
+        self.report(0, 10)
+        self.report(1, 20)
+        big_room = self.create_room(15)
+        get_hoster(self.hosters, big_room).start_room(big_room)
+        self.assertIn(big_room.id, self.hosters[0].room_ids)
+        room = self.create_room(1)
+        get_hoster(self.hosters, room).start_room(room)
+        self.assertIn(room.id, self.hosters[1].room_ids)
+        self.assertEqual(self.hosters[1].rooms_to_start.get_nowait(), room.id)
+
+    def test_sticky(self) -> None:
+        """Tests that a running room stays on its hoster, until the hoster reports it shut down."""
+        from WebHostLib.autolauncher import get_hoster
+
+        room = self.create_room(1)
+        get_hoster(self.hosters, room).start_room(room)
+        self.assertIn(room.id, self.hosters[0].room_ids)
+        self.report(0, 100)
+        self.assertIs(get_hoster(self.hosters, room), self.hosters[0])
+        get_hoster(self.hosters, room).start_room(room)
+        self.assertEqual(self.hosters[0].rooms_to_start.qsize(), 1)
+
+        self.hosters[0].rooms_shutting_down.put(room.id)
+        self.hosters[0].update()
+        self.assertIs(get_hoster(self.hosters, room), self.hosters[1])
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "local sockets not supported")
+class TestNotificationSocket(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, "ap_test.sock")
+
+    def test_in_use(self) -> None:
+        """Tests that a socket another process waits on is left to it, instead of being replaced."""
+        from WebHostLib.customserver import close_notification_socket, open_notification_socket, send_notification
+
+        notifications = open_notification_socket(self.path, 5)
+        self.assertIsNotNone(notifications)
+        self.addCleanup(close_notification_socket, notifications, self.path)
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(open_notification_socket(self.path, 5))
+        send_notification(self.path)
+        self.assertEqual(notifications.recv(1), b"\0")
+
+    def test_left_behind(self) -> None:
+        """Tests that a socket left behind by a process that didn't shut down cleanly is replaced."""
+        from WebHostLib.customserver import close_notification_socket, open_notification_socket, send_notification
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as left_behind:
+            left_behind.bind(self.path)
+        self.assertTrue(os.path.exists(self.path))
+        notifications = open_notification_socket(self.path, 5)
+        self.assertIsNotNone(notifications)
+        self.addCleanup(close_notification_socket, notifications, self.path)
+        send_notification(self.path)
+        self.assertEqual(notifications.recv(1), b"\0")
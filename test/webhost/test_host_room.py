@@ -1,4 +1,6 @@
 import os
+import tempfile
+import unittest.mock
 from uuid import UUID, uuid4, uuid5
 
 from flask import url_for
@@ -176,6 +178,107 @@ class TestHostFakeRoom(TestBase):
             commands = select(command for command in Command if command.room.id == self.room_id)  # type: ignore
             self.assertIn("/help", (command.commandtext for command in commands))
 
+    def test_host_room_post_notifies(self) -> None:
+        """Verify a hosted room gets woken up for a new command instead of having to poll for it."""
+        from WebHostLib.customserver import get_command_socket_path, open_command_socket
+
+        notifications = open_command_socket(self.room_id)
+        if not notifications:
+            self.skipTest("local sockets not supported")
+        self.addCleanup(os.unlink, get_command_socket_path(self.room_id))
+        with notifications, self.app.app_context(), self.app.test_request_context():
+            notifications.settimeout(5)
+            self.client.post(url_for("host_room", room=self.room_id), data={
+                "cmd": "/help"
+            })
+            self.assertEqual(notifications.recv(1), b"\0")
+
+    def test_host_room_notifies_autohost(self) -> None:
+        """Verify visiting a room moves its deadline and wakes up the autohost to start it."""
+        import datetime
+        from pony.orm import db_session
+        from WebHostLib.customserver import close_notification_socket, get_activity_socket_path, \
+            open_notification_socket
+        from WebHostLib.models import Room
+
+        # don't take over the socket of an autohost running on this machine
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        with unittest.mock.patch("tempfile.gettempdir", return_value=temp_dir.name):
+            socket_path = get_activity_socket_path("autohost")
+            notifications = open_notification_socket(socket_path, 5)
+            if not notifications:
+                self.skipTest("local sockets not supported")
+            self.addCleanup(close_notification_socket, notifications, socket_path)
+            with self.app.app_context(), self.app.test_request_context():
+                self.client.get(url_for("host_room", room=self.room_id))
+                self.assertEqual(notifications.recv(1), b"\0")
+
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            self.assertEqual(room.deadline, room.last_activity + datetime.timedelta(seconds=room.timeout))
+            self.assertGreater(room.deadline, datetime.datetime.utcnow())
+
+    def test_backfill_deadlines(self) -> None:
+        """Verify rooms from before deadlines were stored get one, so the autohost restarts them."""
+        import datetime
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import backfill_deadlines
+        from WebHostLib.models import Room, db
+
+        with db_session:
+            db.execute("UPDATE Room SET deadline = NULL")
+        with db_session:
+            self.assertIsNone(Room.get(id=self.room_id).deadline)
+        backfill_deadlines()
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            self.assertEqual(room.deadline, room.last_activity + datetime.timedelta(seconds=room.timeout))
+
+    def test_add_missing_columns(self) -> None:
+        """Verify the deadline column is added to a Room table from before it existed, for the backfill to fill in."""
+        import datetime
+        import sqlite3
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import backfill_deadlines
+        from WebHostLib.models import Room, add_missing_columns, db
+
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            self.skipTest("SQLite can't drop columns")
+        with db_session:
+            db.execute("DROP INDEX idx_room__deadline")
+            db.execute("ALTER TABLE Room DROP COLUMN deadline")
+        add_missing_columns()
+        with db_session:
+            self.assertTrue(db.provider.index_exists(db.get_connection(), "Room", "idx_room__deadline"))
+            self.assertIsNone(Room.get(id=self.room_id).deadline)
+        backfill_deadlines()
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            self.assertEqual(room.deadline, room.last_activity + datetime.timedelta(seconds=room.timeout))
+
+    def test_host_room_shared_port(self) -> None:
+        """Verify a room on a shared hoster port is shown with its id as path, which the hoster routes by."""
+        from pony.orm import db_session
+        from WebHostLib.customserver import get_room_id_from_path
+        from WebHostLib.models import Room
+
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            room.last_port = 12345
+
+        base_port = self.app.config["HOSTER_BASE_PORT"]
+        self.addCleanup(self.app.config.__setitem__, "HOSTER_BASE_PORT", base_port)
+        self.app.config["HOSTER_BASE_PORT"] = 12340
+        with self.app.app_context(), self.app.test_request_context():
+            room_path = url_for("host_room", room=self.room_id).rsplit("/", 1)[1]
+            response = self.client.get(url_for("host_room", room=self.room_id))
+            self.assertIn(f":12345/{room_path}", response.get_data(True))
+        self.assertEqual(get_room_id_from_path(f"/{room_path}"), self.room_id)
+        self.assertEqual(get_room_id_from_path(f"/{room_path}?query"), self.room_id)
+        self.assertIsNone(get_room_id_from_path("/"))
+        self.assertIsNone(get_room_id_from_path("/not-a-room"))
+
     def test_host_room_other_post(self) -> None:
         """Verify command from non-owner does not get queued for the server."""
         from pony.orm import db_session, select
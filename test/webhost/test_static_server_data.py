@@ -0,0 +1,68 @@
+import pickle
+import unittest
+import unittest.mock
+
+
+class TestStaticServerData(unittest.TestCase):
+    def setUp(self) -> None:
+        from WebHostLib.customserver import StaticServerData
+
+        self.games = {
+            game: {
+                "gamespackage": {
+                    "checksum": game,
+                    "item_name_to_id": {f"{game} Item": 1, "Ünicode Item": 3, "Another Item": 2},
+                    "location_name_to_id": {},
+                },
+                "item_name_groups": {"Everything": [f"{game} Item", "Ünicode Item", "Another Item"], "Empty": []},
+                "location_name_groups": {},
+                "non_hintable_names": frozenset({f"{game} Item"}),
+            } for game in ("Game A", "Game B")
+        }
+        self.data = StaticServerData.create(self.games)
+        self.addCleanup(self.data.unlink)
+
+    def test_views(self) -> None:
+        """Tests that a room process reads the data through views of the shared memory, without unpickling it."""
+        room_process_data = pickle.loads(pickle.dumps(self.data))
+        with unittest.mock.patch("pickle.loads") as loads:
+            static_game_data = room_process_data.as_dict()
+            self.assertEqual(list(static_game_data["gamespackage"]), ["Game A", "Game B"])
+            package = static_game_data["gamespackage"]["Game B"]
+            self.assertEqual(package["checksum"], "Game B")
+            self.assertEqual(dict(package["item_name_to_id"].items()),
+                             {"Game B Item": 1, "Ünicode Item": 3, "Another Item": 2})
+            self.assertEqual(list(package["item_name_to_id"]), ["Game B Item", "Ünicode Item", "Another Item"])
+            self.assertEqual(package["item_name_to_id"]["Ünicode Item"], 3)
+            self.assertNotIn("Game A Item", package["item_name_to_id"])
+            self.assertEqual(len(package["location_name_to_id"]), 0)
+
+            groups = static_game_data["item_name_groups"]["Game B"]
+            self.assertEqual(list(groups), ["Everything", "Empty"])
+            self.assertEqual(groups["Everything"], {"Game B Item", "Ünicode Item", "Another Item"})
+            self.assertEqual(len(groups["Empty"]), 0)
+            self.assertNotIn("Nothing", groups)
+            self.assertIn("Game B Item", static_game_data["non_hintable_names"]["Game B"])
+            self.assertNotIn("Another Item", static_game_data["non_hintable_names"]["Game B"])
+        loads.assert_not_called()
+
+    def test_encode(self) -> None:
+        """Tests that the views are sent to clients the same way as the data they were created from."""
+        from NetUtils import encode
+
+        static_game_data = self.data.as_dict()
+        self.assertEqual(encode(static_game_data["gamespackage"]["Game A"]),
+                         encode(self.games["Game A"]["gamespackage"]))
+        self.assertEqual(encode(static_game_data["item_name_groups"]["Game A"]),
+                         encode(self.games["Game A"]["item_name_groups"]))
+
+    def test_missing_game(self) -> None:
+        """Tests that unknown games are not hintable-blocked and are not in the data package."""
+        static_game_data = self.data.as_dict()
+        self.assertEqual(static_game_data["non_hintable_names"]["Game C"], frozenset())
+        self.assertNotIn("Game C", static_game_data["non_hintable_names"])
+        self.assertNotIn("Game C", static_game_data["gamespackage"])
+        with self.assertRaises(KeyError):
+            static_game_data["gamespackage"]["Game C"]
+        with self.assertRaises(KeyError):
+            static_game_data["item_name_groups"]["Game A"]["Nothing"]
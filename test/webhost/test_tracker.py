@@ -1,7 +1,7 @@
 import os
 import pickle
 from pathlib import Path
-from typing import ClassVar
+from typing import Any, ClassVar
 from uuid import UUID, uuid4
 
 from flask import url_for
@@ -9,6 +9,12 @@ from flask import url_for
 from . import TestBase
 
 
+class EmptyLists(dict):
+    """Returns an empty list for any missing key, without storing it."""
+    def __missing__(self, key: Any) -> list:
+        return []
+
+
 class TestTracker(TestBase):
     room_id: UUID
     tracker_uuid: UUID
@@ -93,3 +99,131 @@ class TestTracker(TestBase):
                 headers={"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00"},  # missing timezone
             )
             self.assertEqual(response.status_code, 400)
+
+    def test_tracker_data_cache(self) -> None:
+        """
+        Verify that tracker data is kept between requests until the multisave changes or a save delta is added
+        """
+        from pony.orm import db_session
+        from NetUtils import ClientStatus
+        from WebHostLib.models import Room, SaveDelta
+        from WebHostLib.tracker import get_tracker_data
+
+        with db_session:
+            room: Room = Room.get(id=self.room_id)
+            tracker_data = get_tracker_data(room)
+            unchanged = get_tracker_data(room)
+            self.assertIs(unchanged._multisave, tracker_data._multisave)
+            self.assertIs(unchanged._tracker_cache, tracker_data._tracker_cache)
+
+            room.multisave = pickle.dumps({"client_game_state": {(0, 1): ClientStatus.CLIENT_GOAL}})
+            changed = get_tracker_data(room)
+            self.assertIs(changed._multidata, tracker_data._multidata)
+            self.assertEqual(changed.get_player_client_status(0, 1), ClientStatus.CLIENT_GOAL)
+            self.assertEqual(tracker_data.get_player_client_status(0, 1), ClientStatus.CLIENT_UNKNOWN)
+
+            SaveDelta(room=room, sequence=1,
+                      data=pickle.dumps({"update": {"client_game_state": {(0, 1): ClientStatus.CLIENT_PLAYING}}}))
+            with_delta = get_tracker_data(room)
+            self.assertEqual(with_delta.get_player_client_status(0, 1), ClientStatus.CLIENT_PLAYING)
+
+            other_room = Room(seed=room.seed, owner=room.owner)
+            other_tracker_data = get_tracker_data(other_room)
+            self.assertIsNot(other_tracker_data._multidata, tracker_data._multidata)
+            game = tracker_data.get_player_game(0, 1)
+            self.assertIs(other_tracker_data.item_id_to_name[game], tracker_data.item_id_to_name[game])
+            other_room.delete()
+
+    def test_cached_inventory_unchanged_by_trackers(self) -> None:
+        """
+        Verify that trackers adjusting the inventory they display don't change the cached inventory of later requests
+        """
+        from collections import Counter
+        from unittest.mock import patch
+        from pony.orm import db_session
+        from NetUtils import NetworkItem
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData, _player_trackers, get_timeout_and_player_tracker, \
+            get_tracker_data
+
+        if "Starcraft 2" not in _player_trackers:
+            self.skipTest("Starcraft 2 is not installed")
+        # Progressive Terran Weapon Upgrade, which the Starcraft 2 tracker displays as its individual upgrades
+        received = {(0, 1, True): [NetworkItem(1107, 0, 0, 0)]}
+
+        with db_session, self.app.test_request_context(), \
+                patch.object(TrackerData, "get_player_game", return_value="Starcraft 2"):
+            room: Room = Room.get(id=self.room_id)
+            room.multisave = pickle.dumps({"received_items": received})
+            tracker_data = get_tracker_data(room)
+            # the room's game is Archipelago, which doesn't know the names of Starcraft 2's ids
+            for lookup in (tracker_data.item_id_to_name, tracker_data.location_id_to_name):
+                lookup["Starcraft 2"] = lookup["Archipelago"]
+            for generic in (False, False, True):
+                get_timeout_and_player_tracker(room, 0, 1, generic)
+                self.assertEqual(get_tracker_data(room).get_player_inventory_counts(0, 1), Counter({1107: 1}))
+
+    def test_cached_data_unchanged_by_trackers(self) -> None:
+        """
+        Verify that no tracker changes the tracker data that is cached and handed to later requests
+        """
+        from collections import defaultdict
+        from unittest.mock import patch
+        from pony.orm import db_session
+        from NetUtils import ClientStatus, NetworkItem, NetworkSlot, SlotType
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData, _multiworld_trackers, _player_trackers, \
+            get_timeout_and_multiworld_tracker, get_timeout_and_player_tracker, get_tracker_data
+
+        with db_session, self.app.test_request_context():
+            room: Room = Room.get(id=self.room_id)
+            # 1107 is an upgrade the Starcraft 2 tracker displays as its individual upgrades
+            received = [NetworkItem(item, 0, 0, 0) for item in (1, 1107)]
+            room.multisave = pickle.dumps({"received_items": {(0, 1, True): received},
+                                           "client_game_state": {(0, 1): ClientStatus.CLIENT_PLAYING}})
+            tracker_data = get_tracker_data(room)
+            # read by the A Link to the Past tracker
+            tracker_data._multidata["checks_in_area"] = {1: EmptyLists()}
+            shared_data = pickle.dumps((tracker_data._multidata, tracker_data._multisave))
+            for game in ("Archipelago", *_player_trackers, *_multiworld_trackers):
+                # the room's only slot is an Archipelago spectator, so it becomes a player of each game with the ids
+                # of Archipelago and empty slot data
+                for lookup in (tracker_data.item_id_to_name, tracker_data.location_id_to_name):
+                    lookup.setdefault(game, lookup["Archipelago"])
+                tracker_data._tracker_cache.clear()
+                with self.subTest(game), \
+                        patch.object(TrackerData, "get_slot_info", return_value=NetworkSlot("Player1", game,
+                                                                                            SlotType.player)), \
+                        patch.object(TrackerData, "get_slot_data", return_value=defaultdict(int)):
+                    cached_results = []
+                    for _ in range(2):
+                        get_timeout_and_player_tracker(room, 0, 1, False)
+                        get_timeout_and_player_tracker(room, 0, 1, True)
+                        get_timeout_and_multiworld_tracker(room, game)
+                        cached_results.append(pickle.dumps(tracker_data._tracker_cache))
+                    # the first requests fill the cache, the ones after have to leave it as it is
+                    self.assertEqual(pickle.loads(cached_results[0]), pickle.loads(cached_results[1]))
+                    self.assertEqual((tracker_data._multidata, tracker_data._multisave), pickle.loads(shared_data))
+
+    def test_tracker_data_cache_eviction(self) -> None:
+        """
+        Verify that the least recently used room is dropped once the room limit is reached
+        """
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import _tracker_data_cache, get_tracker_data
+
+        room_limit = self.app.config["TRACKER_CACHE_ROOMS"]
+        self.app.config["TRACKER_CACHE_ROOMS"] = 1
+        try:
+            with db_session:
+                room: Room = Room.get(id=self.room_id)
+                get_tracker_data(room)
+                self.assertIn(room.id, _tracker_data_cache)
+                other_room = Room(seed=room.seed, owner=room.owner)
+                get_tracker_data(other_room)
+                self.assertNotIn(room.id, _tracker_data_cache)
+                self.assertIn(other_room.id, _tracker_data_cache)
+                other_room.delete()
+        finally:
+            self.app.config["TRACKER_CACHE_ROOMS"] = room_limit
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import concurrent.futures
 import hashlib
+import io
 import logging
 import pathlib
+import pickle
 import sys
 import time
 from random import Random
@@ -12,18 +15,55 @@ from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Ma
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
+from Profiling import GenerationProfile
 from Utils import deprecate
 
 if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
-    from . import GamesPackage
+    from . import GamesPackage, WorldSource
     from settings import Group
 
 perf_logger = logging.getLogger("performance")
 
 
+class WorldTypes(Dict[str, "Type[World]"]):
+    """Registered worlds by game. With lazy loading, worlds of pending games get imported on first lookup."""
+    pending: Dict[str, WorldSource]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pending = {}
+
+    def _load_pending(self, game: str) -> bool:
+        world_source = self.pending.get(game)
+        if world_source is None:
+            return False
+        for pending_game, pending_source in list(self.pending.items()):
+            if pending_source is world_source:
+                del self.pending[pending_game]
+        if world_source.module_name not in sys.modules:
+            world_source.load()
+        return super().__contains__(game)
+
+    def load_pending(self) -> None:
+        """Imports the worlds of all pending games."""
+        while self.pending:
+            self._load_pending(next(iter(self.pending)))
+
+    def __missing__(self, game: str) -> Type[World]:
+        if self._load_pending(game):
+            return self[game]
+        raise KeyError(game)
+
+    def __contains__(self, game: object) -> bool:
+        return super().__contains__(game) or self._load_pending(game)
+
+    def get(self, game: str, default: Any = None) -> Any:
+        return self[game] if game in self else default
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: WorldTypes = WorldTypes()
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -162,7 +202,9 @@ class WebWorldRegister(type):
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
     start = time.perf_counter()
-    ret = method(*args)
+    with GenerationProfile.stage(method.__name__, player,
+                                 None if player else getattr(getattr(method, "__self__", None), "game", None)):
+        ret = method(*args)
     taken = time.perf_counter() - start
     if taken > 1.0:
         if player and multiworld:
@@ -188,12 +230,190 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
-def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
+def call_output(multiworld: "MultiWorld", player: int, output_directory: str,
+                process_pool: Optional[concurrent.futures.Executor] = None) -> None:
+    """
+    Calls generate_output on a player's world. For worlds with output_in_process, prepares the output in this process
+    and writes it in process_pool, if given.
+    """
+    world = multiworld.worlds[player]
+    if not world.output_in_process or not process_pool:
+        return call_single(multiworld, "generate_output", player, output_directory)
+
+    output_data = call_single(multiworld, "prepare_output", player, output_directory)
+
+    def write_output() -> None:
+        process_pool.submit(type(world).write_output, output_data, output_directory).result()
+
+    try:
+        _timed_call(write_output, multiworld=multiworld, player=player)
+    except Exception as e:
+        message = f"Exception in {type(world).write_output} for player {player}, named {multiworld.player_name[player]}."
+        if sys.version_info >= (3, 11, 0):
+            e.add_note(message)  # PEP 678
+        else:
+            logging.error(message)
+        raise e
+
+
+isolated_stages = ("generate_early", "create_regions", "create_items")
+"""stages that worlds with isolated_generation run in the generation process pool, if there is one"""
+
+
+class _MultiWorldPickler(pickle.Pickler):
+    """Pickles a player's data with the multiworld left out, so it can be attached to the multiworld of another
+    process."""
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld") -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.multiworld = multiworld
+
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        if obj is self.multiworld:
+            return "multiworld"
+        if obj is self.multiworld.regions:
+            return "regions"
+        return None
+
+
+class _MultiWorldUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld") -> None:
+        super().__init__(file)
+        self.multiworld = multiworld
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == "multiworld":
+            return self.multiworld
+        if pid == "regions":
+            return self.multiworld.regions
+        raise pickle.UnpicklingError(f"unknown persistent id {pid}")
+
+
+def _dump_player(multiworld: "MultiWorld", player: int, new_items: List["Item"]) -> bytes:
+    """Pickles everything the stages in isolated_stages may change for a player."""
+    regions = multiworld.regions
+    file = io.BytesIO()
+    _MultiWorldPickler(file, multiworld).dump((
+        multiworld.worlds[player],
+        regions.region_cache[player],
+        regions.entrance_cache[player],
+        regions.location_cache[player],
+        multiworld.precollected_items[player],
+        multiworld.early_items[player],
+        multiworld.local_early_items[player],
+        {region: entrances for region, entrances in multiworld.indirect_connections.items()
+         if region.player == player},
+        new_items,
+    ))
+    return file.getvalue()
+
+
+def _load_player(multiworld: "MultiWorld", player: int, data: bytes) -> Tuple[List["Item"], List["Item"]]:
+    """
+    Replaces the data of player in multiworld by data from _dump_player.
+    Returns the precollected items that were not precollected before, and the new items.
+    """
+    world, region_cache, entrance_cache, location_cache, precollected_items, early_items, local_early_items, \
+        indirect_connections, new_items = _MultiWorldUnpickler(io.BytesIO(data), multiworld).load()
+    multiworld.worlds[player] = world
+    multiworld.regions.region_cache[player] = region_cache
+    multiworld.regions.entrance_cache[player] = entrance_cache
+    multiworld.regions.location_cache[player] = location_cache
+    new_precollected_items = precollected_items[len(multiworld.precollected_items[player]):]
+    multiworld.precollected_items[player] = precollected_items
+    multiworld.early_items[player] = early_items
+    multiworld.local_early_items[player] = local_early_items
+    for region in [region for region in multiworld.indirect_connections if region.player == player]:
+        del multiworld.indirect_connections[region]
+    multiworld.indirect_connections.update(indirect_connections)
+    return new_precollected_items, new_items
+
+
+def _call_isolated(multiworld_data: Dict[str, Any], method_name: str, player: int, data: bytes) -> Optional[bytes]:
+    """
+    Runs a stage of an isolated world on a multiworld that only contains this world, in a process of the generation
+    pool. Returns the changed data of the player, or None if it can't be pickled after the stage.
+    """
+    from BaseClasses import MultiWorld
+
+    multiworld = MultiWorld(multiworld_data["players"])
+    multiworld.__dict__.update(multiworld_data)
+    multiworld.worlds = {}
+    _load_player(multiworld, player, data)
+    multiworld.state = CollectionState(multiworld)
+    call_single(multiworld, method_name, player)
+    try:
+        return _dump_player(multiworld, player, multiworld.itempool)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        logging.debug(f"Could not return {method_name} of player {player} from the generation pool: {e}")
+        return None
+
+
+def _submit_isolated(multiworld: "MultiWorld", method_name: str, player: int,
+                     process_pool: concurrent.futures.Executor) -> Optional[concurrent.futures.Future[Optional[bytes]]]:
+    """Starts a stage of an isolated world in process_pool, or returns None if it has to run in this process."""
+    world = multiworld.worlds[player]
+    if not world.isolated_generation or method_name not in isolated_stages or multiworld.get_player_groups(player):
+        return None
+    try:
+        data = _dump_player(multiworld, player, [])
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        logging.debug(f"Running {method_name} of player {player} in this process, as it can't be pickled: {e}")
+        return None
+    multiworld_data = {"players": multiworld.players, "player_name": multiworld.player_name, "game": multiworld.game,
+                       "player_types": multiworld.player_types, "seed": multiworld.seed,
+                       "seed_name": multiworld.seed_name, "is_race": multiworld.is_race,
+                       "plando_options": multiworld.plando_options}
+    return process_pool.submit(_call_isolated, multiworld_data, method_name, player, data)
+
+
+def _merge_isolated(multiworld: "MultiWorld", method_name: str, player: int,
+                    future: concurrent.futures.Future[Optional[bytes]]) -> bool:
+    """Merges the result of a stage started by _submit_isolated into multiworld. Returns False if it has to be run
+    in this process instead."""
+    with GenerationProfile.stage(method_name, player):
+        try:
+            data = future.result()
+        except Exception as e:
+            message = (f"Exception in {method_name} of {type(multiworld.worlds[player]).__qualname__} for player "
+                       f"{player}, named {multiworld.player_name[player]}.")
+            if sys.version_info >= (3, 11, 0):
+                e.add_note(message)  # PEP 678
+            else:
+                logging.error(message)
+            raise e
+        if data is None:
+            return False
+        precollected_items, new_items = _load_player(multiworld, player, data)
+    state = multiworld.state
+    # the regions were replaced, so reachability has to be found again
+    state.reachable_regions[player] = set()
+    state.blocked_connections[player] = set()
+    state.stale[player] = True
+    for item in precollected_items:
+        state.collect(item, True)
+    multiworld.itempool.extend(new_items)
+    return True
+
+
+def call_all(multiworld: "MultiWorld", method_name: str, *args: Any,
+             process_pool: Optional[concurrent.futures.Executor] = None) -> None:
+    """
+    Calls method_name on every player's world, followed by the stage method of every world type.
+    If process_pool is given, worlds with isolated_generation run the stages in isolated_stages in it, while the other
+    worlds run in this process. Results are merged in player order, so they are identical to calling every world here.
+    """
     world_types: Set[AutoWorldRegister] = set()
+    futures: Dict[int, concurrent.futures.Future[Optional[bytes]]] = {}
+    if process_pool and not args:
+        for player in multiworld.player_ids:
+            future = _submit_isolated(multiworld, method_name, player, process_pool)
+            if future:
+                futures[player] = future
     for player in multiworld.player_ids:
         prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
-        call_single(multiworld, method_name, player, *args)
+        if player not in futures or not _merge_isolated(multiworld, method_name, player, futures[player]):
+            call_single(multiworld, method_name, player, *args)
         if __debug__:
             new_items = multiworld.itempool[prev_item_count:]
             for i, item in enumerate(new_items):
@@ -315,6 +535,28 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    output_in_process: ClassVar[bool] = False
+    """If True, output is written by prepare_output, which returns everything write_output needs as picklable data,
+    followed by write_output. write_output is then run in a separate process if output processes are enabled in the
+    host settings, so CPU heavy output like ROM patching does not wait on other worlds' output for the GIL."""
+
+    isolated_generation: ClassVar[bool] = False
+    """If True, generate_early, create_regions and create_items only use this world, its own regions, items and early
+    items, and the player names, games and seed of the multiworld, but not multiworld.random. These stages then run in
+    a separate process if generation processes are enabled in the host settings, and the world, its regions and items
+    are pickled there and back. Worlds that can't be pickled at that point run in the generating process instead."""
+
+    incremental_reachability: bool = False
+    """If True, collecting an item only rechecks the blocked Entrances whose access rules read that item name, instead
+    of every blocked Entrance. This requires Entrance access rules to only depend on this player's items and Regions,
+    and collect to change state through CollectionState.add_item. Rules that inspect state in any other way, like
+    iterating prog_items, are detected and rechecked every time."""
+
+    indexed_item_counts: ClassVar[bool] = False
+    """If True, CollectionState stores this world's item counts in an ItemCounts array instead of a Counter, making
+    state copies and item name group checks cheaper. prog_items then only supports the Counter methods of ItemCounts,
+    items with a count of 0 are not contained in it and counts have to be integers."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -424,7 +666,23 @@ class World(metaclass=AutoWorldRegister):
         This method gets called from a threadpool, do not use multiworld.random here.
         If you need any last-second randomization, use self.random instead.
         """
-        pass
+        if self.output_in_process:
+            self.write_output(self.prepare_output(output_directory), output_directory)
+
+    def prepare_output(self, output_directory: str) -> Any:
+        """
+        For worlds with output_in_process, gets called in place of generate_output and returns the picklable data
+        write_output needs. Anything needed from the output by later steps, like a ROM name, has to be set here.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def write_output(cls, output_data: Any, output_directory: str) -> None:
+        """
+        For worlds with output_in_process, writes the output files from the data returned by prepare_output.
+        This may run in a separate process, without access to the multiworld.
+        """
+        raise NotImplementedError
 
     def fill_slot_data(self) -> Mapping[str, Any]:  # json of WebHostLib.models.Slot
         """
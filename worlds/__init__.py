@@ -1,15 +1,19 @@
+import hashlib
 import importlib
 import importlib.util
+import json
 import logging
+import mmap
 import os
+import pickle
 import sys
 import warnings
 import zipimport
 import time
 import dataclasses
-from typing import Dict, List, TypedDict
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, TypedDict
 
-from Utils import local_path, user_path
+from Utils import cache_path, local_path, restricted_loads, user_path, __version__
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -27,8 +31,14 @@ __all__ = {
     "GamesPackage",
     "DataPackage",
     "failed_world_loads",
+    "lazy_loading",
+    "get_game_data",
 }
 
+# Set ARCHIPELAGO_LAZY_WORLDS=1 before importing worlds to only import the worlds of games that get looked up in
+# AutoWorldRegister.world_types. Iterating world_types then only yields the worlds that have been imported so far.
+lazy_loading = os.environ.get("ARCHIPELAGO_LAZY_WORLDS", "0") not in ("", "0")
+
 
 failed_world_loads: List[str] = []
 
@@ -45,6 +55,16 @@ class DataPackage(TypedDict):
     games: Dict[str, GamesPackage]
 
 
+class GameData(TypedDict):
+    data_package: GamesPackage
+    hint_blacklist: List[str]
+
+
+class WorldManifestEntry(TypedDict):
+    key: str  # see WorldSource.get_key
+    games: Dict[str, str]  # game name to data package checksum
+
+
 @dataclasses.dataclass(order=True)
 class WorldSource:
     path: str  # typically relative path from this module
@@ -61,6 +81,28 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        return f"worlds.{os.path.basename(self.path).rsplit('.', 1)[0]}"
+
+    def get_key(self) -> str:
+        """Returns a key that changes when any file of this world source is modified, added or removed."""
+        stat = os.stat(self.resolved_path)
+        if self.is_zip:
+            return f"{stat.st_size}-{stat.st_mtime_ns}"
+        count = 0
+        latest = stat.st_mtime_ns
+        folders = [self.resolved_path]
+        while folders:
+            for entry in os.scandir(folders.pop()):
+                if entry.name == "__pycache__":
+                    continue
+                if entry.is_dir():
+                    folders.append(entry.path)
+                count += 1
+                latest = max(latest, entry.stat().st_mtime_ns)
+        return f"{count}-{latest}"
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -115,15 +157,202 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
-world_sources.sort()
-for world_source in world_sources:
-    world_source.load()
 
-# Build the data package for each game.
+def get_manifest_path() -> str:
+    return cache_path("worlds", "manifest.json")
+
+
+def load_manifest() -> Dict[str, WorldManifestEntry]:
+    """Returns the cached manifest entries by resolved world source path, empty if missing or from another version."""
+    try:
+        with open(get_manifest_path(), "r", encoding="utf-8") as f:
+            manifest: Dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != __version__:
+        return {}
+    return manifest["sources"]
+
+
+def update_manifest(manifest: Dict[str, WorldManifestEntry], sources: List[WorldSource]) -> None:
+    """Records the games of loaded sources that are new or changed in the manifest and writes it."""
+    changed: Dict[str, WorldManifestEntry] = {}
+    for world_source in sources:
+        key = world_source.get_key()
+        manifest_entry = manifest.get(world_source.resolved_path)
+        if not manifest_entry or manifest_entry["key"] != key:
+            changed[world_source.module_name] = manifest[world_source.resolved_path] = \
+                {"key": key, "games": {}}
+    for game, world in AutoWorldRegister.world_types.items():
+        manifest_entry = changed.get(".".join(world.__module__.split(".", 2)[:2]))
+        if manifest_entry:
+            manifest_entry["games"][game] = world.get_data_package_data()["checksum"]
+    for world_source in sources:
+        # sources that failed to load or registered no game are checked again next time
+        if world_source.module_name in changed and not changed[world_source.module_name]["games"]:
+            del manifest[world_source.resolved_path]
+            del changed[world_source.module_name]
+
+    if not changed:
+        return
+    path = get_manifest_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}", "w", encoding="utf-8") as f:
+            json.dump({"version": __version__, "sources": manifest}, f, separators=(",", ":"))
+        os.replace(f"{path}.{os.getpid()}", path)
+    except OSError as e:
+        logging.debug(f"Could not write world manifest: {e}")
+
+
+class DataPackageCache(Mapping[str, GameData]):
+    """
+    Game data of all installed worlds, memory-mapped from a cache file that is only valid for the same world sources.
+    Layout: format version byte, 4 byte little endian index length, pickled index, one pickled section per game.
+    Sections are only unpickled when their game is first looked up.
+    """
+    format_version = 1
+
+    _sections: memoryview
+    _index: Dict[str, Tuple[int, int]]
+    _loaded: Dict[str, GameData]
+
+    def __init__(self, sections: memoryview, index: Dict[str, Tuple[int, int]]) -> None:
+        self._sections = sections
+        self._index = index
+        self._loaded = {}
+
+    @staticmethod
+    def get_path() -> str:
+        return cache_path("worlds", "datapackage.bin")
+
+    @classmethod
+    def load(cls, key: str) -> Optional["DataPackageCache"]:
+        """Maps the cache file, if it exists and was written for key."""
+        try:
+            with open(cls.get_path(), "rb") as f:
+                view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            if view[0] != cls.format_version:
+                return None
+            index_length = int.from_bytes(view[1:5], "little")
+            index = restricted_loads(view[5:5 + index_length])
+        except Exception as e:
+            logging.debug(f"Could not load data package cache: {e}")
+            return None
+        if index["key"] != key:
+            return None
+        return cls(view[5 + index_length:], index["games"])
+
+    @classmethod
+    def write(cls, key: str, games: Mapping[str, GameData]) -> None:
+        sections = bytearray()
+        index: Dict[str, Tuple[int, int]] = {}
+        for game, game_data in games.items():
+            section = pickle.dumps(game_data)
+            index[game] = len(sections), len(section)
+            sections.extend(section)
+        pickled_index = pickle.dumps({"key": key, "games": index})
+        path = cls.get_path()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.{os.getpid()}", "wb") as f:
+                f.write(bytes([cls.format_version]) + len(pickled_index).to_bytes(4, "little"))
+                f.write(pickled_index)
+                f.write(sections)
+            os.replace(f"{path}.{os.getpid()}", path)
+        except OSError as e:
+            logging.debug(f"Could not write data package cache: {e}")
+
+    def __getitem__(self, game: str) -> GameData:
+        if game not in self._loaded:
+            start, length = self._index[game]
+            self._loaded[game] = restricted_loads(self._sections[start:start + length])
+        return self._loaded[game]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def get_data_package_cache_key() -> str:
+    """Returns a key that changes when the manifest entry of any world source changes."""
+    sources = [(world_source.resolved_path, world_manifest.get(world_source.resolved_path))
+               for world_source in world_sources]
+    return hashlib.sha1(json.dumps([__version__, sources]).encode()).hexdigest()
+
+
+def build_game_data(data_packages: Mapping[str, GamesPackage]) -> Dict[str, GameData]:
+    """Collects the game data of all worlds loaded from world sources, reusing already built data packages."""
+    source_modules = {world_source.module_name for world_source in world_sources}
+    return {
+        game: {
+            "data_package": data_packages[game] if game in data_packages else world.get_data_package_data(),
+            "hint_blacklist": sorted(world.hint_blacklist),
+        }
+        for game, world in AutoWorldRegister.world_types.items()
+        if ".".join(world.__module__.split(".", 2)[:2]) in source_modules
+    }
+
+
+game_data_cache: Optional[Mapping[str, GameData]] = None
+
+
+def get_game_data() -> Mapping[str, GameData]:
+    """
+    Returns the data package and hint blacklist of every installed game.
+    While the data package cache matches the world sources, no world has to be imported for this.
+    """
+    global game_data_cache
+    if game_data_cache is None:
+        key = get_data_package_cache_key()
+        game_data_cache = DataPackageCache.load(key)
+        if game_data_cache is None:
+            AutoWorldRegister.world_types.load_pending()
+            game_data_cache = build_game_data({})
+            DataPackageCache.write(key, game_data_cache)
+    return game_data_cache
+
+
 from .AutoWorld import AutoWorldRegister
 
-network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
-}
+world_sources.sort()
+world_manifest = load_manifest()
+if lazy_loading:
+    # only import the world sources that are missing from the manifest or changed since it was written
+    loaded_sources: List[WorldSource] = []
+    for world_source in world_sources:
+        manifest_entry: Optional[WorldManifestEntry] = world_manifest.get(world_source.resolved_path)
+        if manifest_entry and manifest_entry["key"] == world_source.get_key():
+            for game in manifest_entry["games"]:
+                AutoWorldRegister.world_types.pending.setdefault(game, world_source)
+        elif world_source.load():
+            loaded_sources.append(world_source)
+    update_manifest(world_manifest, loaded_sources)
+else:
+    # import all submodules to trigger AutoWorldRegister
+    for world_source in world_sources:
+        world_source.load()
+    update_manifest(world_manifest, world_sources)
+
+    # Build the data package for each game.
+    network_data_package: DataPackage = {
+        "games": {world_name: world.get_data_package_data()
+                  for world_name, world in AutoWorldRegister.world_types.items()},
+    }
+    # keep the cache up to date for processes that load worlds lazily
+    data_package_cache_key = get_data_package_cache_key()
+    if DataPackageCache.load(data_package_cache_key) is None:
+        DataPackageCache.write(data_package_cache_key, build_game_data(network_data_package["games"]))
+
+
+def __getattr__(name: str) -> Any:
+    if name == "network_data_package":
+        # only reached with lazy loading, read from the data package cache
+        globals()["network_data_package"] = {
+            "games": {game: game_data["data_package"] for game, game_data in get_game_data().items()},
+        }
+        return globals()["network_data_package"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
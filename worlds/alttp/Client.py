@@ -517,17 +517,18 @@ class ALTTPSNIClient(SNIClient):
         return True
 
     async def game_watcher(self, ctx):
-        from SNIClient import snes_read, snes_buffered_write, snes_flush_writes
-        gamemode = await snes_read(ctx, WRAM_START + 0x10, 1)
-        if "DeathLink" in ctx.tags and gamemode and ctx.last_death_link + 1 < time.time():
+        from SNIClient import snes_read_multiple, snes_buffered_write, snes_flush_writes
+        reads = await snes_read_multiple(ctx, ((WRAM_START + 0x10, 1), (SAVEDATA_START + 0x443, 1),
+                                               (SAVEDATA_START + 0x42E, 4), (RECV_PROGRESS_ADDR, 8)))
+        if reads is None:
+            return
+        gamemode, gameend, game_timer, data = reads
+        if "DeathLink" in ctx.tags and ctx.last_death_link + 1 < time.time():
             currently_dead = gamemode[0] in DEATH_MODES
             await ctx.handle_deathlink_state(currently_dead,
                                              ctx.player_names[ctx.slot] + " ran out of hearts." if ctx.slot else "")
 
-        gameend = await snes_read(ctx, SAVEDATA_START + 0x443, 1)
-        game_timer = await snes_read(ctx, SAVEDATA_START + 0x42E, 4)
-        if gamemode is None or gameend is None or game_timer is None or \
-                (gamemode[0] not in INGAME_MODES and gamemode[0] not in ENDGAME_MODES):
+        if gamemode[0] not in INGAME_MODES and gamemode[0] not in ENDGAME_MODES:
             return
 
         if gameend[0]:
@@ -538,10 +539,6 @@ class ALTTPSNIClient(SNIClient):
         if gamemode in ENDGAME_MODES:  # triforce room and credits
             return
 
-        data = await snes_read(ctx, RECV_PROGRESS_ADDR, 8)
-        if data is None:
-            return
-
         recv_index = data[0] | (data[1] << 8)
         recv_item = data[2]
         roomid = data[4] | (data[5] << 8)
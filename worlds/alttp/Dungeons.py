@@ -263,6 +263,7 @@ def fill_dungeons_restrictive(multiworld: MultiWorld):
                         loc = multiworld.get_location(key_loc, player)
 
                         if loc in all_state_base.advancements:
+                            all_state_base.unshare_locations()
                             all_state_base.advancements.remove(loc)
             fill_restrictive(multiworld, all_state_base, locations, in_dungeon_items, lock=True, allow_excluded=True,
                              name="LttP Dungeon Items")
@@ -138,6 +138,8 @@ class ALTTPWorld(World):
     settings: typing.ClassVar[ALTTPSettings]
     topology_present = True
     explicit_indirect_conditions = False
+    incremental_reachability = True
+    output_in_process = True
     item_name_groups = item_name_groups
     location_name_groups = {
         "Blind's Hideout": {"Blind's Hideout - Top", "Blind's Hideout - Left", "Blind's Hideout - Right",
@@ -559,7 +561,7 @@ class ALTTPWorld(World):
                     or self.options.pot_shuffle or self.options.bush_shuffle
                     or self.options.killable_thieves)
 
-    def generate_output(self, output_directory: str):
+    def prepare_output(self, output_directory: str) -> typing.Tuple[str, int, str]:
         multiworld = self.multiworld
         player = self.player
 
@@ -605,16 +607,22 @@ class ALTTPWorld(World):
 
             rompath = os.path.join(output_directory, f"{self.multiworld.get_out_file_name_base(self.player)}.sfc")
             rom.write_to_file(rompath)
-            patch = LttPDeltaPatch(os.path.splitext(rompath)[0]+LttPDeltaPatch.patch_file_ending, player=player,
-                                   player_name=multiworld.player_name[player], patched_path=rompath)
-            patch.write()
-            os.unlink(rompath)
             self.rom_name = rom.name
+            return rompath, player, multiworld.player_name[player]
         except:
             raise
         finally:
             self.rom_name_available_event.set() # make sure threading continues and errors are collected
 
+    @classmethod
+    def write_output(cls, output_data: typing.Tuple[str, int, str], output_directory: str) -> None:
+        # diffing the patched rom is the slowest part of the output, so it may run in an output process
+        rompath, player, player_name = output_data
+        patch = LttPDeltaPatch(os.path.splitext(rompath)[0]+LttPDeltaPatch.patch_file_ending, player=player,
+                               player_name=player_name, patched_path=rompath)
+        patch.write()
+        os.unlink(rompath)
+
     @classmethod
     def stage_extend_hint_information(cls, world, hint_data: typing.Dict[int, typing.Dict[int, str]]):
         er_hint_data = {player: {} for player in world.get_game_players("A Link to the Past") if
@@ -43,6 +43,7 @@ class CliqueWorld(World):
     options_dataclass = CliqueOptions
     location_name_to_id = location_table
     item_name_to_id = item_table
+    isolated_generation = True
 
     def create_item(self, name: str) -> CliqueItem:
         return CliqueItem(name, item_data_table[name].type, item_data_table[name].code, self.player)
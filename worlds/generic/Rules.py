@@ -2,7 +2,7 @@ import collections
 import logging
 import typing
 
-from BaseClasses import LocationProgressType, MultiWorld, Location, Region, Entrance
+from BaseClasses import ItemCounts, ItemIndex, LocationProgressType, MultiWorld, Location, Region, Entrance
 
 if typing.TYPE_CHECKING:
     import BaseClasses
@@ -96,6 +96,441 @@ def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typi
                 logging.warning(f"Unable to exclude location {loc_name} in player {player}'s world.")
 
 
+class Rule:
+    """
+    Declarative access rule, usable anywhere a CollectionRule is, and combinable with & and |, or with add_rule.
+    Combining rules flattens and simplifies the rule tree instead of nesting another function call.
+    """
+    __slots__ = ()
+    cost: typing.ClassVar[int] = 2
+    """Relative cost of evaluating the rule, And and Or evaluate cheaper rules first."""
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        raise NotImplementedError
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        """Values that make two rules of the same type equal."""
+        raise NotImplementedError
+
+    def simplify(self) -> "Rule":
+        """Returns a Constant if the rule doesn't depend on the state, or the rule itself."""
+        return self
+
+    def __and__(self, other: typing.Union["Rule", CollectionRule]) -> "Rule":
+        return And(self, other)
+
+    def __rand__(self, other: CollectionRule) -> "Rule":
+        return And(other, self)
+
+    def __or__(self, other: typing.Union["Rule", CollectionRule]) -> "Rule":
+        return Or(self, other)
+
+    def __ror__(self, other: CollectionRule) -> "Rule":
+        return Or(other, self)
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and other.key == self.key
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.key))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(repr(getattr(self, name)) for name in self.__slots__)})"
+
+
+class Constant(Rule):
+    __slots__ = ("value",)
+    cost = 0
+
+    value: bool
+
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return self.value
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.value,
+
+    def __reduce__(self) -> str:
+        # unpickle to the module level instances, so And and Or can keep checking for them by identity
+        return "always" if self.value else "never"
+
+
+always = Constant(True)
+never = Constant(False)
+
+
+class _ItemRule(Rule):
+    """
+    Base of rules on item counts. For worlds with indexed_item_counts, they look up the indices of their items once
+    and then read the counts of ItemCounts by index, instead of hashing item names on every call.
+    """
+    __slots__ = ("_indices",)
+
+    _indices: typing.Tuple[typing.Optional[ItemIndex], typing.Tuple[int, ...]]
+    """the ItemIndex the indices were looked up in, and the indices of item_names in it"""
+
+    @property
+    def item_names(self) -> typing.Tuple[str, ...]:
+        raise NotImplementedError
+
+    def indices(self, item_counts: ItemCounts) -> typing.Tuple[int, ...]:
+        item_index, indices = self._indices
+        if item_index is not item_counts.item_index:
+            item_index = item_counts.item_index
+            indices = tuple(map(item_index.add, self.item_names))
+            self._indices = item_index, indices
+        return indices
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        # ItemIndex can't be pickled, and is looked up again after unpickling
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+
+class Has(_ItemRule):
+    """Requires item at least count times."""
+    __slots__ = ("item", "player", "count")
+    cost = 1
+
+    item: str
+    player: int
+    count: int
+
+    def __init__(self, item: str, player: int, count: int = 1) -> None:
+        self.item = item
+        self.player = player
+        self.count = count
+        self._indices = None, ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        player_prog_items = state.prog_items[self.player]
+        if type(player_prog_items) is ItemCounts:
+            index, = self.indices(player_prog_items)
+            counts = player_prog_items.counts
+            return index < len(counts) and counts[index] >= self.count
+        return player_prog_items[self.item] >= self.count
+
+    @property
+    def item_names(self) -> typing.Tuple[str, ...]:
+        return self.item,
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.item, self.player, self.count
+
+    def simplify(self) -> Rule:
+        return always if self.count <= 0 else self
+
+
+class HasAll(_ItemRule):
+    """Requires each of items at least once."""
+    __slots__ = ("items", "player")
+
+    items: typing.Tuple[str, ...]
+    player: int
+
+    def __init__(self, items: typing.Iterable[str], player: int) -> None:
+        self.items = tuple(dict.fromkeys(items))
+        self.player = player
+        self._indices = None, ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        player_prog_items = state.prog_items[self.player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            size = len(counts)
+            for index in self.indices(player_prog_items):
+                if index >= size or not counts[index]:
+                    return False
+            return True
+        for item in self.items:
+            if not player_prog_items[item]:
+                return False
+        return True
+
+    @property
+    def item_names(self) -> typing.Tuple[str, ...]:
+        return self.items
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return frozenset(self.items), self.player
+
+    def simplify(self) -> Rule:
+        return self if self.items else always
+
+
+class HasAny(_ItemRule):
+    """Requires at least one of items."""
+    __slots__ = ("items", "player")
+
+    items: typing.Tuple[str, ...]
+    player: int
+
+    def __init__(self, items: typing.Iterable[str], player: int) -> None:
+        self.items = tuple(dict.fromkeys(items))
+        self.player = player
+        self._indices = None, ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        player_prog_items = state.prog_items[self.player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            size = len(counts)
+            for index in self.indices(player_prog_items):
+                if index < size and counts[index]:
+                    return True
+            return False
+        for item in self.items:
+            if player_prog_items[item]:
+                return True
+        return False
+
+    @property
+    def item_names(self) -> typing.Tuple[str, ...]:
+        return self.items
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return frozenset(self.items), self.player
+
+    def simplify(self) -> Rule:
+        return self if self.items else never
+
+
+class Count(_ItemRule):
+    """Requires count items in total out of items, like CollectionState.has_from_list."""
+    __slots__ = ("items", "player", "count")
+
+    items: typing.Tuple[str, ...]
+    player: int
+    count: int
+
+    def __init__(self, items: typing.Iterable[str], player: int, count: int) -> None:
+        self.items = tuple(dict.fromkeys(items))
+        self.player = player
+        self.count = count
+        self._indices = None, ()
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        found = 0
+        player_prog_items = state.prog_items[self.player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            size = len(counts)
+            for index in self.indices(player_prog_items):
+                if index < size:
+                    found += counts[index]
+                    if found >= self.count:
+                        return True
+            return False
+        for item in self.items:
+            found += player_prog_items[item]
+            if found >= self.count:
+                return True
+        return False
+
+    @property
+    def item_names(self) -> typing.Tuple[str, ...]:
+        return self.items
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return frozenset(self.items), self.player, self.count
+
+    def simplify(self) -> Rule:
+        if self.count <= 0:
+            return always
+        return self if self.items else never
+
+
+class CanReach(Rule):
+    """
+    Requires spot, resolved by resolution_hint like CollectionState.can_reach.
+    Entrance rules using this still need to register indirect conditions.
+    """
+    __slots__ = ("spot", "player", "resolution_hint")
+    cost = 3
+
+    spot: str
+    player: int
+    resolution_hint: str
+
+    def __init__(self, spot: str, player: int, resolution_hint: str = "Region") -> None:
+        self.spot = spot
+        self.player = player
+        self.resolution_hint = resolution_hint
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return state.can_reach(self.spot, self.resolution_hint, self.player)
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.spot, self.player, self.resolution_hint
+
+
+class Lambda(Rule):
+    """Wraps any other CollectionRule, so it can be part of a rule tree."""
+    __slots__ = ("rule",)
+    cost = 5
+
+    rule: CollectionRule
+
+    def __init__(self, rule: CollectionRule) -> None:
+        self.rule = rule
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        return self.rule(state)
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.rule,
+
+
+def as_rule(rule: typing.Union[Rule, CollectionRule]) -> Rule:
+    if isinstance(rule, Rule):
+        return rule
+    if rule is Location.access_rule or rule is Entrance.access_rule:
+        return always
+    return Lambda(rule)
+
+
+class _Combination(Rule):
+    """
+    Base of And and Or. Constructing one flattens nested rules of the same kind, drops duplicates and merges item
+    rules, and may return a simpler rule instead, like the single remaining rule or a Constant.
+    Like stardew_rule, it remembers the sub rule that decided its last result and checks that one first,
+    since the next state to evaluate it with most likely differs only by a few items, and caches its result for the
+    version of the last state, which changes whenever its items or reachable regions do.
+    """
+    __slots__ = ("rules", "_last_decisive_rule", "_cache")
+    cost = 4
+    decisive: typing.ClassVar[bool]
+    """Result of a sub rule that decides the combination, False for And and True for Or."""
+
+    rules: typing.Tuple[Rule, ...]
+    _last_decisive_rule: typing.Optional[Rule]
+    _cache: typing.Tuple[int, bool]
+    """CollectionState.version and the result for it, assigned as one tuple so threads never see a mixed pair"""
+
+    def __new__(cls, *rules: typing.Union[Rule, CollectionRule]) -> Rule:  # type: ignore[misc]
+        unique_rules: typing.Dict[Rule, None] = {}
+        for rule in map(as_rule, rules):
+            rule = rule.simplify()
+            if type(rule) is cls:
+                unique_rules.update(dict.fromkeys(rule.rules))
+            elif isinstance(rule, Constant):
+                if rule.value is cls.decisive:
+                    return rule
+            else:
+                unique_rules[rule] = None
+        merged_rules = cls.merge(list(unique_rules))
+        if not merged_rules:
+            return always if cls.decisive is False else never
+        if len(merged_rules) == 1:
+            return merged_rules[0]
+        self = super().__new__(cls)
+        self.rules = tuple(sorted(merged_rules, key=lambda rule: rule.cost))
+        self._last_decisive_rule = None
+        self._cache = -1, False
+        return self
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return type(self), self.rules
+
+    @classmethod
+    def merge(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        """Merges rules on item counts of the same player into fewer rules."""
+        raise NotImplementedError
+
+    def __call__(self, state: "BaseClasses.CollectionState") -> bool:
+        # the version from before evaluating, in case a sub rule updates reachable regions of the state
+        version = state.version
+        cached_version, result = self._cache
+        if cached_version == version:
+            return result
+        decisive = self.decisive
+        last_decisive_rule = self._last_decisive_rule
+        if last_decisive_rule is not None and last_decisive_rule(state) is decisive:
+            result = decisive
+        else:
+            result = not decisive
+            for rule in self.rules:
+                if rule is not last_decisive_rule and rule(state) is decisive:
+                    self._last_decisive_rule = rule
+                    result = decisive
+                    break
+        self._cache = version, result
+        return result
+
+    @property
+    def key(self) -> typing.Tuple[typing.Any, ...]:
+        return frozenset(self.rules),
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(map(repr, self.rules))})"
+
+
+class And(_Combination):
+    """Requires all rules. Has and HasAll of the same player become one HasAll and the highest count of each item."""
+    __slots__ = ()
+    decisive = False
+
+    @classmethod
+    def merge(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        merged_rules: typing.List[Rule] = []
+        player_counts: typing.Dict[int, typing.Dict[str, int]] = {}
+        for rule in rules:
+            if isinstance(rule, Has):
+                counts = player_counts.setdefault(rule.player, {})
+                counts[rule.item] = max(counts.get(rule.item, 0), rule.count)
+            elif isinstance(rule, HasAll):
+                counts = player_counts.setdefault(rule.player, {})
+                for item in rule.items:
+                    counts.setdefault(item, 1)
+            else:
+                merged_rules.append(rule)
+        for player, counts in player_counts.items():
+            items = [item for item, count in counts.items() if count == 1]
+            if len(items) > 1:
+                merged_rules.append(HasAll(items, player))
+            merged_rules.extend(Has(item, player, count) for item, count in counts.items()
+                                if count > 1 or len(items) == 1)
+        return merged_rules
+
+
+class Or(_Combination):
+    """Requires any of rules. Has and HasAny of the same player become one HasAny and the lowest count of each item."""
+    __slots__ = ()
+    decisive = True
+
+    @classmethod
+    def merge(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        merged_rules: typing.List[Rule] = []
+        player_counts: typing.Dict[int, typing.Dict[str, int]] = {}
+        for rule in rules:
+            if isinstance(rule, Has):
+                counts = player_counts.setdefault(rule.player, {})
+                counts[rule.item] = min(counts.get(rule.item, rule.count), rule.count)
+            elif isinstance(rule, HasAny):
+                counts = player_counts.setdefault(rule.player, {})
+                for item in rule.items:
+                    counts[item] = 1
+            else:
+                merged_rules.append(rule)
+        for player, counts in player_counts.items():
+            items = [item for item, count in counts.items() if count == 1]
+            if len(items) > 1:
+                merged_rules.append(HasAny(items, player))
+            merged_rules.extend(Has(item, player, count) for item, count in counts.items()
+                                if count > 1 or len(items) == 1)
+        return merged_rules
+
+
 def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule):
     spot.access_rule = rule
 
@@ -105,6 +540,8 @@ def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
     # empty rule, replace instead of add
     if old_rule is Location.access_rule or old_rule is Entrance.access_rule:
         spot.access_rule = rule if combine == "and" else old_rule
+    elif isinstance(rule, Rule) or isinstance(old_rule, Rule):
+        spot.access_rule = And(rule, old_rule) if combine == "and" else Or(rule, old_rule)
     else:
         if combine == "and":
             spot.access_rule = lambda state: rule(state) and old_rule(state)
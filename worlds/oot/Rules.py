@@ -125,6 +125,7 @@ class OOTLogic(LogicMixin):
                     bc.remove(connection)
                     bc.update(new_region.exits)
                     queue.extend(new_region.exits)
+                    self.unshare_locations()
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
 
 
@@ -39,6 +39,7 @@ class ShortHikeWorld(World):
     options: ShortHikeOptions
 
     required_client_version = (0, 4, 4)
+    isolated_generation = True
 
     def get_filler_item_name(self) -> str:
         return self.options.filler_coin_amount.current_option_name
@@ -70,6 +70,7 @@ class TLoZWorld(World):
     game = "The Legend of Zelda"
     topology_present = False
     base_id = 7000
+    indexed_item_counts = True
     web = TLoZWeb()
 
     item_name_to_id = {name: data.code for name, data in item_table.items()}
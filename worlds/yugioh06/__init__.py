@@ -86,6 +86,7 @@ class Yugioh06World(World):
     options_dataclass = Yugioh06Options
     settings_key = "yugioh06_settings"
     settings: ClassVar[Yugioh2006Setting]
+    indexed_item_counts = True
 
     item_name_to_id = {}
     start_id = 5730000